@@ -0,0 +1,44 @@
+""" Micro-benchmarks for the Protean Flask request pipeline
+
+Run a benchmark module from the root of the repository, for example::
+
+    python -m benchmarks.bench_serializer
+
+The benchmarks use the sample app and the Dict repository from the test suite,
+so that they can run offline. `benchmarks.bench_requests` measures the whole
+request pipeline and checks the results against `benchmarks/baseline.json`.
+"""
+import os
+import timeit
+
+os.environ.setdefault('PROTEAN_CONFIG', 'tests.support.sample_config')
+
+
+def register_entities(*entity_classes):
+    """ Register the entity classes with the repository factory, once """
+    from protean.core.repository import repo_factory
+
+    for entity_cls in entity_classes:
+        try:
+            repo_factory.get_repository(entity_cls)
+        except AssertionError:
+            repo_factory.register(entity_cls)
+
+
+def measure(func, number=1000, repeat=5):
+    """ Return the best time per call of `func`, in microseconds """
+    timings = timeit.repeat(func, number=number, repeat=repeat)
+    return min(timings) / number * 1e6
+
+
+def report(title, results):
+    """ Print the results of a benchmark as a table
+
+    :param results: list of `(label, microseconds per call)` tuples
+    """
+    print(title)
+    print('-' * len(title))
+    width = max(len(label) for label, _ in results)
+    for label, usecs in results:
+        print(f'{label:<{width}}  {usecs:>12.2f} us')
+    print()
@@ -0,0 +1,114 @@
+""" Benchmark async handlers against sync handlers at a fixed worker count
+
+Both views fetch a Human and their dogs with two use cases, while the
+repository is slowed down to simulate the latency of a database. The sync
+view runs the use cases one after the other, the async view awaits them at
+the same time in the thread pool. The async view is measured with the pool
+sized to the number of workers, so that both views run the use cases with the
+same number of threads, and with the `ASYNC_POOL_SIZE` threads it has by
+default on top of the workers.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import mock
+from benchmarks import register_entities
+from benchmarks import report
+from protean.conf import active_config
+from protean.core.repository import repo_factory
+from protean.core.tasklet import Tasklet
+from protean.core.usecase import ShowRequestObject
+from protean.core.usecase import ShowUseCase
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Dog
+from tests.support.sample_app.entities import Human
+from tests.support.sample_app.serializers import DogSerializer
+from tests.support.sample_app.serializers import HumanSerializer
+from tests.support.sample_app.usecases import ListMyDogsRequestObject
+from tests.support.sample_app.usecases import ListMyDogsUsecase
+
+from protean_flask.core.async_views import shutdown_executor
+from protean_flask.core.views import GenericAPIResource
+
+# Seconds of simulated latency per use case
+LATENCY = 0.02
+WORKERS = 4
+REQUESTS = 200
+
+
+class SyncHumanResource(GenericAPIResource):
+    """ Sync view fetching a Human and their dogs one after the other """
+    entity_cls = Human
+    serializer_cls = HumanSerializer
+
+    def get(self, identifier):
+        """ Fetch the Human and then their dogs """
+        payload = {'identifier': identifier}
+        result, _, _ = self._process_request(
+            ShowUseCase, ShowRequestObject, payload)
+        dogs_list = self._process_request(
+            ListMyDogsUsecase, ListMyDogsRequestObject, payload,
+            no_serialization=True)
+
+        result['human']['dogs'] = DogSerializer(many=True).dump(
+            dogs_list.items).data
+        return result, 200
+
+
+def throughput(client, url):
+    """ Return the time per request of `REQUESTS` requests to the url, sent
+    by `WORKERS` threads
+    """
+    with ThreadPoolExecutor(max_workers=WORKERS) as workers:
+        start = time.perf_counter()
+        responses = list(workers.map(
+            lambda i: client.get(url), range(REQUESTS)))
+        elapsed = time.perf_counter() - start
+
+    assert all(rv.status_code == 200 for rv in responses)
+    return elapsed / REQUESTS * 1e6
+
+
+def main():
+    """ Run the benchmark and print the results """
+    register_entities(Dog, Human)
+    app.add_url_rule('/bench/humans/<int:identifier>', methods=['GET'],
+                     view_func=SyncHumanResource.as_view('bench_sync_human'))
+    client = app.test_client()
+
+    Human.create(id=1, name='John')
+    for i in range(1, 4):
+        Dog.create(id=i, name=f'Dog {i}', owner='John', age=i)
+
+    perform = Tasklet.perform
+
+    def slow_perform(*args, **kwargs):
+        time.sleep(LATENCY)
+        return perform(*args, **kwargs)
+
+    pool_size = active_config.ASYNC_POOL_SIZE
+    results = []
+    try:
+        with mock.patch.object(Tasklet, 'perform', side_effect=slow_perform):
+            results.append(
+                ('sync handler', throughput(client, '/bench/humans/1')))
+
+            shutdown_executor()
+            with mock.patch.object(active_config, 'ASYNC_POOL_SIZE', WORKERS):
+                results.append((f'async handler, {WORKERS} pool threads',
+                                throughput(client, '/async/humans/1')))
+
+            shutdown_executor()
+            results.append((f'async handler, {pool_size} pool threads',
+                            throughput(client, '/async/humans/1')))
+    finally:
+        shutdown_executor()
+        repo_factory.get_repository(Dog).delete_all()
+        repo_factory.get_repository(Human).delete_all()
+
+    report(f'Wall time per request with {WORKERS} workers and '
+           f'{LATENCY * 1000:.0f}ms per use case', results)
+
+
+if __name__ == '__main__':
+    main()
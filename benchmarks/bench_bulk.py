@@ -0,0 +1,47 @@
+""" Benchmark the bulk create endpoint against single create requests """
+import json
+
+from benchmarks import measure
+from benchmarks import register_entities
+from benchmarks import report
+from protean.core.repository import repo_factory
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Human
+
+ITEM_COUNTS = (10, 100)
+
+
+def main():
+    """ Run the benchmark and print the results """
+    register_entities(Human)
+    repository = repo_factory.get_repository(Human)
+    client = app.test_client()
+    results = []
+
+    for count in ITEM_COUNTS:
+        payloads = [dict(id=i, name=f'Human {i}') for i in range(count)]
+        documents = [json.dumps(payload) for payload in payloads]
+        bulk_document = json.dumps(payloads)
+
+        def single_requests():
+            repository.delete_all()
+            for document in documents:
+                client.post('/humans', data=document,
+                            content_type='application/json')
+
+        def bulk_request():
+            repository.delete_all()
+            client.post('/humans/bulk', data=bulk_document,
+                        content_type='application/json')
+
+        results.append((f'{count} single requests', measure(
+            single_requests, number=10)))
+        results.append((f'1 bulk request of {count}', measure(
+            bulk_request, number=10)))
+
+    repository.delete_all()
+    report('Creating entities with single and bulk requests', results)
+
+
+if __name__ == '__main__':
+    main()
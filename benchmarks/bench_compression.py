@@ -0,0 +1,64 @@
+""" Benchmark the CPU cost of compressing list responses against the bytes
+saved, for each installed encoding and a few compression levels. The cost of
+the whole request is given for comparison.
+"""
+import mock
+from benchmarks import measure
+from benchmarks import register_entities
+from benchmarks import report
+from protean.conf import active_config
+from protean.core.repository import repo_factory
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Human
+
+from protean_flask.core.compression import get_compressor
+from protean_flask.core.compression import is_installed
+
+PAGE_SIZES = (100, 1000)
+SETTINGS = (
+    ('gzip', 1), ('gzip', 6), ('gzip', 9),
+    ('br', 1), ('br', 4), ('zstd', 1), ('zstd', 3),
+)
+
+
+def compress(encoding, body):
+    """ Compress the whole body with a new compressor """
+    compressor = get_compressor(encoding)
+    return compressor.compress(body) + compressor.finish()
+
+
+def main():
+    """ Run the benchmark and print the results """
+    register_entities(Human)
+    client = app.test_client()
+    for i in range(1, max(PAGE_SIZES) + 1):
+        Human.create(id=i, name=f'Human {i}', contact=f'{9000000000 + i}')
+
+    try:
+        for page_size in PAGE_SIZES:
+            url = f'/humans?per_page={page_size}'
+            body = client.get(url).get_data()
+            results = [(f'whole request ({len(body) / 1024:.1f} KiB)',
+                        measure(lambda: client.get(url), number=20))]
+
+            for encoding, level in SETTINGS:
+                if not is_installed(encoding):
+                    continue
+
+                levels = dict(active_config.COMPRESSION_LEVELS,
+                              **{encoding: level})
+                with mock.patch.object(
+                        active_config, 'COMPRESSION_LEVELS', levels):
+                    size = len(compress(encoding, body))
+                    results.append((
+                        f'{encoding} level {level} '
+                        f'({size / 1024:.1f} KiB, {size / len(body):.0%})',
+                        measure(lambda: compress(encoding, body), number=100)))
+
+            report(f'Compressing a list of {page_size} entities', results)
+    finally:
+        repo_factory.get_repository(Human).delete_all()
+
+
+if __name__ == '__main__':
+    main()
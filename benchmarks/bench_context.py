@@ -0,0 +1,69 @@
+""" Benchmark the overhead of loading the Protean context per request
+
+Compares the previous implementation, which computed all the details of the
+request eagerly, with the lazily computed context.
+"""
+import hashlib
+
+from benchmarks import measure
+from benchmarks import report
+from protean.context import context
+from tests.support.sample_app import api
+from tests.support.sample_app import app
+
+from protean_flask.utils import derive_tenant
+
+HEADERS = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) Firefox/68.0'}
+
+
+def eager_load_protean():
+    """ Load the context as was done before """
+    from flask import request
+
+    user_agent = request.headers.get('User-Agent', '')
+    hashed_user_agent = hashlib.sha256(user_agent.encode())
+
+    details = {
+        'host_url': request.host_url,
+        'url': request.url,
+        'tenant_id': derive_tenant(request.url),
+        'user_agent': user_agent,
+        'user_agent_hash': hashed_user_agent.hexdigest(),
+        'remote_addr': request.remote_addr
+    }
+    context.set_context(details)
+
+
+def read_context():
+    """ Read all the values of the context """
+    return (context.host_url, context.url, context.tenant_id,
+            context.user_agent, context.user_agent_hash, context.remote_addr)
+
+
+def main():
+    """ Run the benchmark and print the results """
+    results = []
+
+    def run(label, load, read=False):
+        # A new request is built each time, so cached request attributes
+        # are not reused across iterations
+        def before_request():
+            with app.test_request_context('/dogs?page=2', headers=HEADERS):
+                load()
+                if read:
+                    read_context()
+                context.cleanup()
+
+        results.append((label, measure(before_request, number=5000)))
+
+    run('request context only', lambda: None)
+    run('eager context', eager_load_protean)
+    run('lazy context, not read', api._load_protean)
+    run('lazy context, all read', api._load_protean, read=True)
+    run('eager context, all read', eager_load_protean, read=True)
+
+    report('Loading the Protean context in before_request', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+""" Benchmark the dispatch overhead of an `APIResource`
+
+Compares resolving the renderer and parser from import strings on every
+request, as was done before, with the callables resolved by `as_view`.
+"""
+from benchmarks import measure
+from benchmarks import report
+from protean.conf import active_config
+from protean.utils.importlib import perform_import
+from tests.support.sample_app import app
+
+from protean_flask.core.views import APIResource
+
+
+def noop_parser():
+    """ Parser that does nothing """
+
+
+class PingResource(APIResource):
+    """ View with a trivial handler, so that only dispatch is measured """
+    parser = 'benchmarks.bench_dispatch.noop_parser'
+
+    def get(self):
+        """ Return a constant response """
+        return {'ping': 'pong'}
+
+
+def main():
+    """ Run the benchmark and print the results """
+    view_func = PingResource.as_view('bench_ping')
+    app.add_url_rule('/bench/ping', view_func=view_func)
+
+    def per_request_imports():
+        perform_import(active_config.DEFAULT_RENDERER)
+        perform_import(PingResource.parser)
+
+    def resolved_lookups():
+        return PingResource._renderer_func, PingResource._parser_func
+
+    with app.test_request_context('/bench/ping'):
+        app.preprocess_request()
+        results = [
+            ('import-string lookups (before)', measure(per_request_imports)),
+            ('resolved lookups (after)', measure(resolved_lookups)),
+            ('dispatch_request', measure(view_func)),
+        ]
+
+    report('APIResource dispatch overhead', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+""" Benchmark dumping a list of entities with marshmallow against the
+compiled dump function of an `EntitySerializer`
+"""
+from benchmarks import measure
+from benchmarks import report
+from protean.core import field
+from protean.core.entity import Entity
+
+from protean_flask.core.serializers import EntitySerializer
+
+ITEM_COUNT = 10000
+
+
+class Pet(Entity):
+    """ Flat entity with fields of the simple types """
+    id = field.Integer(identifier=True)
+    name = field.String(max_length=50)
+    owner = field.String(max_length=50)
+    age = field.Integer()
+    weight = field.Float()
+    vaccinated = field.Boolean()
+    tags = field.List()
+    details = field.Dict()
+
+
+class PetSerializer(EntitySerializer):
+    """ Serializer dumping the entities with marshmallow """
+
+    class Meta:
+        entity = Pet
+
+
+class CompiledPetSerializer(EntitySerializer):
+    """ Serializer dumping the entities with a compiled function """
+
+    class Meta:
+        entity = Pet
+        compiled_dump = True
+
+
+def main():
+    """ Run the benchmark and print the results """
+    pets = [
+        Pet(id=i, name=f'Pet {i}', owner='John', age=i % 15,
+            weight=i / 10, vaccinated=bool(i % 2), tags=['small'],
+            details={'breed': 'beagle'})
+        for i in range(ITEM_COUNT)]
+
+    assert CompiledPetSerializer(many=True).dump(pets) == \
+        PetSerializer(many=True).dump(pets)
+
+    report(f'Dumping {ITEM_COUNT} entities', [
+        ('marshmallow', measure(
+            lambda: PetSerializer(many=True).dump(pets), number=3, repeat=3)),
+        ('compiled', measure(
+            lambda: CompiledPetSerializer(many=True).dump(pets),
+            number=3, repeat=3)),
+    ])
+
+
+if __name__ == '__main__':
+    main()
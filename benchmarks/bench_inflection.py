@@ -0,0 +1,45 @@
+""" Benchmark deriving the resource names of the list responses
+
+Compares inflecting the name of the entity class on every request, as was
+done before, with the names memoized per entity class.
+"""
+from benchmarks import measure
+from benchmarks import register_entities
+from benchmarks import report
+from protean.utils import inflection
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Dog
+from tests.support.sample_app.views import ListDogResource
+
+from protean_flask.core.views import INFLECTOR
+
+
+def main():
+    """ Run the benchmark and print the results """
+    register_entities(Dog)
+    view = ListDogResource()
+    client = app.test_client()
+
+    def per_request_inflection():
+        resource = inflection.underscore(Dog.__name__)
+        return resource, INFLECTOR.plural(resource)
+
+    for i in range(1, 11):
+        Dog.create(id=i, name=f'Dog {i}', owner='John')
+
+    try:
+        results = [
+            ('inflected per request', measure(per_request_inflection)),
+            ('memoized per class', measure(view.get_resource_names)),
+            ('list request of 10 dogs', measure(
+                lambda: client.get('/dogs'), number=200)),
+        ]
+    finally:
+        for i in range(1, 11):
+            Dog.get(i).delete()
+
+    report('Resource names of a list response', results)
+
+
+if __name__ == '__main__':
+    main()
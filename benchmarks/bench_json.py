@@ -0,0 +1,63 @@
+""" Benchmark the JSON backends on large list payloads """
+import datetime
+import uuid
+
+from benchmarks import measure
+from benchmarks import report
+from tests.support.sample_app import app
+
+from protean_flask.core.json_backends import BACKENDS
+
+ITEM_COUNT = 5000
+
+
+def build_payload(count, with_dates=True):
+    """ Build a list envelope like the one returned by list endpoints.
+
+    Dates are formatted by the encoder of the app with every backend, so
+    they are left out of one of the payloads to show the raw encoding cost.
+    """
+    items = []
+    for i in range(count):
+        item = {
+            'id': i,
+            'uuid': uuid.uuid4(),
+            'name': f'Dog {i}',
+            'owner': 'John',
+            'age': i % 15,
+            'tags': ['good', 'boy'],
+        }
+        if with_dates:
+            item['born_at'] = datetime.datetime(2019, 1, 1, 10, 30)
+        items.append(item)
+
+    return {'dogs': items, 'total': count, 'page': 1}
+
+
+def main():
+    """ Run the benchmark and print the results """
+    payload = build_payload(ITEM_COUNT)
+    payload_without_dates = build_payload(ITEM_COUNT, with_dates=False)
+    results = []
+
+    with app.app_context():
+        for name, backend_cls in BACKENDS.items():
+            try:
+                backend = backend_cls()
+            except ImportError:
+                print(f'Skipping `{name}`, it is not installed')
+                continue
+
+            document = backend.dumps(payload)
+            results.append((f'{name} dumps', measure(
+                lambda: backend.dumps(payload), number=5)))
+            results.append((f'{name} dumps (no dates)', measure(
+                lambda: backend.dumps(payload_without_dates), number=5)))
+            results.append((f'{name} loads', measure(
+                lambda: backend.loads(document), number=5)))
+
+    report(f'JSON backends, list of {ITEM_COUNT} items', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+""" Benchmark converting the query arguments of a request to the payload
+
+Compares the previous `immutable_dict_2_dict`, which copied the multi dict to
+a dict of lists first, with the single pass conversion.
+"""
+from benchmarks import measure
+from benchmarks import report
+from werkzeug.datastructures import ImmutableMultiDict
+
+from protean_flask.utils import immutable_dict_2_dict
+
+
+def previous_immutable_dict_2_dict(imm_dict):
+    """ The conversion as it was done before """
+    m_dict = {}
+
+    for key, val in imm_dict.to_dict(flat=False).items():
+        if len(val) > 1 or key.endswith('[]'):
+            m_dict[key.strip('[]')] = val
+        else:
+            m_dict[key] = val[0]
+
+    return m_dict
+
+
+def main():
+    """ Run the benchmark and print the results """
+    scenarios = [
+        ('3 arguments', ImmutableMultiDict(
+            [('page', '2'), ('per_page', '20'), ('order_by', 'name')])),
+        ('12 filters', ImmutableMultiDict(
+            [(f'field{i}', f'value{i}') for i in range(12)])),
+        ('12 filters with lists', ImmutableMultiDict(
+            [(f'field{i}', f'value{i}') for i in range(8)] +
+            [(f'tags{i}[]', value) for i in range(4) for value in 'abc'])),
+    ]
+
+    results = []
+    for label, imm_dict in scenarios:
+        assert immutable_dict_2_dict(imm_dict) == \
+            previous_immutable_dict_2_dict(imm_dict)
+        results.append((f'{label}, before', measure(
+            lambda: previous_immutable_dict_2_dict(imm_dict), number=20000)))
+        results.append((f'{label}, after', measure(
+            lambda: immutable_dict_2_dict(imm_dict), number=20000)))
+
+    nested = ImmutableMultiDict(
+        [(f'filter[field{i}]', f'value{i}') for i in range(6)] +
+        [(f'items[{i}][name]', f'name{i}') for i in range(6)])
+    results.append(('12 nested filters, after', measure(
+        lambda: immutable_dict_2_dict(nested), number=20000)))
+
+    report('Converting multi dicts', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+""" Benchmark the show route of a viewset with the payload loaded on every
+request, as was done before, and on first access only
+"""
+import mock
+from benchmarks import measure
+from benchmarks import register_entities
+from benchmarks import report
+from protean.core.repository import repo_factory
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Human
+from tests.support.sample_app.views import HumanResourceSet
+
+
+def noop_parser():
+    """ Parser that does nothing, which makes the view load the payload """
+
+
+def main():
+    """ Run the benchmark and print the results """
+    register_entities(Human)
+    Human.create(id=1, name='John')
+
+    query = '&'.join(f'arg{i}=value{i}' for i in range(10))
+    view_func = app.view_functions['humans']
+    try:
+        parse_results = []
+        results = []
+        for label, path in (('show', '/humans/1'),
+                            ('show with query', f'/humans/1?{query}')):
+            with app.test_request_context(path):
+                app.preprocess_request()
+                view = HumanResourceSet()
+                with mock.patch.object(HumanResourceSet, '_parser_func',
+                                       staticmethod(noop_parser)):
+                    parse_results.append((f'{label}, loaded (before)',
+                                          measure(view.parse_payload)))
+                    results.append((f'{label}, loaded (before)', measure(
+                        lambda: view_func(identifier=1), number=2000)))
+                parse_results.append((f'{label}, lazy (after)',
+                                      measure(view.parse_payload)))
+                results.append((f'{label}, lazy (after)', measure(
+                    lambda: view_func(identifier=1), number=2000)))
+    finally:
+        repo_factory.get_repository(Human).delete_all()
+
+    report('Parsing the payload of the show route', parse_results)
+    report('Dispatching the show route of a viewset', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+""" Benchmark the full request pipeline of the sample app
+
+Each scenario sends requests through the Flask test client, and reports the
+requests per second, the p50 and p99 latencies and the peak memory allocated
+per request. The results are compared with `benchmarks/baseline.json`, and
+the run fails when a scenario is slower or allocates more than the baseline
+by more than the tolerance::
+
+    python -m benchmarks.bench_requests
+    python -m benchmarks.bench_requests --save-baseline
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from io import BytesIO
+
+from benchmarks import register_entities
+from protean.core.exceptions import ObjectNotFoundError
+from protean.core.repository import repo_factory
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Dog
+from tests.support.sample_app.entities import Human
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+#: A scenario sends one request with `send(i)` for the i-th iteration, after
+#: running the untimed `prepare(i)` when it is set
+Scenario = namedtuple('Scenario', 'name, send, prepare')
+
+
+def seed():
+    """ Reset the repositories to the data used by all the scenarios """
+    repo_factory.get_repository(Dog).delete_all()
+    repo_factory.get_repository(Human).delete_all()
+
+    for i in range(1, 101):
+        Human.create(id=i, name=f'Human {i}')
+    for i in range(1, 6):
+        Dog.create(id=i, name=f'Dog {i}', owner='Human 1', age=i)
+
+
+def discard(entity_cls, identifier):
+    """ Delete the entity if it exists, so that it can be created again """
+    try:
+        entity_cls.get(identifier).delete()
+    except ObjectNotFoundError:
+        pass
+
+
+def build_scenarios(client):
+    """ Return the scenarios of the benchmark. The entities created by a
+    request are discarded before the next one, so that the size of the
+    repositories stays the same.
+    """
+
+    def json_post(url, data):
+        return client.post(url, data=json.dumps(data),
+                           content_type='application/json')
+
+    def recreate_human(i):
+        discard(Human, 1000)
+        Human.create(id=1000, name='John')
+
+    dog = dict(id=1000, name='Johnny', owner='John', age='3')
+    return [
+        Scenario('show', lambda i: client.get('/humans/1'), None),
+        Scenario('list', lambda i: client.get('/humans?per_page=20'), None),
+        Scenario('create', lambda i: json_post(
+            '/humans', dict(id=1000, name='John')),
+            lambda i: discard(Human, 1000)),
+        Scenario('update', lambda i: client.put(
+            '/humans/2', data=json.dumps(dict(name=f'Jane {i}')),
+            content_type='application/json'), None),
+        Scenario('delete', lambda i: client.delete('/humans/1000'),
+                 recreate_human),
+        Scenario('custom route', lambda i: client.get('/humans/1/my_dogs'),
+                 None),
+        Scenario('parse json', lambda i: json_post('/dogs', dog),
+                 lambda i: discard(Dog, 1000)),
+        Scenario('parse form', lambda i: client.post(
+            '/dogs', data=dog,
+            content_type='application/x-www-form-urlencoded'),
+            lambda i: discard(Dog, 1000)),
+        Scenario('parse multipart', lambda i: client.post(
+            '/dogs', data=dict(dog, photo=(BytesIO(b'photo'), 'photo.jpg')),
+            content_type='multipart/form-data'),
+            lambda i: discard(Dog, 1000)),
+        Scenario('error not found', lambda i: client.get('/humans/99999'),
+                 None),
+        Scenario('error invalid', lambda i: json_post(
+            '/humans', dict(contact='9000900090')), None),
+    ]
+
+
+def percentile(values, fraction):
+    """ Return the value at the `fraction` of the sorted values """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_scenario(scenario, iterations, warmup):
+    """ Run the scenario and return its results """
+    for i in range(warmup):
+        if scenario.prepare:
+            scenario.prepare(i)
+        scenario.send(i)
+
+    timings = []
+    for i in range(iterations):
+        if scenario.prepare:
+            scenario.prepare(i)
+        start = time.perf_counter()
+        scenario.send(i)
+        timings.append(time.perf_counter() - start)
+
+    # Memory is traced in a separate pass, as tracing slows requests down
+    allocations = []
+    tracemalloc.start()
+    for i in range(max(iterations // 10, 10)):
+        if scenario.prepare:
+            scenario.prepare(i)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        scenario.send(i)
+        _, peak = tracemalloc.get_traced_memory()
+        allocations.append(peak - size)
+    tracemalloc.stop()
+
+    return {
+        'rps': round(len(timings) / sum(timings), 1),
+        'p50_us': round(percentile(timings, 0.5) * 1e6, 1),
+        'p99_us': round(percentile(timings, 0.99) * 1e6, 1),
+        'alloc_kib': round(percentile(allocations, 0.5) / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """ Return the descriptions of the results that regressed """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ('p50_us', 'alloc_kib'):
+            limit = baseline[name][metric] * (1 + tolerance)
+            if result[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {result[metric]} > '
+                    f'{baseline[name][metric]} (+{tolerance:.0%})')
+    return regressions
+
+
+def print_results(results, baseline):
+    """ Print the results as a table, with the change from the baseline """
+    title = 'Request pipeline of the sample app'
+    print(title)
+    print('-' * len(title))
+    print(f'{"scenario":<16} {"req/s":>9} {"p50 us":>9} {"p99 us":>9} '
+          f'{"alloc KiB":>10} {"p50 vs baseline":>16}')
+    for name, result in results.items():
+        change = ''
+        if name in baseline:
+            ratio = result['p50_us'] / baseline[name]['p50_us'] - 1
+            change = f'{ratio:+.0%}'
+        print(f'{name:<16} {result["rps"]:>9.0f} {result["p50_us"]:>9.1f} '
+              f'{result["p99_us"]:>9.1f} {result["alloc_kib"]:>10.1f} '
+              f'{change:>16}')
+    print()
+
+
+def main(argv=None):
+    """ Run the benchmark, print the results and check the baseline """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-n', '--iterations', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('-k', '--scenario', action='append',
+                        help='run only the scenarios with these names')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='save the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown from the baseline')
+    args = parser.parse_args(argv)
+
+    register_entities(Dog, Human)
+    client = app.test_client()
+    results = {}
+    try:
+        for scenario in build_scenarios(client):
+            if args.scenario and scenario.name not in args.scenario:
+                continue
+            seed()
+            results[scenario.name] = run_scenario(
+                scenario, args.iterations, args.warmup)
+    finally:
+        repo_factory.get_repository(Dog).delete_all()
+        repo_factory.get_repository(Human).delete_all()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({**baseline, **results}, baseline_file, indent=2,
+                      sort_keys=True)
+            baseline_file.write('\n')
+        print(f'Saved the baseline to {args.baseline}')
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f'Regression in {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
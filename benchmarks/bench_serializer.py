@@ -0,0 +1,54 @@
+""" Benchmark the per-request setup cost of an `EntitySerializer`
+
+The uncached numbers clear the compiled field cache before each construction,
+which is what every request used to pay.
+"""
+from benchmarks import measure
+from benchmarks import report
+from protean.core import field
+from protean.core.entity import Entity
+
+from protean_flask.core.serializers import EntitySerializer
+
+FIELD_COUNT = 40
+
+WideEntity = type('WideEntity', (Entity,), dict(
+    id=field.Integer(identifier=True),
+    **{f'field_{i}': field.String(max_length=50) for i in range(FIELD_COUNT)}
+))
+
+
+class WideSerializer(EntitySerializer):
+    """ Serializer for an entity with many fields """
+
+    class Meta:
+        entity = WideEntity
+
+
+def construct_uncached():
+    """ Construct the serializer after dropping the compiled fields """
+    EntitySerializer._compiled_fields.clear()
+    return WideSerializer(many=True)
+
+
+def construct_cached():
+    """ Construct the serializer using the compiled fields """
+    return WideSerializer(many=True)
+
+
+def main():
+    """ Run the benchmark and print the results """
+    item = WideEntity(id=1, **{f'field_{i}': 'value' for i in range(FIELD_COUNT)})
+
+    report(f'Serializer setup, {FIELD_COUNT + 1} fields', [
+        ('construct (uncached)', measure(construct_uncached)),
+        ('construct (cached)', measure(construct_cached)),
+        ('construct + dump 1 item (uncached)',
+         measure(lambda: construct_uncached().dump([item]))),
+        ('construct + dump 1 item (cached)',
+         measure(lambda: construct_cached().dump([item]))),
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -68,6 +68,7 @@ setup(
         'flask==1.1.1',
         'inflect==1.0.1',
         'protean==0.0.11',
+        'werkzeug==0.15.5',
         'marshmallow==2.16.1',
         # eg: 'aspectlib==1.1.1', 'six>=1.7',
     ],
@@ -8,3 +8,123 @@ DEFAULT_CONTENT_TYPE = 'application/json'
 
 # Custom exception handler for the app
 EXCEPTION_HANDLER = None
+
+# Request details made available in the Protean context. Each of them is
+# computed from the request when first read from the context
+CONTEXT_KEYS = ['host_url', 'url', 'tenant_id', 'user_agent',
+                'user_agent_hash', 'remote_addr']
+
+# Tenants of the hosts, as a dict or a list of `(pattern, tenant)` pairs.
+# Patterns with regex characters must match the whole host name, and the
+# tenant can refer to their groups. Other hosts use `subdomain.domain.com`
+TENANT_MAPPING = []
+
+# Number of hosts whose tenant is memoized
+TENANT_CACHE_SIZE = 1024
+
+# Backend used to encode and decode JSON: `stdlib`, `orjson`, `ujson` or
+# `auto` to pick the fastest one installed
+JSON_BACKEND = 'stdlib'
+
+# Stream list responses to the client in chunks instead of rendering them
+# at once. Can be overridden per view with `stream_list`
+STREAM_LIST_RESPONSES = False
+
+# Number of items serialized in each chunk of a streamed list response
+STREAM_CHUNK_SIZE = 100
+
+# Number of entities fetched from the repository per batch by export routes
+EXPORT_BATCH_SIZE = 1000
+
+# Pagination of the lists: `page` for page numbers, or `cursor` for cursors
+# on a unique field. Can be overridden per view with `pagination`
+PAGINATION = 'page'
+
+# Total of the list responses: `exact`, `none` to leave it out, or `estimate`.
+# Lists without an exact total report `has_more` instead. Can be overridden
+# per view with `count_mode`, and per request with the `count` argument
+LIST_COUNT_MODE = 'exact'
+
+# Add ETags to the responses of GET requests and handle conditional requests.
+# Can be overridden per view with `use_etags`
+USE_ETAGS = False
+
+# Backend of the response cache of the views with `cache_responses` set. The
+# `PROVIDER` can be any implementation of `protean.core.cache.BaseCache`
+RESPONSE_CACHE = {
+    'PROVIDER': 'protean_flask.core.cache.LRUCache',
+    'MAX_ENTRIES': 1000,
+    'EXPIRY': 60,
+}
+
+# Compress the responses of the views with the encoding accepted by the client
+COMPRESSION_ENABLED = False
+
+# Encodings to compress the responses with, in order of preference. `br` and
+# `zstd` need the `brotli` and `zstandard` libraries, and are skipped when
+# they are not installed
+COMPRESSION_ENCODINGS = ['br', 'zstd', 'gzip']
+
+# Compression level of each encoding, the encodings left out are compressed
+# at these default levels
+COMPRESSION_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+
+# Minimum size, in bytes, of the responses to compress. Streamed responses are
+# always compressed
+COMPRESSION_MIN_SIZE = 1024
+
+# Types of the responses to compress
+COMPRESSION_MIMETYPES = [
+    'application/json', 'application/x-ndjson', 'text/plain', 'text/html',
+    'text/csv', 'application/xml',
+]
+
+# Maximum size, in bytes, of the request bodies accepted by the views. Larger
+# bodies are rejected with a 413 error before they are read. `None` to accept
+# bodies of any size
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+# Size, in bytes, from which JSON request bodies are read in chunks, and the
+# items of JSON arrays decoded as they are read. Bodies of unknown size are
+# always read in chunks
+JSON_STREAM_MIN_SIZE = 1024 * 1024
+
+# Maximum number of items accepted by a single bulk request
+BULK_MAX_ITEMS = 1000
+
+# Maximum number of identifiers accepted by a single batch request
+BATCH_MAX_ITEMS = 100
+
+# Number of entities fetched per repository query when prefetching the
+# associations of serialized entities
+PREFETCH_BATCH_SIZE = 1000
+
+# Maximum number of field sets whose serializer fields and dump functions are
+# kept compiled, per kind. The least recently used ones are dropped first
+SERIALIZER_CACHE_SIZE = 256
+
+# Maximum number of connections of each database provider that requests can
+# borrow at once, with `protean_flask.core.connections.get_connection`
+CONNECTION_POOL_SIZE = 10
+
+# Seconds that a request waits for a connection when all of them are in use
+CONNECTION_POOL_TIMEOUT = 30
+
+# Maximum number of threads running the blocking use cases awaited by the
+# handlers of async views
+ASYNC_POOL_SIZE = 10
+
+# Record the time spent in each stage of the requests handled by the views
+METRICS_ENABLED = False
+
+# Upper bounds, in seconds, of the buckets of the timing histograms
+METRICS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5)
+
+# Url of the route returning the recorded timings in the Prometheus text
+# format, like `/_metrics`. The route is not added when this is not set
+METRICS_ROUTE = None
+
+# Add a `Server-Timing` header with the time spent in each stage to the
+# responses of the views
+SERVER_TIMING_HEADERS = False
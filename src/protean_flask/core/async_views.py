@@ -0,0 +1,139 @@
+""" Module exposing the resource views with `async def` handlers
+
+Flask runs views synchronously, so the coroutine of an async handler is run
+to completion on a new event loop in the thread handling the request.
+Handlers await the blocking use cases, which run in a bounded thread pool with
+the context of the request, so that a handler can run several of them at once::
+
+    class DashboardResource(AsyncGenericAPIResource):
+        async def get(self):
+            dogs, humans = await asyncio.gather(
+                self.process_request(ListDogsUsecase, ...),
+                self.process_request(ListHumansUsecase, ...))
+            ...
+
+This lowers the latency of the handlers that await several use cases, at the
+cost of the threads of the pool: it does not serve more requests with the same
+number of threads, see `benchmarks/bench_async.py`.
+
+The views also work when the app is served by an ASGI server through an
+adapter like `asgiref.wsgi.WsgiToAsgi`, as these run the app in threads
+without an event loop of their own.
+"""
+import asyncio
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from flask import _app_ctx_stack
+from flask import _request_ctx_stack
+from protean.conf import active_config
+from protean.context import context
+
+from .connections import release_connections
+from .context import get_request_details
+from .context import set_request_details
+from .views import APIResource
+from .views import GenericAPIResource
+
+# Thread pool created from the `ASYNC_POOL_SIZE` config, on first use
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """ Return the thread pool running the blocking use cases """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=active_config.ASYNC_POOL_SIZE,
+                    thread_name_prefix='protean-flask')
+    return _executor
+
+
+def shutdown_executor():
+    """ Shutdown the thread pool once its tasks are done, so that it is
+    created again with the current configuration
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def run_coroutine(func, *args, **kwargs):
+    """ Call the coroutine function and run it to completion on a new event
+    loop, which is closed once it is done
+    """
+    return asyncio.run(func(*args, **kwargs))
+
+
+def with_request_context(func):
+    """ Wrap the function to be called from another thread with the app,
+    request and Protean context of the current request, so that it shares
+    its `flask.g`. The connections borrowed by the function are given back
+    when it returns.
+    """
+    app_context = _app_ctx_stack.top
+    request_context = _request_ctx_stack.top
+    details = get_request_details()
+
+    def wrapper(*args, **kwargs):
+        # The contexts are pushed as they are, as pushing them again would
+        #   run their teardown when they are popped in this thread
+        _app_ctx_stack.push(app_context)
+        _request_ctx_stack.push(request_context)
+        if details is not None:
+            set_request_details(details)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            try:
+                release_connections()
+            finally:
+                context.cleanup()
+                _request_ctx_stack.pop()
+                _app_ctx_stack.pop()
+
+    return wrapper
+
+
+class AsyncAPIResource(APIResource):
+    """ Resource view whose handlers can be `async def` methods, which await
+    the blocking work with :meth:`run_sync`
+    """
+
+    def _lookup_method(self):
+        """ Lookup the handler, running coroutine functions to completion """
+        meth = super()._lookup_method()
+        if inspect.iscoroutinefunction(meth):
+            return partial(run_coroutine, meth)
+        return meth
+
+    async def run_sync(self, func, *args, **kwargs):
+        """ Run the blocking function in the thread pool, with the context of
+        the request, and return its result
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_executor(), partial(with_request_context(func), *args, **kwargs))
+
+
+class AsyncGenericAPIResource(AsyncAPIResource, GenericAPIResource):
+    """ Generic resource view whose `async def` handlers await the use cases
+    with :meth:`process_request`
+    """
+
+    async def process_request(self, usecase_cls, request_object_cls, payload,
+                              many=False, no_serialization=False):
+        """ Process the request by running the Protean Tasklet in the thread
+        pool, see :meth:`GenericAPIResource._process_request`
+        """
+        return await self.run_sync(
+            self._process_request, usecase_cls, request_object_cls, payload,
+            many=many, no_serialization=no_serialization)
@@ -1,22 +1,52 @@
 """Module that defines entry point to the Protean Flask Application"""
-import hashlib
-
 from flask import Blueprint
 from flask import Request
 from flask import current_app
+from flask import json as flask_json
 from flask import request
 from protean.conf import active_config
 from protean.context import context
+from protean.core.exceptions import ConfigurationError
 from protean.core.exceptions import UsecaseExecutionError
 from protean.utils.importlib import perform_import
 
-from ..utils import derive_tenant
+from .async_views import shutdown_executor
+from .cache import reset_response_cache
+from .connections import close_pools
+from .connections import pool_provider_connections
+from .connections import release_connections
+from .context import CONTEXT_LOADERS
+from .context import configure_tenants
+from .context import load_request_context
+from .json_backends import JSONEncoder
+from .metrics import metrics_view
 from .views import APIResource
+from .views import resolve_views
 
 
 class ProteanRequest(Request):
-    """ Custom request object to store protean specific code"""
-    payload = None
+    """ Custom request object to store protean specific code
+
+    The `payload` is loaded on first access by the `payload_loader` set by
+    the view handling the request, unless it is set directly.
+    """
+
+    #: Function returning the payload of the request
+    payload_loader = None
+
+    @property
+    def payload(self):
+        """ Data of the request, loaded on first access """
+        try:
+            return self.__dict__['payload']
+        except KeyError:
+            payload = self.payload_loader() if self.payload_loader else None
+            self.__dict__['payload'] = payload
+            return payload
+
+    @payload.setter
+    def payload(self, value):
+        self.__dict__['payload'] = value
 
 
 class Protean(object):
@@ -38,6 +68,8 @@ class Protean(object):
         self.app = None
         self.blueprint = None
         self.exception_handler = None
+        self.default_renderer = None
+        self.context_keys = frozenset()
         self.viewsets = []
 
         if app_or_bp is not None:
@@ -57,25 +89,79 @@ class Protean(object):
         # Update the request class for the app
         app.request_class = ProteanRequest
 
+        # Use an encoder that handles all the types of entity values
+        if app.json_encoder is flask_json.JSONEncoder:
+            app.json_encoder = JSONEncoder
+
         # Manage the protean information before/after request
         app.before_request(self._load_protean)
-        app.after_request(self._cleanup_protean)
+        app.teardown_request(self._cleanup_protean)
+
+        # Borrow the connections of the repositories from the pools, so that
+        #   they are given back when the requests are torn down
+        pool_provider_connections()
 
         # Register error handlers for the app
         app.register_error_handler(
             UsecaseExecutionError, self._handle_exception)
-        self.exception_handler = perform_import(active_config.EXCEPTION_HANDLER)
+        self._resolve_config()
+
+        # Expose the timings of the requests
+        if active_config.METRICS_ROUTE:
+            app.add_url_rule(active_config.METRICS_ROUTE,
+                             endpoint='protean_metrics',
+                             view_func=metrics_view, methods=['GET'])
 
         # Update the current configuration
         app.config.from_object(active_config)
 
+    def reload_config(self):
+        """Reload the configuration derived from `active_config`
+
+        The exception handler, the default renderer and the renderers and
+        parsers of the registered views are resolved again, and the connection
+        pools, the response cache and the thread pool of the async views are
+        created again.
+        """
+        self._resolve_config()
+        resolve_views()
+        close_pools()
+        reset_response_cache()
+        shutdown_executor()
+
+        if self.blueprint is None and self.app is not None:
+            self.app.config.from_object(active_config)
+
+    def _resolve_config(self):
+        """ Resolve the import strings defined in the configuration """
+        self.exception_handler = perform_import(active_config.EXCEPTION_HANDLER)
+        self.default_renderer = perform_import(active_config.DEFAULT_RENDERER)
+
+        context_keys = frozenset(active_config.CONTEXT_KEYS or ())
+        unknown_keys = context_keys - CONTEXT_LOADERS.keys()
+        if unknown_keys:
+            raise ConfigurationError(
+                f'Unknown context keys {sorted(unknown_keys)} in `CONTEXT_KEYS`')
+        self.context_keys = context_keys
+        configure_tenants()
+
     def register_viewset(self, view, endpoint, url, pk_name='identifier',
-                         pk_type='string', additional_routes=None):
+                         pk_type='string', additional_routes=None,
+                         export=False, bulk=False, batch=False):
         """Register a Viewset
 
         Additional routes (apart from the standard five) can be specified via
             `additional_routes` argument. Note that the route names have to be
             the same as method names
+
+        When `export` is set, an `<url>/export` route streams all the entities
+            as newline delimited JSON
+
+        When `bulk` is set, an `<url>/bulk` route creates, updates or deletes
+            many entities in one request
+
+        When `batch` is set, an `<url>/batch?ids=<id>,<id>` route returns
+            many entities by their identifiers in one request
         """
         # add the custom routes to the app
         if additional_routes is None:
@@ -97,6 +183,18 @@ class Protean(object):
 
         # Make sure that the url ends with a
         url = f'{url}/' if not url.endswith('/') else url
+        if export:
+            self.app.add_url_rule(f'{url}export',
+                                  view_func=view.as_view(f'export_{endpoint}'),
+                                  methods=['GET'])
+        if bulk:
+            self.app.add_url_rule(f'{url}bulk',
+                                  view_func=view.as_view(f'bulk_{endpoint}'),
+                                  methods=['POST', 'PUT', 'DELETE'])
+        if batch:
+            self.app.add_url_rule(f'{url}batch',
+                                  view_func=view.as_view(f'batch_{endpoint}'),
+                                  methods=['GET'])
         self.app.add_url_rule('%s<%s:%s>' % (url, pk_type, pk_name),
                               view_func=view.as_view(f'show_{endpoint}'),
                               methods=['GET'])
@@ -107,40 +205,33 @@ class Protean(object):
                               view_func=view.as_view(f'delete_{endpoint}'),
                               methods=['DELETE'])
 
-    @staticmethod
-    def _load_protean():
-        """ Load the protean context with details from the request"""
-
-        user_agent = request.headers.get('User-Agent', '')
-        hashed_user_agent = hashlib.sha256(user_agent.encode())
-
-        details = {
-            'host_url': request.host_url,
-            'url': request.url,
-            'tenant_id': derive_tenant(request.url),
-            'user_agent': user_agent,
-            'user_agent_hash': hashed_user_agent.hexdigest(),
-            'remote_addr': request.remote_addr
-        }
-        context.set_context(details)
+    def _load_protean(self):
+        """ Load the protean context with details from the request. The
+        details are only computed when they are read from the context.
+        """
+        load_request_context(
+            request._get_current_object(), self.context_keys)
 
     @staticmethod
-    def _cleanup_protean(response):
-        """ Cleanup the context and connections on end of request"""
-        context.cleanup()
-        # FIXME Close Open Connections
-        return response
+    def _cleanup_protean(exc):
+        """ Cleanup the context and connections on end of request, which is
+        after a streamed response has been sent, even if it failed
+        """
+        try:
+            release_connections()
+        finally:
+            context.cleanup()
 
     def _handle_exception(self, e):
         """ Handle Protean exceptions and return appropriate response """
 
         # Get the renderer from the view class
-        renderer = perform_import(active_config.DEFAULT_RENDERER)
+        renderer = self.default_renderer
         if request.url_rule:
             view_func = current_app.view_functions[request.url_rule.endpoint]
-            view_class = view_func.view_class
-            if issubclass(view_class, APIResource):
-                renderer = getattr(view_class, 'renderer', renderer)
+            view_class = getattr(view_func, 'view_class', None)
+            if view_class and issubclass(view_class, APIResource):
+                renderer = view_class._renderer_func or renderer
 
         # If user has defined an exception handler then call that
         if self.exception_handler:
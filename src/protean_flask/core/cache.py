@@ -0,0 +1,142 @@
+""" Module for caching the responses of the read endpoints
+
+The cache backend is any implementation of the Protean `BaseCache`
+interface, configured with the `RESPONSE_CACHE` config. The default backend
+is an in-process LRU cache with expiry.
+"""
+import threading
+import time
+from collections import OrderedDict
+from collections import defaultdict
+
+from protean.conf import active_config
+from protean.core.cache import DEFAULT_EXPIRY
+from protean.core.cache import BaseCache
+from protean.core.exceptions import ConfigurationError
+from protean.utils.importlib import perform_import
+
+
+class LRUCache(BaseCache):
+    """ Thread-safe in-process cache, which drops the least recently used
+    entries once it holds `MAX_ENTRIES` of them. Values are stored as they
+    are, without being copied.
+    """
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.max_entries = int(params.get('MAX_ENTRIES', 1000))
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_entry(self, key):
+        """ Return the `(value, expiry)` entry of the key, if not expired """
+        entry = self._cache.get(key)
+        if entry is not None and \
+                entry[1] is not None and entry[1] <= time.time():
+            del self._cache[key]
+            entry = None
+        return entry
+
+    def _set(self, key, value, expiry):
+        self._cache[key] = value, self.get_backend_expiry(expiry)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def add(self, key, value, expiry=DEFAULT_EXPIRY):
+        key = self.make_key(key)
+        with self._lock:
+            if self._get_entry(key) is not None:
+                return False
+            self._set(key, value, expiry)
+            return True
+
+    def get(self, key, default=None):
+        key = self.make_key(key)
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry is None:
+                return default
+            self._cache.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, expiry=DEFAULT_EXPIRY):
+        key = self.make_key(key)
+        with self._lock:
+            self._set(key, value, expiry)
+
+    def touch(self, key, expiry=DEFAULT_EXPIRY):
+        key = self.make_key(key)
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry is None:
+                return False
+            self._cache[key] = entry[0], self.get_backend_expiry(expiry)
+            return True
+
+    def delete(self, key):
+        key = self.make_key(key)
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def has_key(self, key):
+        key = self.make_key(key)
+        with self._lock:
+            return self._get_entry(key) is not None
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+class CacheStats:
+    """ Counters of the use of the response cache, per namespace """
+
+    def __init__(self):
+        self.counters = defaultdict(
+            lambda: {'hits': 0, 'misses': 0, 'invalidations': 0})
+        self.lock = threading.Lock()
+
+    def incr(self, namespace, counter):
+        """ Increment a counter of the namespace """
+        with self.lock:
+            self.counters[namespace][counter] += 1
+
+    def snapshot(self):
+        """ Return a copy of the counters, keyed by namespace """
+        with self.lock:
+            return {
+                namespace: dict(counters)
+                for namespace, counters in self.counters.items()}
+
+    def clear(self):
+        """ Reset all the counters """
+        with self.lock:
+            self.counters.clear()
+
+
+# Counters of the response cache of all the views
+cache_stats = CacheStats()
+
+# Backend built from the `RESPONSE_CACHE` config, on first use
+_backend = None
+
+
+def get_response_cache():
+    """ Return the backend of the response cache """
+    global _backend
+    if _backend is None:
+        params = dict(active_config.RESPONSE_CACHE or {})
+        try:
+            backend_cls = perform_import(params.pop('PROVIDER'))
+        except (KeyError, ImportError) as exc:
+            raise ConfigurationError(
+                f'Invalid `PROVIDER` in the `RESPONSE_CACHE` config: {exc}')
+        _backend = backend_cls(params)
+    return _backend
+
+
+def reset_response_cache():
+    """ Drop the backend, so that it is built again from the config """
+    global _backend
+    _backend = None
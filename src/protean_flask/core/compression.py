@@ -0,0 +1,221 @@
+""" Module for compressing the responses of the views
+
+The encoding is negotiated with the `Accept-Encoding` header of the request,
+in the order of preference of the `COMPRESSION_ENCODINGS` config. Encodings
+whose library is not installed are skipped, `gzip` is always available.
+"""
+import logging
+import zlib
+
+from protean.conf import active_config
+
+logger = logging.getLogger('protean_flask.compression')
+
+
+class BaseCompressor:
+    """ Interface for compressing a response body incrementally """
+
+    name = None
+
+    # Level used when the encoding has none in the `COMPRESSION_LEVELS` config
+    default_level = None
+
+    def compress(self, data):
+        """ Compress `data` and return the output available so far """
+        raise NotImplementedError
+
+    def flush(self):
+        """ Return the pending output, so that the client can decompress all
+        the data compressed so far
+        """
+        raise NotImplementedError
+
+    def finish(self):
+        """ Return the end of the compressed stream """
+        raise NotImplementedError
+
+
+class GzipCompressor(BaseCompressor):
+    """ Compressor using `zlib` with a gzip container """
+
+    name = 'gzip'
+    default_level = 6
+
+    def __init__(self, level):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliCompressor(BaseCompressor):
+    """ Compressor using `brotli` """
+
+    name = 'br'
+    default_level = 4
+
+    def __init__(self, level):
+        import brotli
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class ZstdCompressor(BaseCompressor):
+    """ Compressor using `zstandard` """
+
+    name = 'zstd'
+    default_level = 3
+
+    def __init__(self, level):
+        import zstandard
+        self.flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(self.flush_mode)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+COMPRESSORS = {
+    compressor_cls.name: compressor_cls for compressor_cls in
+    (GzipCompressor, BrotliCompressor, ZstdCompressor)
+}
+
+# Whether the library of each encoding is installed, checked on first use
+_installed = {}
+
+
+def get_compressor(encoding):
+    """ Return a new compressor for the encoding, at the level set in the
+    `COMPRESSION_LEVELS` config or else at the default level of the encoding.
+    Raises an `ImportError` when the library of the encoding is not installed.
+    """
+    compressor_cls = COMPRESSORS[encoding]
+    level = (active_config.COMPRESSION_LEVELS or {}).get(encoding)
+    if level is None:
+        level = compressor_cls.default_level
+    return compressor_cls(level)
+
+
+def is_installed(encoding):
+    """ Return whether the responses can be compressed with the encoding """
+    try:
+        return _installed[encoding]
+    except KeyError:
+        if encoding not in COMPRESSORS:
+            raise ValueError(f'Unknown compression encoding `{encoding}`')
+
+        try:
+            get_compressor(encoding)
+            _installed[encoding] = True
+        except ImportError:
+            logger.debug(f'Compression encoding `{encoding}` is not installed')
+            _installed[encoding] = False
+        return _installed[encoding]
+
+
+def negotiate_encoding(accept_encodings):
+    """ Return the most preferred encoding of the `Accept-Encoding` header of
+    the request, or `None` when the response must not be compressed
+    """
+    encoding = None
+    best_quality = 0
+    for name in active_config.COMPRESSION_ENCODINGS:
+        quality = accept_encodings[name]
+        if quality > best_quality and is_installed(name):
+            encoding, best_quality = name, quality
+    return encoding
+
+
+def encode_etag(etag, encoding):
+    """ Return the ETag of a body compressed with the encoding, from the
+    ETag of the uncompressed body
+    """
+    return f'{etag}-{encoding}'
+
+
+def match_etag(etags, etag, weak=False):
+    """ Return the ETag of the `ETags` of a request matching `etag` or one
+    of its compressed variants, or `None`. The ETags are compared strongly,
+    as for `If-Match`, unless `weak` is set, as for `If-None-Match`.
+    """
+    contains = etags.contains_weak if weak else etags.contains
+    if contains(etag):
+        return etag
+
+    for encoding in COMPRESSORS:
+        candidate = encode_etag(etag, encoding)
+        if contains(candidate):
+            return candidate
+    return None
+
+
+def _compress_stream(chunks, compressor):
+    """ Compress the chunks of a streamed body one at a time """
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_response(response, accept_encodings):
+    """ Compress the response with the encoding negotiated with the
+    `Accept-Encoding` header of the request.
+
+    Only successful responses of the `COMPRESSION_MIMETYPES` are compressed,
+    when their body is at least `COMPRESSION_MIN_SIZE` bytes. Streamed
+    responses are compressed one chunk at a time, whatever their size. The
+    ETag of a compressed response gets the encoding as a suffix, as the body
+    is no longer the one it was computed from.
+    """
+    status = response.status_code
+    if not 200 <= status < 300 or status == 204 or \
+            'Content-Encoding' in response.headers or \
+            response.mimetype not in active_config.COMPRESSION_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    compressor = get_compressor(encoding)
+    if response.is_streamed:
+        response.response = _compress_stream(
+            response.iter_encoded(), compressor)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < active_config.COMPRESSION_MIN_SIZE:
+            return response
+
+        compressed = compressor.compress(data) + compressor.finish()
+        if len(compressed) >= len(data):
+            return response
+        response.set_data(compressed)
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(encode_etag(etag, encoding), weak=weak)
+    return response
@@ -0,0 +1,217 @@
+""" Module for managing the database connections used by requests
+
+A request borrows a connection of a provider from a bounded pool the first
+time it asks for one, and gives it back when the request is torn down. The
+threads running the use cases of an async handler borrow their own, which
+they give back when they are done. Once
+`pool_provider_connections` has been called, which `Protean.init_app` does,
+this includes the connections that the Protean repositories ask their
+provider for.
+"""
+import threading
+import time
+from functools import wraps
+
+from flask import g
+from flask import has_request_context
+from protean.conf import active_config
+from protean.core.exceptions import UsecaseExecutionError
+from protean.core.provider import providers
+from protean.core.transport import Status
+
+
+class ConnectionPool:
+    """ Bounded pool of the connections of a provider
+
+    :param provider: the provider opening and closing the connections
+    :param size: the maximum number of connections open at once
+    :param timeout: the seconds to wait for a connection when all of them
+        are in use
+    """
+
+    def __init__(self, provider, size, timeout):
+        self.provider = provider
+        self.size = size
+        self.timeout = timeout
+
+        self.idle = []
+        self.opened = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+        # Usage counters
+        self.borrowed = 0
+        self.returned = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    def borrow(self):
+        """ Return an idle connection, opening a new one when there are none
+        and the pool is not full. Raises a `UsecaseExecutionError` when no
+        connection is available in time.
+        """
+        with self.condition:
+            if not self.idle and self.opened >= self.size:
+                self.waits += 1
+                deadline = time.monotonic() + self.timeout
+                while not self.idle and self.opened >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise UsecaseExecutionError(
+                            (Status.SYSTEM_ERROR,
+                             {'message': 'No database connection is available'}))
+                    self.condition.wait(remaining)
+
+            self.borrowed += 1
+            if self.idle:
+                return self.idle.pop()
+            self.opened += 1
+
+        try:
+            return open_connection(self.provider)
+        except Exception:
+            with self.condition:
+                self.opened -= 1
+                self.condition.notify()
+            raise
+
+    def give_back(self, conn):
+        """ Return a borrowed connection to the pool. The connection is closed
+        if the pool has been closed meanwhile.
+        """
+        with self.condition:
+            self.returned += 1
+            if not self.closed:
+                self.idle.append(conn)
+                self.condition.notify()
+                return
+            self.opened -= 1
+
+        self.provider.close_connection(conn)
+
+    def close(self):
+        """ Close the idle connections of the pool, and the borrowed ones
+        when they are given back
+        """
+        with self.condition:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self.opened -= len(idle)
+            self.condition.notify_all()
+
+        for conn in idle:
+            self.provider.close_connection(conn)
+
+    def metrics(self):
+        """ Return the usage counters of the pool """
+        with self.condition:
+            return {
+                'size': self.size,
+                'open': self.opened,
+                'in_use': self.opened - len(self.idle),
+                'idle': len(self.idle),
+                'borrowed': self.borrowed,
+                'returned': self.returned,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+            }
+
+
+# Pools created so far, keyed by the provider name
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(provider_name='default'):
+    """ Return the connection pool of the provider, creating it when needed
+    from the `CONNECTION_POOL_SIZE` and `CONNECTION_POOL_TIMEOUT` config
+    """
+    try:
+        return _pools[provider_name]
+    except KeyError:
+        with _pools_lock:
+            if provider_name not in _pools:
+                _pools[provider_name] = ConnectionPool(
+                    providers.get_provider(provider_name),
+                    active_config.CONNECTION_POOL_SIZE,
+                    active_config.CONNECTION_POOL_TIMEOUT)
+            return _pools[provider_name]
+
+
+def close_pools():
+    """ Close the idle connections of all the pools and forget the pools, so
+    that they are created again with the current configuration
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        pool.close()
+
+
+def pool_metrics():
+    """ Return the usage counters of the pools, keyed by the provider name """
+    return {name: pool.metrics() for name, pool in list(_pools.items())}
+
+
+def get_connection(provider_name='default'):
+    """ Return the connection of the provider for the current request and
+    thread, borrowing one from the pool on first use
+    """
+    connections = g.setdefault('_protean_connections', {}).setdefault(
+        threading.get_ident(), {})
+    try:
+        return connections[provider_name][1]
+    except KeyError:
+        pool = get_pool(provider_name)
+        conn = pool.borrow()
+        connections[provider_name] = pool, conn
+        return conn
+
+
+def release_connections():
+    """ Give the connections borrowed by the current request in the current
+    thread back
+    """
+    connections = g.get('_protean_connections', {}).pop(
+        threading.get_ident(), {})
+    for pool, conn in connections.values():
+        pool.give_back(conn)
+
+
+def open_connection(provider):
+    """ Open a new connection of the provider, without going through the pool
+    of the current request
+    """
+    get_conn = provider.get_connection
+    return getattr(get_conn, '__wrapped__', get_conn)()
+
+
+def pool_provider_connections():
+    """ Make the configured providers return the connection of the current
+    request from `get_connection`, when called during a request, so that the
+    repositories of the use cases share the connection borrowed from the
+    pool instead of opening their own. Outside of requests the providers
+    open new connections as before.
+    """
+    for provider_name in active_config.DATABASES:
+        provider = providers.get_provider(provider_name)
+        if hasattr(provider.get_connection, '__wrapped__'):
+            continue
+
+        provider.get_connection = _pooled(
+            provider_name, provider.get_connection)
+
+
+def _pooled(provider_name, open_conn):
+    """ Wrap the `get_connection` method of a provider to use the pool """
+
+    @wraps(open_conn)
+    def get_pooled_connection():
+        if has_request_context():
+            return get_connection(provider_name)
+        return open_conn()
+
+    return get_pooled_connection
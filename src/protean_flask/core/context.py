@@ -0,0 +1,112 @@
+""" Module for loading the details of the request into the Protean context
+
+The details are computed only when they are first read from the context, so
+that requests which do not use the context pay close to nothing for it.
+"""
+import hashlib
+from functools import lru_cache
+
+from protean.conf import active_config
+from protean.context import context
+
+from ..utils import TenantResolver
+
+
+@lru_cache(maxsize=1024)
+def hash_user_agent(user_agent):
+    """ Return the SHA-256 hex digest of the user agent """
+    return hashlib.sha256(user_agent.encode()).hexdigest()
+
+
+# Resolver of the tenants, built from the config by `configure_tenants`
+tenant_resolver = TenantResolver()
+
+
+def configure_tenants():
+    """ Build the tenant resolver from the `TENANT_MAPPING` config """
+    global tenant_resolver
+    tenant_resolver = TenantResolver(
+        active_config.TENANT_MAPPING, active_config.TENANT_CACHE_SIZE)
+
+
+def resolve_tenant(req):
+    """ Return the tenant of the request, from its `host` header """
+    return tenant_resolver.resolve(req.host)
+
+
+# Functions computing the value of each context key from the request
+CONTEXT_LOADERS = {
+    'host_url': lambda req: req.host_url,
+    'url': lambda req: req.url,
+    'tenant_id': resolve_tenant,
+    'user_agent': lambda req: req.headers.get('User-Agent', ''),
+    'user_agent_hash': lambda req: hash_user_agent(
+        req.headers.get('User-Agent', '')),
+    'remote_addr': lambda req: req.remote_addr,
+}
+
+
+class RequestDetails(dict):
+    """ Storage of the context for a request, which computes the value of
+    an enabled key from the request on first access
+    """
+
+    def __init__(self, req, keys):
+        super().__init__()
+        self.request = req
+        self.keys_enabled = keys
+
+    def __missing__(self, key):
+        if key not in self.keys_enabled:
+            raise KeyError(key)
+
+        value = self[key] = CONTEXT_LOADERS[key](self.request)
+        return value
+
+
+def _context_storage():
+    """ Return the storage of the Protean context, a dict of the values of
+    each thread, and the key of the current thread in it.
+
+    Protean has no public API to load a lazy mapping into its context, as
+    `context.set_context` reads every value, so the internals of its `Local`
+    are used instead. It is the copy of werkzeug's `Local` shipped with
+    Protean 0.0.11, which keeps the values in `__storage__` keyed by
+    `__ident_func__()` like werkzeug up to 1.0 does, while werkzeug 2.0
+    moved to context variables. Both Protean and werkzeug are pinned in
+    `setup.py` for this reason.
+    """
+    local_context = context.local_context
+    return local_context.__storage__, local_context.__ident_func__()
+
+
+def load_request_context(req, keys):
+    """ Load the context of the current thread with the lazily computed
+    details of the request `req`
+
+    :param keys: the context keys to make available, among `CONTEXT_LOADERS`
+    """
+    storage, ident = _context_storage()
+
+    details = RequestDetails(req, keys)
+    # Keep the values set in the context by someone else
+    for key, value in storage.get(ident, {}).items():
+        if key not in keys:
+            details[key] = value
+    storage[ident] = details
+
+
+def get_request_details():
+    """ Return the context of the current thread, to share it with another
+    thread handling part of the same request
+    """
+    storage, ident = _context_storage()
+    return storage.get(ident)
+
+
+def set_request_details(details):
+    """ Use the context returned by `get_request_details` in the current
+    thread. It is removed by the cleanup of the context.
+    """
+    storage, ident = _context_storage()
+    storage[ident] = details
@@ -0,0 +1,285 @@
+""" Module for defining the JSON encoding and decoding backends
+
+The backend is selected with the `JSON_BACKEND` config. Backends that are not
+installed fall back to the standard library backend.
+"""
+import codecs
+import decimal
+import json
+import logging
+
+from flask import current_app
+from flask import json as flask_json
+from protean.conf import active_config
+
+logger = logging.getLogger('protean_flask.json')
+
+# Marker for the position of the streamed list in a document
+_ITEMS_PLACEHOLDER = '\x00protean-flask-items\x00'
+
+# Characters skipped between the tokens of a JSON document
+_WHITESPACE = ' \t\n\r'
+
+
+class JSONEncoder(flask_json.JSONEncoder):
+    """ Flask JSON encoder that also serializes `Decimal` values """
+
+    def default(self, o):
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        return super().default(o)
+
+
+def _default():
+    """ Return the function serializing the types unknown to a fast backend,
+    which is the one used by the JSON encoder of the app
+    """
+    return current_app.json_encoder().default
+
+
+class BaseJSONBackend:
+    """ Interface for encoding and decoding JSON documents """
+
+    name = None
+
+    def dumps(self, data):
+        """ Serialize `data` to a UTF-8 encoded JSON document """
+        raise NotImplementedError
+
+    def loads(self, data):
+        """ Deserialize a JSON document from `str` or `bytes`. Raises a
+        `ValueError` if the document is not valid JSON
+        """
+        raise NotImplementedError
+
+    def iter_dumps(self, data, key, chunks):
+        """ Serialize `data` incrementally, with the list under `key` built
+        from the `chunks` iterable of lists. Only one chunk is encoded at a
+        time, and the output is the same as encoding the whole document.
+        """
+        document = self.dumps({**data, key: _ITEMS_PLACEHOLDER})
+        head, tail = document.split(self.dumps(_ITEMS_PLACEHOLDER), 1)
+
+        yield head + b'['
+        separator = b''
+        for chunk in chunks:
+            if chunk:
+                # Strip the brackets of the encoded list
+                yield separator + self.dumps(chunk)[1:-1]
+                separator = b','
+        yield b']' + tail
+
+
+class StdlibJSONBackend(BaseJSONBackend):
+    """ Backend using the JSON encoder and decoder of the Flask app """
+
+    name = 'stdlib'
+
+    def dumps(self, data):
+        indent = None
+        separators = (',', ':')
+        if current_app.config['JSONIFY_PRETTYPRINT_REGULAR'] or \
+                current_app.debug:
+            indent = 2
+            separators = (', ', ': ')
+
+        return flask_json.dumps(
+            data, indent=indent, separators=separators).encode('utf-8')
+
+    def loads(self, data):
+        return flask_json.loads(data)
+
+    def iter_dumps(self, data, key, chunks):
+        # Pretty printed chunks cannot be joined, so encode the whole list
+        if current_app.config['JSONIFY_PRETTYPRINT_REGULAR'] or \
+                current_app.debug:
+            items = [item for chunk in chunks for item in chunk]
+            yield self.dumps({**data, key: items})
+        else:
+            yield from super().iter_dumps(data, key, chunks)
+
+
+class OrjsonJSONBackend(BaseJSONBackend):
+    """ Backend using `orjson`. Dates are passed through to the encoder of
+    the app so that they are formatted the same way as the stdlib backend.
+    Documents that `orjson` cannot encode, like those with integers above 64
+    bits, are encoded with the stdlib backend.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+
+    def dumps(self, data):
+        option = (self.orjson.OPT_PASSTHROUGH_DATETIME |
+                  self.orjson.OPT_NON_STR_KEYS)
+        if current_app.config['JSON_SORT_KEYS']:
+            option |= self.orjson.OPT_SORT_KEYS
+
+        try:
+            return self.orjson.dumps(data, default=_default(), option=option)
+        except self.orjson.JSONEncodeError:
+            return StdlibJSONBackend().dumps(data)
+
+    def loads(self, data):
+        return self.orjson.loads(data)
+
+
+def _decimals_to_str(value):
+    """ Return the value with the `Decimal` values in its dicts and lists
+    converted to strings. Only the containers holding a `Decimal` are copied.
+    """
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+
+    if isinstance(value, dict):
+        converted = None
+        for key, item in value.items():
+            new_item = _decimals_to_str(item)
+            if new_item is not item:
+                if converted is None:
+                    converted = dict(value)
+                converted[key] = new_item
+        return value if converted is None else converted
+
+    if isinstance(value, (list, tuple)):
+        items = [_decimals_to_str(item) for item in value]
+        if any(new_item is not item for new_item, item in zip(items, value)):
+            return items
+    return value
+
+
+class UjsonJSONBackend(BaseJSONBackend):
+    """ Backend using `ujson`. It encodes `Decimal` values as numbers without
+    calling the encoder of the app, so they are converted to strings first,
+    the way the stdlib backend encodes them.
+    """
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self.ujson = ujson
+
+    def dumps(self, data):
+        return self.ujson.dumps(
+            _decimals_to_str(data), default=_default(),
+            escape_forward_slashes=False,
+            sort_keys=current_app.config['JSON_SORT_KEYS'],
+            ensure_ascii=current_app.config['JSON_AS_ASCII']).encode('utf-8')
+
+    def loads(self, data):
+        return self.ujson.loads(data)
+
+
+BACKENDS = {
+    backend_cls.name: backend_cls for backend_cls in
+    (StdlibJSONBackend, OrjsonJSONBackend, UjsonJSONBackend)
+}
+
+# Order of preference of the backends when `JSON_BACKEND` is `auto`. `ujson`
+#   is left out, as converting the `Decimal` values makes it slower than the
+#   stdlib backend.
+AUTO_BACKENDS = ('orjson', 'stdlib')
+
+# Backends instantiated so far, keyed by the configured name
+_backends = {}
+
+
+def _load_backend(name):
+    """ Instantiate the backend with this name, falling back to the stdlib
+    backend when it is not installed
+    """
+    names = AUTO_BACKENDS if name == 'auto' else (name, )
+    for backend_name in names:
+        if backend_name not in BACKENDS:
+            raise ValueError(f'Unknown JSON backend `{backend_name}`')
+
+        try:
+            return BACKENDS[backend_name]()
+        except ImportError:
+            logger.debug(f'JSON backend `{backend_name}` is not installed')
+
+    logger.warning(
+        f'JSON backend `{name}` is not installed, using `stdlib` instead')
+    return StdlibJSONBackend()
+
+
+def get_json_backend():
+    """ Return the JSON backend selected by the `JSON_BACKEND` config """
+    name = active_config.JSON_BACKEND or 'stdlib'
+    try:
+        return _backends[name]
+    except KeyError:
+        backend = _backends[name] = _load_backend(name)
+        return backend
+
+
+def iter_json_array(chunks):
+    """ Decode a JSON array from the `chunks` iterable of UTF-8 encoded
+    `bytes`, and yield its items as soon as they are complete. Only the chunks
+    holding the current item are kept in memory. Raises a `ValueError` if the
+    document is not a valid JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    # Token expected next: `[`, an item or `]`, an item, `,` or `]`, the end
+    state = 'start'
+
+    for chunk, final in _with_final(chunks):
+        buffer += text_decoder.decode(chunk, final)
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                break
+
+            char = buffer[position]
+            if state == 'start':
+                if char != '[':
+                    raise ValueError('Expecting a JSON array')
+                state = 'first'
+                position += 1
+            elif state in ('first', 'separator') and char == ']':
+                state = 'end'
+                position += 1
+            elif state == 'separator':
+                if char != ',':
+                    raise ValueError(f'Expecting `,` at character {position}')
+                state = 'item'
+                position += 1
+            elif state in ('first', 'item'):
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except ValueError:
+                    if final:
+                        raise
+                    break
+
+                # A number may go on in the next chunk, unless it is followed
+                #   by a delimiter
+                if not final and (end == len(buffer) or
+                                  buffer[end] not in _WHITESPACE + ',]'):
+                    break
+                yield item
+                state = 'separator'
+                position = end
+            else:
+                raise ValueError(f'Extra data at character {position}')
+        buffer = buffer[position:]
+
+    if state != 'end':
+        raise ValueError('Unterminated JSON array')
+
+
+def _with_final(chunks):
+    """ Yield the chunks with whether each is the last one, followed by an
+    empty last chunk
+    """
+    for chunk in chunks:
+        yield chunk, False
+    yield b'', True
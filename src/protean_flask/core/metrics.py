@@ -0,0 +1,151 @@
+""" Module for recording the time spent in each stage of the requests
+
+The timings are recorded per endpoint into in-process histograms, which can
+be exposed in the Prometheus text format.
+"""
+import threading
+from bisect import bisect_left
+
+from flask import current_app
+from protean.conf import active_config
+
+from .cache import cache_stats
+from .connections import pool_metrics
+
+# Stages of the requests, in the order they run
+STAGES = ('parse', 'usecase', 'serialize', 'render', 'total')
+
+
+class Histogram:
+    """ Histogram of durations with fixed bucket bounds, in seconds """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        # The last count is for the values above all the bounds
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """ Record a duration """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        """ Return `(upper bound, count)` pairs with the number of values less
+        than or equal to each bound, as reported by Prometheus
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + ('+Inf', ), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+def stage_order(stage):
+    """ Return the sort key of the stage, custom stages coming after the
+    known ones in alphabetical order
+    """
+    if stage in STAGES:
+        return STAGES.index(stage), stage
+    return len(STAGES), stage
+
+
+class RequestTimings(dict):
+    """ Seconds spent in each stage of a request. The time is added under a
+    lock, as the use cases of async handlers run in several threads at once.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        """ Add the seconds to the timing of the stage """
+        with self.lock:
+            self[stage] = self.get(stage, 0) + seconds
+
+
+class StageMetrics:
+    """ Histograms of the timings of each stage, keyed by endpoint """
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def observe(self, endpoint, timings):
+        """ Record the timings of a request, a dict of seconds per stage """
+        with self.lock:
+            for stage, value in timings.items():
+                try:
+                    histogram = self.histograms[endpoint, stage]
+                except KeyError:
+                    histogram = self.histograms[endpoint, stage] = Histogram(
+                        active_config.METRICS_BUCKETS)
+                histogram.observe(value)
+
+    def clear(self):
+        """ Forget all the recorded timings """
+        with self.lock:
+            self.histograms.clear()
+
+    def render_prometheus(self):
+        """ Return the histograms in the Prometheus text format """
+        name = 'protean_flask_stage_duration_seconds'
+        lines = [
+            f'# HELP {name} Time spent in each stage of the requests.',
+            f'# TYPE {name} histogram',
+        ]
+        with self.lock:
+            histograms = sorted(
+                self.histograms.items(),
+                key=lambda item: (item[0][0], stage_order(item[0][1])))
+
+            for (endpoint, stage), histogram in histograms:
+                labels = f'endpoint="{endpoint}",stage="{stage}"'
+                for bound, count in histogram.cumulative_counts():
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+        pools = pool_metrics()
+        if pools:
+            name = 'protean_flask_connection_pool'
+            lines.append(f'# HELP {name} Usage of the connection pools.')
+            lines.append(f'# TYPE {name} gauge')
+            for provider_name, metrics in sorted(pools.items()):
+                for metric, value in metrics.items():
+                    lines.append(
+                        f'{name}{{provider="{provider_name}",metric="{metric}"}} {value}')
+
+        caches = cache_stats.snapshot()
+        if caches:
+            name = 'protean_flask_response_cache_total'
+            lines.append(f'# HELP {name} Use of the response cache.')
+            lines.append(f'# TYPE {name} counter')
+            for namespace, counters in sorted(caches.items()):
+                for counter, value in counters.items():
+                    lines.append(
+                        f'{name}{{namespace="{namespace}",result="{counter}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+# Timings of the requests handled by the views of the app
+stage_metrics = StageMetrics()
+
+
+def format_server_timing(timings):
+    """ Return the value of the `Server-Timing` header for the timings """
+    return ', '.join(
+        f'{stage};dur={timings[stage] * 1000:.3f}'
+        for stage in sorted(timings, key=stage_order))
+
+
+def metrics_view():
+    """ View returning the recorded timings in the Prometheus text format """
+    return current_app.response_class(
+        stage_metrics.render_prometheus(),
+        mimetype='text/plain; version=0.0.4')
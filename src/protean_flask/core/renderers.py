@@ -1,12 +1,50 @@
 """ Module for defining the response Renderers """
-from flask import jsonify
-from flask import make_response
+from itertools import chain
+
+from flask import current_app
+from flask import stream_with_context
+
+from .json_backends import get_json_backend
 
 
 def render_json(data, code, headers):
     """ Render the response as a JSON """
 
-    resp = make_response(jsonify(data), code)
+    body = get_json_backend().dumps(data) + b'\n'
+    resp = current_app.response_class(
+        body, code, mimetype=current_app.config['JSONIFY_MIMETYPE'])
+    resp.headers.extend(headers or {})
+
+    return resp
+
+
+def stream_json(data, key, chunks, code, headers):
+    """ Render the response as a JSON streamed to the client, with the list
+    under `key` built from the `chunks` iterable of lists
+    """
+
+    body = chain(get_json_backend().iter_dumps(data, key, chunks), (b'\n', ))
+    resp = current_app.response_class(
+        stream_with_context(body), code,
+        mimetype=current_app.config['JSONIFY_MIMETYPE'])
+    resp.headers.extend(headers or {})
+
+    return resp
+
+
+def stream_ndjson(chunks, code, headers):
+    """ Render the items of the `chunks` iterable of lists as newline
+    delimited JSON streamed to the client
+    """
+    backend = get_json_backend()
+
+    def lines():
+        for chunk in chunks:
+            if chunk:
+                yield b''.join(backend.dumps(item) + b'\n' for item in chunk)
+
+    resp = current_app.response_class(
+        stream_with_context(lines()), code, mimetype='application/x-ndjson')
     resp.headers.extend(headers or {})
 
     return resp
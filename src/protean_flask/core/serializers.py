@@ -1,11 +1,208 @@
 """This module holds the generic definitions of Serializer"""
-
+import inspect
+import threading
 from collections import OrderedDict
+from collections import defaultdict
+from functools import partial
 
 import marshmallow as ma
+from protean.conf import active_config
 from protean.core import field
 from protean.core.entity import Entity
 from protean.core.exceptions import ConfigurationError
+from protean.core.field.association import Association
+from protean.core.field.association import HasOne
+from protean.core.field.utils import fetch_entity_cls_from_registry
+from protean.core.repository import ResultSet
+
+
+def _clone_field(field_obj):
+    """ Shallow copy a marshmallow field, the same way `Field.__deepcopy__`
+    does, without going through the `copy` protocol
+    """
+    clone = field_obj.__class__.__new__(field_obj.__class__)
+    clone.__dict__.update(field_obj.__dict__)
+    return clone
+
+
+# Condition under which the value `v` of a field is dumped as it is, for the
+#   marshmallow fields that compiled dump functions handle. Other values are
+#   converted by the field.
+_DUMPED_AS_IS = {
+    ma.fields.String: 'v is None or v.__class__ is str',
+    ma.fields.Integer: 'v is None or v.__class__ is int',
+    ma.fields.Float: 'v is None or v.__class__ is float',
+    ma.fields.Boolean: 'v is None or v is True or v is False',
+    ma.fields.List: 'v is None',
+    ma.fields.Dict: 'v is None or v.__class__ is dict',
+}
+
+
+def _convert_value(field_obj, attr, obj, value):
+    """ Convert the value of a field the way marshmallow does """
+    if callable(value):
+        value = value()
+    return field_obj._serialize(value, attr, obj)
+
+
+def _fetch_all(query):
+    """ Return all the entities matching the query, fetched in batches of
+    `PREFETCH_BATCH_SIZE`
+    """
+    batch_size = active_config.PREFETCH_BATCH_SIZE
+    entities = []
+    while True:
+        results = query.offset(len(entities)).limit(batch_size).all()
+        entities.extend(results.items)
+        if not results.has_next or not results.items:
+            return entities
+
+
+def _prefetch_references(entities, reference):
+    """ Load the entity referenced by each entity, and return them """
+    attribute = reference.get_attribute_name()
+    linked = reference.linked_attribute
+    pending = [
+        entity for entity in entities if not reference.is_cached(entity)]
+
+    values = {getattr(entity, attribute) for entity in pending}
+    values.discard(None)
+    related = {}
+    if values:
+        query = reference.to_cls.query.filter(**{f'{linked}__in': list(values)})
+        for obj in _fetch_all(query):
+            related[getattr(obj, linked)] = obj
+
+    for entity in pending:
+        reference.set_cached_value(
+            entity, related.get(getattr(entity, attribute)))
+    return list(related.values())
+
+
+def _prefetched_query(association, linked, value, objs):
+    """ Return the query that the lazy lookup of a has many association
+    returns, with its first page of results taken from `objs`
+    """
+    query = association.to_cls.query.filter(**{linked: value})
+    query._result_cache = ResultSet(
+        offset=query._offset, limit=query._limit, total=len(objs),
+        items=objs[:query._limit])
+    return query
+
+
+def _prefetch_associated(entities, association):
+    """ Load the entities associated with each entity, and return those that
+    are set on them. Has many associations are set to the same query as the
+    lazy lookup, with its first page of results loaded.
+    """
+    entity_cls = type(entities[0])
+    if isinstance(association.to_cls, str):
+        association.to_cls = fetch_entity_cls_from_registry(
+            association.to_cls)
+
+    id_field = entity_cls.meta_.id_field.field_name
+    linked = association._linked_attribute(entity_cls)
+    pending = [
+        entity for entity in entities if not association.is_cached(entity)]
+
+    groups = defaultdict(list)
+    if pending:
+        query = association.to_cls.query.filter(**{
+            f'{linked}__in': list({
+                getattr(entity, id_field) for entity in pending})})
+        for obj in _fetch_all(query):
+            groups[getattr(obj, linked)].append(obj)
+
+    related = []
+    for entity in pending:
+        identifier = getattr(entity, id_field)
+        objs = groups.get(identifier)
+        # Same as the lazy lookup, which returns `None` when empty
+        if not objs:
+            value = None
+        elif isinstance(association, HasOne):
+            value = objs[0]
+            related.append(value)
+        else:
+            value = _prefetched_query(association, linked, identifier, objs)
+            related.extend(value.items)
+        association.set_cached_value(entity, value)
+    return related
+
+
+def prefetch_associations(entities, paths):
+    """ Load the associations of the entities with one repository query per
+    association, instead of one per entity, so that serializing them does not
+    query the repositories again.
+
+    :param entities: list of entities of the same class
+    :param paths: names of the associations, followed by the names of the
+        associations of the associated entities after a dot, like
+        `dogs.owner`
+    """
+    if not entities:
+        return
+
+    nested = OrderedDict()
+    for path in paths:
+        name, _, rest = path.partition('.')
+        nested.setdefault(name, [])
+        if rest:
+            nested[name].append(rest)
+
+    entity_cls = type(entities[0])
+    for name, rest in nested.items():
+        association = inspect.getattr_static(entity_cls, name, None)
+        if isinstance(association, field.Reference):
+            related = _prefetch_references(entities, association)
+        elif isinstance(association, Association):
+            related = _prefetch_associated(entities, association)
+        else:
+            raise ConfigurationError(
+                f'`{name}` is not an association of `{entity_cls.__name__}`')
+
+        if rest:
+            prefetch_associations(related, rest)
+
+
+class CompiledCache:
+    """ Thread-safe mapping of compiled objects, which drops the least
+    recently used entries once it holds `SERIALIZER_CACHE_SIZE` of them, as
+    the keys may come from the fields selected by clients
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """ Return the value of the key, marking it as recently used """
+        with self.lock:
+            try:
+                self.entries.move_to_end(key)
+            except KeyError:
+                return default
+            return self.entries[key]
+
+    def set(self, key, value):
+        """ Set the value of the key, dropping the oldest entries """
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > active_config.SERIALIZER_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """ Drop all the entries """
+        with self.lock:
+            self.entries.clear()
+
+
+# Marker of the keys missing from a `CompiledCache`
+_MISSING = object()
 
 
 class BaseSerializer(ma.Schema):
@@ -17,10 +214,22 @@ class EntitySerializerOpts(ma.schema.SchemaOpts):
     def __init__(self, meta):
         super().__init__(meta)
         self.entity_cls = getattr(meta, 'entity', None)
+        self.prefetch = getattr(meta, 'prefetch', ())
+        self.compiled_dump = getattr(meta, 'compiled_dump', False)
 
 
 class EntitySerializer(BaseSerializer):
-    """Serializer which uses Entity class to automatically infer fields."""
+    """Serializer which uses Entity class to automatically infer fields.
+
+    The associations listed in the `prefetch` argument, or in the `prefetch`
+    option of the `Meta`, are loaded for all the dumped entities at once.
+
+    With the `compiled_dump` option of the `Meta`, entities are dumped by a
+    function generated for the fields of the serializer, when they are all
+    plain `String`, `Boolean`, `Integer`, `Float`, `List` and `Dict` fields.
+    The output is the same as marshmallow's, which is used for any other
+    field or option, and for entities that cannot be dumped without errors.
+    """
 
     OPTIONS_CLASS = EntitySerializerOpts
 
@@ -33,8 +242,18 @@ class EntitySerializer(BaseSerializer):
         field.Dict: ma.fields.Dict
     }
 
-    def __init__(self, *args, **kwargs):
+    # Entity fields compiled per serializer class and construction options.
+    #   Each entry holds a snapshot of the entity's declared fields, used to
+    #   invalidate the entry, and the compiled marshmallow fields.
+    _compiled_fields = CompiledCache()
+
+    # Dump functions compiled per serializer class and fields, or `None` when
+    #   the fields need marshmallow
+    _compiled_dumps = CompiledCache()
+
+    def __init__(self, *args, prefetch=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.prefetch = self.opts.prefetch if prefetch is None else prefetch
 
         # Updates the declared fields with the fields of the Entity class
         if not self.opts.entity_cls or not \
@@ -42,19 +261,140 @@ class EntitySerializer(BaseSerializer):
             raise ConfigurationError(
                 '`Meta.entity` option must be set and a subclass of `Entity`.')
 
+        # Clone the compiled fields, as marshmallow binds them to the instance
+        for field_name, field_obj in self.get_compiled_fields().items():
+            self.declared_fields[field_name] = _clone_field(field_obj)
+
+        # Bind the fields now, so that the first dump does not have to when
+        #   all the fields are known upfront
+        self._update_fields(many=self.many)
+        if all(field_name in self.declared_fields
+               for field_name in self.fields):
+            self._types_seen.add(list if self.many else self.opts.entity_cls)
+
+    def dump(self, obj, many=None, **kwargs):
+        """ Serialize the entities, after loading the associations to prefetch
+        that are serialized
+        """
+        many = self.many if many is None else bool(many)
+        if self.prefetch:
+            if many:
+                obj = list(obj)
+            prefetch_associations(obj if many else [obj], [
+                path for path in self.prefetch
+                if path.partition('.')[0] in self.fields])
+
+        if self.opts.compiled_dump and obj is not None:
+            dump_entity = self.get_compiled_dump()
+            if dump_entity is not None:
+                if many:
+                    obj = list(obj)
+                result = self._dump_compiled(dump_entity, obj, many)
+                if result is not None:
+                    return ma.MarshalResult(result, {})
+
+        return super().dump(obj, many=many, **kwargs)
+
+    @staticmethod
+    def _dump_compiled(dump_entity, obj, many):
+        """ Dump the entities with the compiled function, returning `None`
+        when marshmallow has to dump them instead
+        """
+        entities = obj if many else [obj]
+        if not all(isinstance(entity, Entity) for entity in entities):
+            return None
+
+        try:
+            if many:
+                return [dump_entity(entity) for entity in entities]
+            return dump_entity(obj)
+        except Exception:
+            # Let marshmallow report the errors
+            return None
+
+    def get_compiled_dump(self):
+        """ Return the function dumping an entity with the fields of this
+        serializer, compiling it when not already cached. `None` is returned
+        when the fields or options of the serializer need marshmallow.
+        """
+        key = (self.__class__, tuple(self.fields), self.ordered,
+               frozenset(self.load_only))
+        dump_entity = self._compiled_dumps.get(key, _MISSING)
+        if dump_entity is _MISSING:
+            dump_entity = self._compile_dump()
+            self._compiled_dumps.set(key, dump_entity)
+        return dump_entity
+
+    def _compile_dump(self):
+        """ Generate the source of the dump function for the fields of this
+        serializer, and return the function
+        """
+        if self._has_processors or self.prefix or self.extra or \
+                self.__accessor__ is not None or \
+                type(self).get_attribute is not ma.Schema.get_attribute:
+            return None
+
+        namespace = {'missing': ma.utils.missing, 'dict_class': self.dict_class}
+        lines = [
+            'def dump_entity(obj):',
+            '    item = dict_class()',
+        ]
+        for index, (field_name, field_obj) in enumerate(self.fields.items()):
+            if field_obj.load_only:
+                continue
+
+            attr = field_obj.attribute or field_name
+            if type(field_obj) not in _DUMPED_AS_IS or \
+                    field_name not in self.declared_fields or \
+                    field_obj.default is not ma.utils.missing or \
+                    '.' in attr or getattr(field_obj, 'as_string', False):
+                return None
+
+            convert = f'convert_{index}'
+            namespace[convert] = partial(_convert_value, field_obj, attr)
+            lines.extend([
+                f'    v = getattr(obj, {attr!r}, missing)',
+                '    if v is not missing:',
+                f'        item[{field_obj.dump_to or field_name!r}] = (',
+                f'            v if {_DUMPED_AS_IS[type(field_obj)]}',
+                f'            else {convert}(obj, v))',
+            ])
+        lines.append('    return item')
+
+        exec('\n'.join(lines), namespace)
+        return namespace['dump_entity']
+
+    def get_compiled_fields(self):
+        """ Return the entity fields for this serializer, building them only
+        when not already cached for the class and options
+        """
+        declared_fields = self.opts.entity_cls.meta_.declared_fields
+        snapshot = tuple(declared_fields.items())
+        key = (self.__class__,
+               None if self.only is None else frozenset(self.only),
+               frozenset(self.exclude))
+
+        cached = self._compiled_fields.get(key)
+        if cached and cached[0] == snapshot:
+            return cached[1]
+
         entity_fields = OrderedDict()
-        for field_name, field_obj in \
-                self.opts.entity_cls.meta_.declared_fields.items():
+        for field_name, field_obj in snapshot:
             if self.opts.fields and field_name not in self.opts.fields:
                 continue
             elif self.opts.exclude and field_name in self.opts.exclude:
                 continue
+            elif self.only is not None and field_name not in self.only:
+                continue
+            elif field_name in self.exclude:
+                continue
             elif isinstance(field_obj, field.Reference):
                 continue
-            elif field_name not in self.declared_fields:
+            elif field_name not in self._declared_fields:
                 entity_fields[field_name] = self.build_field(field_obj)
 
-        self.declared_fields.update(entity_fields)
+        self._compiled_fields.set(key, (snapshot, entity_fields))
+        return entity_fields
 
     def build_field(self, field_obj):
         """ Map the Entity field to a Marshmallow field """
@@ -1,4 +1,13 @@
 """This module exposes the Base Resource View for all Application Views"""
+import base64
+import hashlib
+import json
+import uuid
+from contextlib import nullcontext
+from functools import lru_cache
+from http import HTTPStatus
+from itertools import chain
+from time import perf_counter
 
 import inflect
 from flask import Response
@@ -6,6 +15,9 @@ from flask import current_app
 from flask import request
 from flask.views import MethodView
 from protean.conf import active_config
+from protean.core.cache import DEFAULT_EXPIRY
+from protean.core.exceptions import UsecaseExecutionError
+from protean.core.exceptions import ValidationError
 from protean.core.tasklet import Tasklet
 from protean.core.transport import Status
 from protean.core.usecase import CreateRequestObject
@@ -19,20 +31,111 @@ from protean.core.usecase import ShowUseCase
 from protean.core.usecase import UpdateRequestObject
 from protean.core.usecase import UpdateUseCase
 from protean.utils import inflection
+from protean.utils.generic import fully_qualified_name
 from protean.utils.importlib import perform_import
+from werkzeug.http import generate_etag
 from werkzeug.http import parse_options_header
+from werkzeug.http import quote_etag
 
 from protean_flask.utils import immutable_dict_2_dict
 
+from .cache import cache_stats
+from .cache import get_response_cache
+from .compression import compress_response
+from .compression import match_etag
+from .compression import negotiate_encoding
+from .context import resolve_tenant
+from .json_backends import get_json_backend
+from .json_backends import iter_json_array
+from .metrics import RequestTimings
+from .metrics import format_server_timing
+from .metrics import stage_metrics
+from .renderers import stream_json
+from .renderers import stream_ndjson
+
 INFLECTOR = inflect.engine()
 
+# Size, in bytes, of the chunks in which large request bodies are read
+READ_CHUNK_SIZE = 64 * 1024
+
+
+# Count modes of lists, by the values of the `count` query argument
+COUNT_MODES = {
+    'true': 'exact',
+    'exact': 'exact',
+    'false': 'none',
+    'none': 'none',
+    'estimate': 'estimate',
+}
+
+# Methods of the requests that invalidate the cached responses of a view
+WRITE_METHODS = frozenset(('POST', 'PUT', 'PATCH', 'DELETE'))
+
+
+@lru_cache(maxsize=None)
+def underscore(name):
+    """ Return the underscored form of a class name, memoized """
+    return inflection.underscore(name)
+
+
+@lru_cache(maxsize=None)
+def pluralize(name):
+    """ Return the plural form of a resource name, memoized """
+    return INFLECTOR.plural(name)
+
 
 class APIResource(MethodView):
     """The base resource view that allows defining custom methods other than
     the standard five REST routes. Also handles rendering the output to json.
 
+    The `renderer` and `parser` can be set as callables or import strings, and
+    are resolved once when the view is registered with :meth:`as_view`.
     """
 
+    #: Renderer for the responses, defaults to the `DEFAULT_RENDERER` config
+    renderer = None
+
+    #: Custom parser to be run after the payload has been loaded
+    parser = None
+
+    # Callables resolved from the `renderer` and `parser` of this view
+    _renderer_func = None
+    _parser_func = None
+
+    # Whether the timings of the stages are recorded, resolved from the
+    # `METRICS_ENABLED` and `SERVER_TIMING_HEADERS` config
+    _timed = False
+
+    #: Seconds spent in each stage of the request, when they are recorded
+    timings = None
+
+    #: Compress the responses with the encoding accepted by the client,
+    #: defaults to the `COMPRESSION_ENABLED` config
+    compress_responses = None
+
+    #: Maximum size, in bytes, of the request bodies, defaults to the
+    #: `MAX_BODY_SIZE` config
+    max_body_size = None
+
+    @classmethod
+    def as_view(cls, name, *class_args, **class_kwargs):
+        """ Resolve the renderer and parser before creating the view """
+        cls.resolve()
+        return super().as_view(name, *class_args, **class_kwargs)
+
+    @classmethod
+    def resolve(cls):
+        """ Resolve the renderer and parser of this view to callables """
+        renderer = perform_import(
+            cls.renderer or active_config.DEFAULT_RENDERER)
+        cls._renderer_func = staticmethod(renderer)
+
+        parser = perform_import(cls.parser)
+        cls._parser_func = staticmethod(parser) if parser else None
+
+        cls._timed = bool(active_config.METRICS_ENABLED or
+                          active_config.SERVER_TIMING_HEADERS)
+
     def _lookup_method(self):
         """ Lookup the class method to be called for this request"""
         func = request.url_rule.rule.rsplit('/', 1)[-1]
@@ -52,45 +155,168 @@ class APIResource(MethodView):
         return meth
 
     def parse_payload(self):
-        """ Load the data from form, json and query to `request.payload` """
+        """ Prepare the loading of the data from form, json and query to
+        `request.payload`. Request bodies larger than the max body size are
+        rejected with a 413 error before anything else.
+
+        With the `ProteanRequest` class the data is only loaded on the first
+        access of `request.payload`, so that handlers which do not use it do
+        not pay for it. It is loaded at once when the view has a custom
+        parser, which is run right after.
+        """
+        if request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
+            self.check_body_size(request.content_length)
+
+        if self._parser_func or not hasattr(request, 'payload_loader'):
+            request.payload = self.load_payload()
+        else:
+            request.payload_loader = self._load_payload_lazily
+
+        # If a customer parser is defined then run that
+        if self._parser_func:
+            self._parser_func()
+
+    def load_payload(self):
+        """ Return the data loaded from form, json and query. JSON bodies
+        that cannot be decoded are rejected with a 400 error.
+        """
 
         # Parse the request content based on the content type
         content_type = (request.content_type or
                         active_config.DEFAULT_CONTENT_TYPE)
         mime_type, _ = parse_options_header(content_type)
 
-        if request.method in ['POST', 'PUT', 'PATCH']:
+        if request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
             if mime_type == 'application/x-www-form-urlencoded':
-                request.payload = immutable_dict_2_dict(request.form)
+                return immutable_dict_2_dict(request.form)
             elif mime_type == 'multipart/form-data':
-                request.payload = immutable_dict_2_dict(request.form)
-                request.payload.update(
-                    immutable_dict_2_dict(request.files))
+                payload = immutable_dict_2_dict(request.form)
+                return immutable_dict_2_dict(request.files, into=payload)
             elif mime_type == 'application/json':
-                request.payload = request.get_json(
-                    force=True, silent=True) or {}
+                return self._load_json()
 
         elif request.method == 'GET':
-            request.payload = immutable_dict_2_dict(request.args)
+            return immutable_dict_2_dict(request.args)
 
-        # If a customer parser is defined then run that
-        parser = getattr(self, 'parser', None)
-        if parser:
-            parser = perform_import(parser)
-            parser()
+        return None
+
+    def _load_payload_lazily(self):
+        """ Load the data on the first access of `request.payload`, adding
+        the time spent to the parse stage
+        """
+        start = perf_counter()
+        try:
+            return self.load_payload()
+        finally:
+            self.record_timing('parse', start)
+
+    def get_max_body_size(self):
+        """ Return the maximum size of the request bodies, or `None` """
+        if self.max_body_size is not None:
+            return self.max_body_size
+        return active_config.MAX_BODY_SIZE
+
+    def get_max_json_items(self):
+        """ Return the maximum number of items of the JSON arrays sent in the
+        request body, or `None` when they are not limited
+        """
+        return None
+
+    def check_body_size(self, size):
+        """ Fail with a 413 error when `size` is above the max body size.
+        Protean has no status for it, so the `http.HTTPStatus` one is used.
+        """
+        max_size = self.get_max_body_size()
+        if size is not None and max_size is not None and size > max_size:
+            raise UsecaseExecutionError(
+                (HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                 {'payload': f'must not be larger than {max_size} bytes'}))
+
+    def _load_json(self):
+        """ Decode the JSON request body with the configured backend, or an
+        empty dict when there is no body.
+
+        Bodies of unknown size or of at least `JSON_STREAM_MIN_SIZE` bytes
+        are read in chunks, so that their size is checked as they are read,
+        and the items of JSON arrays are decoded one chunk at a time. These
+        bodies are not cached on the request.
+        """
+        length = request.content_length
+        if length is not None and length < active_config.JSON_STREAM_MIN_SIZE:
+            data = request.get_data(cache=True)
+            if not data:
+                return {}
+
+            try:
+                payload = get_json_backend().loads(data)
+            except ValueError:
+                raise self._invalid_json_error() from None
+            self._check_json_items(payload)
+            return payload
+
+        chunks = self._iter_body()
+        first = next(chunks, b'')
+        if not first.strip():
+            # Skip the leading whitespace, up to the first token
+            for first in chunks:
+                if first.strip():
+                    break
+            else:
+                return {}
+
+        if first.lstrip()[:1] != b'[':
+            data = b''.join(chain([first], chunks))
+            try:
+                return get_json_backend().loads(data)
+            except ValueError:
+                raise self._invalid_json_error() from None
+
+        payload = []
+        try:
+            for item in iter_json_array(chain([first], chunks)):
+                payload.append(item)
+                self._check_json_items(payload)
+        except ValueError:
+            raise self._invalid_json_error() from None
+        return payload
+
+    def _iter_body(self):
+        """ Yield the request body in chunks, failing with a 413 error as soon
+        as it is larger than the max body size
+        """
+        size = 0
+        while True:
+            chunk = request.stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            size += len(chunk)
+            self.check_body_size(size)
+            yield chunk
+
+    def _check_json_items(self, payload):
+        """ Fail with a 422 error when the payload is a list with more items
+        than allowed
+        """
+        max_items = self.get_max_json_items()
+        if max_items is not None and isinstance(payload, list) and \
+                len(payload) > max_items:
+            raise UsecaseExecutionError(
+                (Status.UNPROCESSABLE_ENTITY,
+                 {'payload': f'must not have more than {max_items} items'}))
+
+    @staticmethod
+    def _invalid_json_error():
+        """ Return the 400 error of a request body that is not valid JSON """
+        return UsecaseExecutionError(
+            (Status.PARAMETERS_ERROR, {'payload': 'is not valid JSON'}))
 
     def render_response(self, response):
         """ Render the response to the expected format """
 
-        # Get the renderer to be used for this view
-        renderer = getattr(self, 'renderer', None)
-        if not renderer:
-            renderer = perform_import(active_config.DEFAULT_RENDERER)
-
         # Perform rendering only for non Flask Responses
         if not isinstance(response, current_app.response_class):
             data, code, headers = self._unpack_response(response)
-            response = renderer(data, code, headers)
+            response = self._renderer_func(data, code, headers)
 
         return response
 
@@ -114,8 +340,17 @@ class APIResource(MethodView):
 
         return value, 200, {}
 
+    def record_timing(self, stage, start):
+        """ Add the time elapsed since `start` to the timing of the stage,
+        when the timings are recorded
+        """
+        if self.timings is not None:
+            self.timings.add(stage, perf_counter() - start)
+
     def dispatch_request(self, *args, **kwargs):
         """Dispatch the request to the correct function"""
+        if self._timed:
+            return self._dispatch_timed(*args, **kwargs)
 
         # Lookup method defined for this resource
         meth = self._lookup_method()
@@ -126,6 +361,42 @@ class APIResource(MethodView):
         # Call the method and create the response
         response = meth(*args, **kwargs)
         final_response = self.render_response(response)
+        if self.uses_compression():
+            final_response = compress_response(
+                final_response, request.accept_encodings)
+        return final_response
+
+    def uses_compression(self):
+        """ Return whether the responses of this view are compressed """
+        if self.compress_responses is None:
+            return active_config.COMPRESSION_ENABLED
+        return self.compress_responses
+
+    def _dispatch_timed(self, *args, **kwargs):
+        """ Dispatch the request, recording the time spent in each stage """
+        start = perf_counter()
+        self.timings = RequestTimings()
+        try:
+            meth = self._lookup_method()
+            self.parse_payload()
+            self.record_timing('parse', start)
+
+            response = meth(*args, **kwargs)
+
+            render_start = perf_counter()
+            final_response = self.render_response(response)
+            if self.uses_compression():
+                final_response = compress_response(
+                    final_response, request.accept_encodings)
+            self.record_timing('render', render_start)
+        finally:
+            self.record_timing('total', start)
+            if active_config.METRICS_ENABLED:
+                stage_metrics.observe(request.endpoint, self.timings)
+
+        if active_config.SERVER_TIMING_HEADERS:
+            final_response.headers['Server-Timing'] = \
+                format_server_timing(self.timings)
         return final_response
 
 
@@ -136,6 +407,73 @@ class GenericAPIResource(APIResource):
     entity_cls = None
     serializer_cls = None
 
+    #: Key of the entity in the responses, defaults to the underscored name
+    #: of the entity class
+    resource_name = None
+
+    #: Key of the list of entities in the responses, defaults to the plural
+    #: of `resource_name`
+    resource_name_plural = None
+
+    #: Stream list responses in chunks, defaults to the
+    #: `STREAM_LIST_RESPONSES` config. Streamed responses are always JSON,
+    #: the `renderer` of the view is not used for them.
+    stream_list = None
+
+    #: Number of items serialized per chunk, defaults to the
+    #: `STREAM_CHUNK_SIZE` config
+    stream_chunk_size = None
+
+    #: Number of entities fetched per batch when exporting, defaults to the
+    #: `EXPORT_BATCH_SIZE` config
+    export_batch_size = None
+
+    #: Add strong ETags to the responses of GET requests and handle the
+    #: `If-None-Match` and `If-Match` headers, defaults to the `USE_ETAGS`
+    #: config
+    use_etags = None
+
+    #: Field of the entity that changes on every update, like a version
+    #: number. When set, the ETag of an entity is derived from it instead of
+    #: from the rendered response, and the entity is not serialized when the
+    #: client already has it.
+    etag_field = None
+
+    #: Pagination of the lists, `page` or `cursor`, defaults to the
+    #: `PAGINATION` config. Cursors are opaque strings that are returned as
+    #: `next_cursor` and passed back in the `cursor` query argument.
+    pagination = None
+
+    #: Unique field that lists are sorted by with cursor pagination, defaults
+    #: to the identifier of the entity
+    cursor_field = None
+
+    #: Total of the list responses, `exact`, `none` to leave it out, or
+    #: `estimate`, defaults to the `LIST_COUNT_MODE` config. Requests can
+    #: select it with the `count` query argument.
+    count_mode = None
+
+    #: Fields that clients can select with the `fields` query argument of
+    #: GET requests, defaults to all the fields of the serializer
+    allowed_fields = None
+
+    #: Associations of the entities to load at once before serializing them,
+    #: see `EntitySerializer`. Defaults to the `prefetch` of the serializer.
+    prefetch = None
+
+    #: Cache the responses of GET and HEAD requests with the `RESPONSE_CACHE`
+    #: backend, until a POST, PUT, PATCH or DELETE request to a view of the
+    #: same `cache_namespace` succeeds
+    cache_responses = False
+
+    #: Seconds that responses are cached for, defaults to the expiry of the
+    #: cache backend
+    cache_expiry = None
+
+    #: Views sharing a namespace invalidate each other's cached responses,
+    #: defaults to the name of the view class
+    cache_namespace = None
+
     def get_entity_cls(self):
         """
         Return the class to use for the serializer.
@@ -149,12 +487,20 @@ class GenericAPIResource(APIResource):
             )
         return self.entity_cls
 
+    def get_resource_names(self):
+        """ Return the singular and plural keys of the entity in responses """
+        resource = self.resource_name or \
+            underscore(self.get_entity_cls().__name__)
+        return resource, self.resource_name_plural or pluralize(resource)
+
     def get_serializer(self, *args, **kwargs):
         """
         Return the serializer instance that should be used for validating and
         de-serializing input, and for serializing output.
         """
         serializer_cls = self.get_serializer_cls()
+        if self.prefetch is not None:
+            kwargs.setdefault('prefetch', self.prefetch)
         serializer = serializer_cls(*args, **kwargs)
         serializer.context = self.get_serializer_context()
         return serializer
@@ -185,17 +531,39 @@ class GenericAPIResource(APIResource):
         """ Process the request by running the Protean Tasklet """
         # Get the schema class and derive resource name
         entity_cls = self.get_entity_cls()
-        resource = inflection.underscore(entity_cls.__name__)
+        resource, plural = self.get_resource_names()
+
+        # Translate the count option and the cursor of the request, leaving
+        #   the selected fields out of the filters. They are kept in locals,
+        #   as the handlers of async views can run several lists at once.
+        count_mode = None
+        descending = False
+        if many:
+            if 'fields' in payload:
+                payload = {
+                    key: value for key, value in payload.items()
+                    if key != 'fields'}
+            payload, count_mode = self.apply_count_mode(payload)
+            if self.uses_cursor():
+                payload = self.apply_cursor(payload)
+                descending = payload['order_by'][0].startswith('-')
 
-        # Get the serializer for this class
+        # Get the serializer for this class, restricted to the fields
+        #   selected by the request
         serializer = None
+        fields = None
         if not no_serialization:
-            serializer = self.get_serializer(many=many)
+            fields = self.get_sparse_fields()
+            serializer = self.get_serializer(many=many, only=fields)
 
         # Run the use case and return the results
-        response_object = Tasklet.perform(
-            entity_cls, usecase_cls, request_object_cls, payload,
-            raise_error=True)
+        start = perf_counter()
+        try:
+            response_object = Tasklet.perform(
+                entity_cls, usecase_cls, request_object_cls, payload,
+                raise_error=True)
+        finally:
+            self.record_timing('usecase', start)
 
         # If no serialization is set just return the response object
         if no_serialization:
@@ -207,18 +575,539 @@ class GenericAPIResource(APIResource):
 
         # Serialize the results and return the response
         if many:
+            result = self.get_list_envelope(
+                response_object.value, plural, count_mode, descending)
+            if self.is_streamed():
+                return self._stream_items(
+                    serializer, response_object.value.items, result, plural,
+                    response_object.code.value)
+
+            start = perf_counter()
             items = serializer.dump(response_object.value.items)
-            page = int(response_object.value.offset / response_object.value.limit) + 1
-            result = {
-                INFLECTOR.plural(resource): items.data,
-                'total': response_object.value.total,
-                'page': page
-            }
+            self.record_timing('serialize', start)
+            result[plural] = items.data
             return result, response_object.code.value
 
         else:
+            headers = {}
+            if self.etag_field and self.uses_etags():
+                etag = self.entity_etag(response_object.value, fields)
+                if request.method == 'GET':
+                    matched = match_etag(
+                        request.if_none_match, etag, weak=True)
+                    if matched:
+                        return self._not_modified(matched)
+                headers['ETag'] = quote_etag(etag)
+
+            start = perf_counter()
             result = serializer.dump(response_object.value)
-            return {resource: result.data}, response_object.code.value
+            self.record_timing('serialize', start)
+            return {resource: result.data}, response_object.code.value, headers
+
+    def get_list_envelope(self, results, key, count_mode='exact',
+                          descending=False):
+        """ Return the envelope of a list response, with the items to be set
+        under `key`.
+
+        With page pagination the envelope depends on the `count_mode`:
+            exact: `{<key>: [...], "total": <int>, "page": <int>}`
+            none: `{<key>: [...], "page": <int>, "has_more": <bool>}`
+            estimate: `{<key>: [...], "total": <int>,
+                "total_estimated": true, "page": <int>, "has_more": <bool>}`
+        and with cursor pagination it is
+            `{<key>: [...], "next_cursor": <string or null>}`
+        where `descending` is the order of the list.
+        """
+        if self.uses_cursor():
+            return {key: None,
+                    'next_cursor': self.encode_cursor(results, descending)}
+
+        page = int(results.offset / results.limit) + 1
+        if count_mode == 'exact':
+            return {key: None, 'total': results.total, 'page': page}
+
+        envelope = {key: None, 'page': page, 'has_more': results.has_next}
+        if count_mode == 'estimate':
+            envelope['total'] = self.estimate_total(results)
+            envelope['total_estimated'] = True
+        return envelope
+
+    def apply_count_mode(self, payload):
+        """ Select the count mode of the list from the `count` argument of
+        the request, or from `count_mode`, and return the payload without it
+        along with the count mode
+        """
+        count_mode = self.count_mode or active_config.LIST_COUNT_MODE
+        if 'count' not in payload:
+            return payload, count_mode
+
+        payload = dict(payload)
+        count = str(payload.pop('count')).lower()
+        try:
+            count_mode = COUNT_MODES[count]
+        except KeyError:
+            raise UsecaseExecutionError(
+                (Status.UNPROCESSABLE_ENTITY, {'count': 'is invalid'}))
+        return payload, count_mode
+
+    def estimate_total(self, results):
+        """ Return the estimated number of entities matching the list request.
+
+        Protean repositories count the entities when fetching a page, so this
+        returns that count. Override it to use a cheaper estimate, like the
+        statistics of the database.
+        """
+        return results.total
+
+    def uses_cursor(self):
+        """ Return whether lists are paginated with cursors """
+        return (self.pagination or active_config.PAGINATION) == 'cursor'
+
+    def get_cursor_field(self):
+        """ Return the field that lists are sorted and paginated by """
+        return self.cursor_field or \
+            self.get_entity_cls().meta_.id_field.field_name
+
+    def apply_cursor(self, payload):
+        """ Return a copy of the list payload, sorted by the cursor field and
+        filtered to the items after the `cursor` of the request
+        """
+        field = self.get_cursor_field()
+        payload = dict(payload)
+        payload.pop('page', None)
+
+        order_by = payload.pop('order_by', [])
+        if isinstance(order_by, str):
+            order_by = [order_by]
+        if list(order_by) not in ([], [field], [f'-{field}']):
+            raise UsecaseExecutionError((
+                Status.UNPROCESSABLE_ENTITY,
+                {'order_by': f'must be `{field}` or `-{field}` with cursors'}))
+        descending = list(order_by) == [f'-{field}']
+        payload['order_by'] = [f'-{field}' if descending else field]
+
+        cursor = payload.pop('cursor', None)
+        if cursor:
+            try:
+                cursor_descending, value = json.loads(
+                    base64.urlsafe_b64decode(cursor.encode()))
+                value = self.load_cursor_value(value)
+            except (ValueError, TypeError, ValidationError):
+                cursor_descending, value = None, None
+            if cursor_descending is not descending:
+                raise UsecaseExecutionError(
+                    (Status.UNPROCESSABLE_ENTITY, {'cursor': 'is invalid'}))
+            payload.update(self.get_keyset_filter(value, descending))
+
+        return payload
+
+    def get_keyset_filter(self, value, descending=False):
+        """ Return the filter of the entities after `value` of the cursor
+        field, in `descending` order or not
+        """
+        lookup = 'lt' if descending else 'gt'
+        return {f'{self.get_cursor_field()}__{lookup}': value}
+
+    def encode_cursor(self, results, descending=False):
+        """ Return the cursor of the page after the results, sorted in
+        `descending` order or not, or `None` when this is the last page
+        """
+        if not results.has_next or not results.items:
+            return None
+
+        value = getattr(results.items[-1], self.get_cursor_field())
+        return base64.urlsafe_b64encode(json.dumps(
+            [descending, value], default=str).encode()).decode()
+
+    def load_cursor_value(self, value):
+        """ Cast the value decoded from a cursor to the type of the cursor
+        field. Values that JSON cannot represent, like dates, decimals or
+        UUIDs, are encoded in cursors as strings.
+        """
+        field_obj = self.get_entity_cls().meta_.declared_fields.get(
+            self.get_cursor_field())
+        if field_obj is None:
+            return value
+        return field_obj._load(value)
+
+    def _process_bulk(self, usecase_cls, request_object_cls, payloads,
+                      atomic=False, identifiers=False):
+        """ Process the use case once for each of the payloads, and return the
+        result of each as a list. Payloads that are not objects, or not
+        identifiers when `identifiers` is set, fail with a 422 result.
+
+        When `atomic` is set the use cases are run in the unit of work of the
+        view, and the request fails at the first payload that cannot be
+        processed. Atomic requests are rejected when the view has no unit of
+        work.
+        """
+        if not isinstance(payloads, list):
+            raise UsecaseExecutionError(
+                (Status.UNPROCESSABLE_ENTITY, {'payload': 'must be a list'}))
+
+        max_items = active_config.BULK_MAX_ITEMS
+        if len(payloads) > max_items:
+            raise UsecaseExecutionError(
+                (Status.UNPROCESSABLE_ENTITY,
+                 {'payload': f'must not have more than {max_items} items'}))
+
+        unit_of_work = nullcontext()
+        if atomic:
+            unit_of_work = self.unit_of_work()
+            if unit_of_work is None:
+                raise UsecaseExecutionError(
+                    (Status.UNPROCESSABLE_ENTITY,
+                     {'atomic': 'is not supported by this resource'}))
+
+        entity_cls = self.get_entity_cls()
+        resource, _ = self.get_resource_names()
+        serializer = self.get_serializer()
+
+        results = []
+        with unit_of_work:
+            for index, payload in enumerate(payloads):
+                errors = self._bulk_item_errors(payload, identifiers)
+                if errors:
+                    if atomic:
+                        raise UsecaseExecutionError(
+                            (Status.UNPROCESSABLE_ENTITY,
+                             dict(errors, index=index)))
+                    results.append(errors)
+                    continue
+
+                if identifiers:
+                    payload = {'identifier': payload}
+                response_object = Tasklet.perform(
+                    entity_cls, usecase_cls, request_object_cls, payload)
+
+                if not response_object.success:
+                    if atomic:
+                        raise UsecaseExecutionError(
+                            (response_object.code,
+                             dict(response_object.value, index=index)))
+                    results.append(response_object.value)
+                elif response_object.code == Status.SUCCESS_WITH_NO_CONTENT:
+                    results.append({'code': response_object.code.value})
+                else:
+                    results.append({
+                        'code': response_object.code.value,
+                        resource: serializer.dump(response_object.value).data
+                    })
+
+        return {'results': results}, Status.SUCCESS.value
+
+    @staticmethod
+    def _bulk_item_errors(payload, identifiers):
+        """ Return the 422 result of an item of a bulk request that is not an
+        object, or not an identifier when `identifiers` is set
+        """
+        if identifiers:
+            if isinstance(payload, bool) or \
+                    not isinstance(payload, (str, int)):
+                return {'code': Status.UNPROCESSABLE_ENTITY.value,
+                        'message': {'identifier': 'is invalid'}}
+        elif not isinstance(payload, dict):
+            return {'code': Status.UNPROCESSABLE_ENTITY.value,
+                    'message': {'payload': 'must be an object'}}
+        return None
+
+    def _process_batch(self, usecase_cls, request_object_cls, identifiers):
+        """ Fetch the entities of the identifiers with a single run of the
+        list use case, and return them keyed by identifier. Identifiers that
+        do not match an entity are set to `None`.
+        """
+        if not identifiers:
+            raise UsecaseExecutionError(
+                (Status.UNPROCESSABLE_ENTITY, {'ids': 'is required'}))
+
+        max_items = active_config.BATCH_MAX_ITEMS
+        if len(identifiers) > max_items:
+            raise UsecaseExecutionError(
+                (Status.UNPROCESSABLE_ENTITY,
+                 {'ids': f'must not have more than {max_items} items'}))
+
+        entity_cls = self.get_entity_cls()
+        _, plural = self.get_resource_names()
+        serializer = self.get_serializer(
+            many=True, only=self.get_sparse_fields())
+
+        # Convert the identifiers to the type of the identifier field,
+        #   skipping those that cannot match any entity
+        id_field = entity_cls.meta_.id_field
+        keys = {}
+        for identifier in identifiers:
+            try:
+                keys[id_field._load(identifier)] = identifier
+            except ValidationError:
+                pass
+
+        results = dict.fromkeys(identifiers)
+        if keys:
+            payload = {
+                f'{id_field.field_name}__in': list(keys),
+                'per_page': len(keys),
+            }
+            start = perf_counter()
+            try:
+                entities = Tasklet.perform(
+                    entity_cls, usecase_cls, request_object_cls, payload,
+                    raise_error=True).value.items
+            finally:
+                self.record_timing('usecase', start)
+
+            start = perf_counter()
+            items = serializer.dump(entities).data
+            self.record_timing('serialize', start)
+            for entity, item in zip(entities, items):
+                results[keys[getattr(entity, id_field.field_name)]] = item
+
+        return {plural: results}, Status.SUCCESS.value
+
+    def unit_of_work(self):
+        """ Return the context manager that atomic bulk requests are run in,
+        rolling back the use cases already run when it exits with an error.
+
+        Protean providers do not support transactions yet, so there is none
+        by default and atomic bulk requests are rejected. Override it to run
+        the use cases in a transaction.
+        """
+        return None
+
+    def uses_etags(self):
+        """ Return whether ETags are used by this view """
+        if self.use_etags is None:
+            return active_config.USE_ETAGS
+        return self.use_etags
+
+    def entity_etag(self, entity, fields=None):
+        """ Return the ETag of the entity, from its `etag_field` and the
+        fields selected for the response
+        """
+        value = str(getattr(entity, self.etag_field))
+        if fields is not None:
+            value = f'{value}:{",".join(sorted(fields))}'
+        return generate_etag(value.encode())
+
+    def get_sparse_fields(self):
+        """ Return the fields selected with the comma separated `fields` query
+        argument of a GET request, or `None` to serialize all of them
+        """
+        if request.method not in ('GET', 'HEAD') or \
+                'fields' not in request.args:
+            return None
+
+        fields = frozenset(
+            name.strip() for value in request.args.getlist('fields')
+            for name in value.split(',') if name.strip())
+        allowed = self.allowed_fields
+        if allowed is None:
+            allowed = self.get_serializer_cls()().fields
+
+        invalid = sorted(fields.difference(allowed))
+        if invalid:
+            raise UsecaseExecutionError(
+                (Status.UNPROCESSABLE_ENTITY,
+                 {'fields': f'cannot include {", ".join(invalid)}'}))
+        elif not fields:
+            raise UsecaseExecutionError(
+                (Status.UNPROCESSABLE_ENTITY, {'fields': 'is invalid'}))
+        return fields
+
+    def render_response(self, response):
+        """ Render the response, adding an ETag to the successful responses
+        of GET requests. A 304 is returned instead when the ETag matches the
+        `If-None-Match` header of the request.
+        """
+        response = super().render_response(response)
+
+        if request.method in ('GET', 'HEAD') and \
+                response.status_code == 200 and \
+                not response.is_streamed and self.uses_etags():
+            if 'ETag' not in response.headers:
+                response.add_etag()
+
+            # The client may send the ETag of the compressed response
+            etag, _ = response.get_etag()
+            matched = match_etag(request.if_none_match, etag, weak=True)
+            if matched and matched != etag:
+                return self._not_modified(matched)
+            response.make_conditional(request)
+        return response
+
+    @staticmethod
+    def _not_modified(etag):
+        """ Return the 304 response to a request whose `If-None-Match`
+        header matches the `etag`
+        """
+        return current_app.response_class(
+            status=304, headers={'ETag': quote_etag(etag)})
+
+    def check_precondition(self, identifier):
+        """ Fail with a 412 error when the `If-Match` header of the request
+        does not match the current ETag of the entity
+        """
+        if not request.if_match or not self.uses_etags():
+            return
+
+        usecase_cls = getattr(self, 'show_usecase', ShowUseCase)
+        request_object_cls = getattr(
+            self, 'show_request_object', ShowRequestObject)
+        payload = {'identifier': identifier}
+
+        if self.etag_field:
+            entity = Tasklet.perform(
+                self.get_entity_cls(), usecase_cls, request_object_cls,
+                payload, raise_error=True).value
+            etag = self.entity_etag(entity)
+        else:
+            # Render the entity the way a GET request would
+            data, code, headers = self._unpack_response(self._process_request(
+                usecase_cls, request_object_cls, payload=payload))
+            response = self._renderer_func(data, code, headers)
+            etag = generate_etag(response.get_data())
+
+        if not match_etag(request.if_match, etag):
+            raise UsecaseExecutionError(
+                (HTTPStatus.PRECONDITION_FAILED,
+                 {'If-Match': 'does not match the current entity'}))
+
+    def dispatch_request(self, *args, **kwargs):
+        """ Dispatch the request, using the response cache when enabled """
+        if not self.cache_responses:
+            return super().dispatch_request(*args, **kwargs)
+
+        if request.method in ('GET', 'HEAD'):
+            return self._dispatch_cached(*args, **kwargs)
+
+        response = super().dispatch_request(*args, **kwargs)
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            self.invalidate_cache()
+        return response
+
+    def _dispatch_cached(self, *args, **kwargs):
+        """ Return the cached response of the request, or dispatch the
+        request and cache its response
+        """
+        backend = get_response_cache()
+        namespace = self.get_cache_namespace()
+        key = self.get_cache_key(self._cache_generation(backend, namespace))
+
+        cached = backend.get(key)
+        if cached is not None:
+            cache_stats.incr(namespace, 'hits')
+            response = current_app.response_class(*cached)
+            if self.uses_etags():
+                response.make_conditional(request)
+            return response
+
+        cache_stats.incr(namespace, 'misses')
+        response = super().dispatch_request(*args, **kwargs)
+        if response.status_code == 200 and not response.is_streamed:
+            headers = [
+                header for header in response.headers
+                if header[0] != 'Server-Timing']
+            expiry = self.cache_expiry
+            backend.set(key, (response.get_data(), 200, headers),
+                        DEFAULT_EXPIRY if expiry is None else expiry)
+        return response
+
+    def get_cache_namespace(self):
+        """ Return the namespace of the cached responses of this view """
+        return self.cache_namespace or fully_qualified_name(self.__class__)
+
+    def get_cache_key(self, generation):
+        """ Return the cache key of the response to the current request, from
+        the endpoint, the tenant, the url arguments, the query arguments and
+        the compression encoding. Compressed responses are cached as they
+        are, so that they are not compressed again.
+
+        The tenant is resolved from the host of the request, whether or not
+        `tenant_id` is one of the `CONTEXT_KEYS`.
+        """
+        args = sorted(request.args.lists())
+        view_args = sorted((request.view_args or {}).items())
+        tenant = resolve_tenant(request)
+        encoding = None
+        if self.uses_compression():
+            encoding = negotiate_encoding(request.accept_encodings)
+        digest = hashlib.sha1(repr(
+            (request.endpoint, tenant, view_args, args, encoding)).encode())
+        return f'{self.get_cache_namespace()}:{generation}:{digest.hexdigest()}'
+
+    @staticmethod
+    def _cache_generation(backend, namespace):
+        """ Return the current generation of the cached responses of the
+        namespace. Invalidating the namespace starts a new generation.
+        """
+        key = f'{namespace}:generation'
+        generation = backend.get(key)
+        if generation is None:
+            backend.add(key, uuid.uuid4().hex, expiry=None)
+            generation = backend.get(key)
+        return generation
+
+    def invalidate_cache(self):
+        """ Invalidate the cached responses of the namespace of this view """
+        namespace = self.get_cache_namespace()
+        get_response_cache().set(
+            f'{namespace}:generation', uuid.uuid4().hex, expiry=None)
+        cache_stats.incr(namespace, 'invalidations')
+
+    def is_streamed(self):
+        """ Return True when list responses of this view are streamed """
+        if self.stream_list is None:
+            return active_config.STREAM_LIST_RESPONSES
+        return self.stream_list
+
+    def _stream_items(self, serializer, items, result, key, code):
+        """ Stream the `result` envelope, serializing the `items` placed
+        under `key` one chunk at a time
+        """
+        chunk_size = self.stream_chunk_size or active_config.STREAM_CHUNK_SIZE
+
+        def chunks():
+            for index in range(0, len(items), chunk_size):
+                yield serializer.dump(items[index:index + chunk_size]).data
+
+        return stream_json(result, key, chunks(), code, {})
+
+    def _process_export(self, usecase_cls, request_object_cls, payload):
+        """ Stream all the entities matching the payload as newline delimited
+        JSON, running the list use case for one batch at a time.
+
+        The entities are sorted by the cursor field, like lists paginated with
+        cursors, and each batch is fetched with a filter on the last value of
+        the previous one rather than with an offset. The `order_by` of the
+        request can only reverse that order.
+        """
+        entity_cls = self.get_entity_cls()
+        serializer = self.get_serializer(
+            many=True, only=self.get_sparse_fields())
+        batch_size = self.export_batch_size or active_config.EXPORT_BATCH_SIZE
+
+        payload = {
+            key: value for key, value in payload.items()
+            if key not in ('fields', 'count')}
+        payload = self.apply_cursor(payload)
+        payload['per_page'] = batch_size
+        descending = payload['order_by'][0].startswith('-')
+        field = self.get_cursor_field()
+
+        def fetch(filters):
+            return Tasklet.perform(
+                entity_cls, usecase_cls, request_object_cls,
+                dict(payload, **filters), raise_error=True).value
+
+        def chunks(results):
+            while True:
+                yield serializer.dump(results.items).data
+                if not results.has_next or not results.items:
+                    break
+                results = fetch(self.get_keyset_filter(
+                    getattr(results.items[-1], field), descending))
+
+        # Fetch the first batch upfront so that errors are still rendered
+        return stream_ndjson(chunks(fetch({})), 200, {})
 
 
 class ShowAPIResource(GenericAPIResource):
@@ -275,6 +1164,7 @@ class UpdateAPIResource(GenericAPIResource):
          Expected Parameters:
              identifier = <string>, identifies the entity
         """
+        self.check_precondition(identifier)
         payload = {
             'identifier': identifier,
             'data': request.payload
@@ -294,6 +1184,17 @@ class DeleteAPIResource(GenericAPIResource):
          Expected Parameters:
              identifier = <string>, identifies the entity
         """
+        self.check_precondition(identifier)
         payload = {'identifier': identifier}
         return self._process_request(
             self.usecase_cls, self.request_object_cls, payload=payload)
+
+
+def resolve_views(view_cls=APIResource):
+    """ Re-resolve the renderer and parser of all the registered views,
+    for example after the configuration has been reloaded
+    """
+    for subclass in view_cls.__subclasses__():
+        if '_renderer_func' in subclass.__dict__:
+            subclass.resolve()
+        resolve_views(subclass)
@@ -1,5 +1,6 @@
 """This module exposes a generic Viewset class"""
 from flask import request
+from protean.conf import active_config
 from protean.core.usecase import CreateRequestObject
 from protean.core.usecase import CreateUseCase
 from protean.core.usecase import DeleteRequestObject
@@ -28,6 +29,18 @@ class GenericAPIResourceSet(GenericAPIResource):
     delete_usecase = DeleteUseCase
     delete_request_object = DeleteRequestObject
 
+    #: Run bulk requests in a single unit of work, failing at the first error.
+    #: Needs `unit_of_work` to be overridden.
+    bulk_atomic = False
+
+    def get_max_json_items(self):
+        """ Limit the items of bulk requests to `BULK_MAX_ITEMS`, so that
+        larger requests are rejected while their body is being read
+        """
+        if request.url_rule.rule.rsplit('/', 1)[-1] == 'bulk':
+            return active_config.BULK_MAX_ITEMS
+        return None
+
     def get(self, identifier=None):
         """List the entities or Get by the identifier.
         """
@@ -40,6 +53,27 @@ class GenericAPIResourceSet(GenericAPIResource):
                 self.list_usecase, self.list_request_object,
                 payload=request.payload, many=True)
 
+    def export(self):
+        """Export all the entities as newline delimited JSON.
+        """
+        return self._process_export(
+            self.list_usecase, self.list_request_object,
+            payload=request.payload)
+
+    def batch(self):
+        """Get many entities by their identifiers in one request.
+         Expected Parameters:
+             ids = <string>, comma separated identifiers of the entities
+        The entities are returned keyed by identifier, with `null` for the
+            identifiers that do not match an entity.
+        """
+        identifiers = [
+            identifier.strip() for value in request.args.getlist('ids')
+            for identifier in value.split(',') if identifier.strip()]
+        return self._process_batch(
+            self.list_usecase, self.list_request_object,
+            identifiers=list(dict.fromkeys(identifiers)))
+
     def post(self):
         """Create the entity.
         """
@@ -52,6 +86,7 @@ class GenericAPIResourceSet(GenericAPIResource):
          Expected Parameters:
              identifier = <string>, identifies the entity
         """
+        self.check_precondition(identifier)
         payload = {
             'identifier': identifier,
             'data': request.payload
@@ -64,6 +99,29 @@ class GenericAPIResourceSet(GenericAPIResource):
          Expected Parameters:
              identifier = <string>, identifies the entity
         """
+        self.check_precondition(identifier)
         payload = {'identifier': identifier}
         return self._process_request(
             self.delete_usecase, self.delete_request_object, payload=payload)
+
+    def bulk(self):
+        """Create, update or delete many entities in one request.
+        Expected Payload:
+            POST: list of the entities to create
+            PUT: list of `{"identifier": <string>, "data": <dict>}` objects
+            DELETE: list of identifiers
+        Pass `atomic=true` as a query argument to run all the operations in a
+            single unit of work, when `unit_of_work` is overridden.
+        """
+        if request.method == 'POST':
+            operation = self.create_usecase, self.create_request_object
+        elif request.method == 'PUT':
+            operation = self.update_usecase, self.update_request_object
+        else:
+            operation = self.delete_usecase, self.delete_request_object
+
+        atomic = self.bulk_atomic or \
+            request.args.get('atomic', '').lower() in ('1', 'true')
+        return self._process_bulk(
+            *operation, payloads=request.payload, atomic=atomic,
+            identifiers=request.method == 'DELETE')
@@ -1,17 +1,67 @@
 """ Utility functions used by Protean Flask"""
+import re
+from functools import lru_cache
 
+from werkzeug.datastructures import ImmutableMultiDict
+from werkzeug.datastructures import MultiDict
 
-def immutable_dict_2_dict(imm_dict):
+
+# Key of a multi dict made of a name followed by bracketed segments, like
+#   `filter[name]`, `a[0][b]` or `tags[]`
+KEY_REGEX = re.compile(r'([^\[\]]+)((?:\[[^\[\]]+\])*)(\[\])?')
+
+
+@lru_cache(maxsize=1024)
+def normalize_key(key):
+    """ Return the `(path, list path, is list)` of a multi dict key: the
+    path to its single value, the path to its values when it has many, and
+    whether its values always make a list. Memoized, as the same keys come
+    in every request.
+    """
+    match = KEY_REGEX.fullmatch(key)
+    if not match:
+        # Not in the bracket syntax, keep the key as it is
+        return (key, ), (key.strip('[]'), ), key.endswith('[]')
+
+    name, segments, is_list = match.groups()
+    path = (name, *segments[1:-1].split('][')) if segments else (name, )
+    return path, path, bool(is_list)
+
+
+def immutable_dict_2_dict(imm_dict, into=None):
     """ Function to convert an Immutable Dictionary to a Mutable one
-    Convert multi valued and keys ending with [] to lists
+    Convert multi valued and keys ending with [] to lists, and keys with
+    bracketed segments like `filter[name]` or `a[0][b]` to nested dicts.
+
+    :param into: dict to add the values to, instead of a new one
     """
-    m_dict = {}
+    m_dict = {} if into is None else into
 
-    for key, val in imm_dict.to_dict(flat=False).items():
-        if len(val) > 1 or key.endswith('[]'):
-            m_dict[key.strip('[]')] = val
+    if type(imm_dict) in (ImmutableMultiDict, MultiDict):
+        # The values of these multi dicts are stored as lists, read them
+        #   without copying the lists
+        items = dict.items(imm_dict)
+    else:
+        items = imm_dict.lists()
+
+    for key, values in items:
+        path, list_path, is_list = normalize_key(key)
+        if is_list or len(values) > 1:
+            path, value = list_path, list(values)
         else:
-            m_dict[key] = val[0]
+            value = values[0]
+
+        if len(path) == 1:
+            m_dict[path[0]] = value
+            continue
+
+        target = m_dict
+        for segment in path[:-1]:
+            child = target.get(segment)
+            if not isinstance(child, dict):
+                child = target[segment] = {}
+            target = child
+        target[path[-1]] = value
 
     return m_dict
 
@@ -33,5 +83,77 @@ def derive_tenant(url):
     from urllib.parse import urlparse
 
     host = urlparse(url).hostname
+    if host is None:
+        return None
+
+    return host_tenant(host)
+
+
+def split_port(host):
+    """ Return the `host` header value without the port """
+    if host.startswith('['):
+        # IPv6 address, like `[::1]:5000`
+        return host[:host.find(']') + 1]
+    return host.rsplit(':', 1)[0]
+
+
+def host_tenant(hostname):
+    """ Return the `subdomain.domain.com` part of the host name as the tenant.
+    IP addresses and host names with fewer parts are returned as they are.
+    """
+    if hostname.startswith('[') or hostname.replace('.', '').isdigit():
+        return hostname
+
+    parts = hostname.split('.')
+    if len(parts) > 3:
+        return '.'.join(parts[-3:])
+    return hostname
+
+
+# Characters that make a tenant mapping a regular expression
+REGEX_CHARS = frozenset('^$*+?{}[]\\|()')
+
+
+class TenantResolver:
+    """ Resolve the tenant of a request from its `host` header
+
+    The tenant is looked up in the `mapping` first, which is a dict or a list
+    of `(pattern, tenant)` pairs. A pattern made only of host name characters
+    matches that host exactly; any other pattern is a regular expression
+    that must match the whole host name, and the tenant may refer to its
+    groups, like `\\1`. Hosts that are not mapped follow the
+    `subdomain.domain.com` rule of `derive_tenant`.
+
+    The tenants of the last `cache_size` hosts are memoized.
+    """
+
+    def __init__(self, mapping=None, cache_size=1024):
+        if isinstance(mapping, dict):
+            mapping = mapping.items()
+
+        self.hosts = {}
+        self.patterns = []
+        for pattern, tenant in mapping or ():
+            if REGEX_CHARS.isdisjoint(pattern):
+                self.hosts[pattern.lower()] = tenant
+            else:
+                self.patterns.append(
+                    (re.compile(pattern, re.IGNORECASE), tenant))
+
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _resolve(self, host):
+        """ Return the tenant of the `host`, which may include a port """
+        hostname = split_port(host).lower()
+
+        try:
+            return self.hosts[hostname]
+        except KeyError:
+            pass
+
+        for regex, tenant in self.patterns:
+            match = regex.fullmatch(hostname)
+            if match:
+                return match.expand(tenant)
 
-    return host
+        return host_tenant(hostname)
@@ -0,0 +1,182 @@
+"""Module to test the views with async handlers"""
+import asyncio
+import threading
+
+import mock
+import pytest
+from flask import g
+from flask import request
+from protean.context import context
+from protean.core.tasklet import Tasklet
+from protean.core.usecase import ListRequestObject
+from protean.core.usecase import ListUseCase
+from tests.support.sample_app import api
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Dog
+from tests.support.sample_app.entities import Human
+from tests.support.sample_app.serializers import HumanSerializer
+from tests.support.sample_app.views import AsyncHumanResource
+
+from protean_flask.core.async_views import AsyncGenericAPIResource
+from protean_flask.core.async_views import get_executor
+from protean_flask.core.async_views import run_coroutine
+from protean_flask.core.connections import close_pools
+from protean_flask.core.connections import get_connection
+from protean_flask.core.connections import pool_metrics
+from protean_flask.core.views import GenericAPIResource
+
+
+class TestAsyncViews:
+    """Tests for the views with async handlers"""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        """ Setup client for test cases """
+        yield app.test_client()
+
+    def test_handler(self, client):
+        """ Test an async handler awaiting several use cases """
+        Human.create(id=1, name='John')
+        Dog.create(id=1, name='Johnny', owner='John', age=3)
+
+        rv = client.get('/async/humans/1')
+        assert rv.status_code == 200
+        assert rv.json == {'human': {
+            'id': 1, 'name': 'John', 'contact': None,
+            'dogs': [{'id': 1, 'name': 'Johnny', 'owner': 'John', 'age': 3}]}}
+
+    def test_error(self, client):
+        """ Test that the errors of the use cases are handled """
+        rv = client.get('/async/humans/1')
+        assert rv.status_code == 404
+
+    def test_thread_pool(self, client):
+        """ Test that the use cases run in the pool with the request context """
+        Human.create(id=1, name='John')
+        calls = []
+
+        def process_request(view, *args, **kwargs):
+            calls.append((threading.current_thread().name, request.path,
+                          context.url))
+            return GenericAPIResource._process_request(view, *args, **kwargs)
+
+        with mock.patch.object(AsyncHumanResource, '_process_request',
+                               autospec=True, side_effect=process_request):
+            rv = client.get('/async/humans/1')
+            assert rv.status_code == 200
+
+        assert len(calls) == 2
+        for thread_name, path, url in calls:
+            assert thread_name.startswith('protean-flask')
+            assert path == '/async/humans/1'
+            assert url == 'http://localhost/async/humans/1'
+
+        # The context of the pool threads is cleaned up after each call
+        assert get_executor().submit(
+            getattr, context, 'url', None).result() is None
+
+    def test_request_globals(self):
+        """ Test that the pool threads share the `flask.g` of the request,
+        but borrow their own connections
+        """
+        close_pools()
+        with app.test_request_context('/async/humans/1'):
+            g.user = 'alice'
+            conn = get_connection()
+            view = AsyncHumanResource()
+
+            async def handler():
+                return await view.run_sync(
+                    lambda: (g.get('user'), get_connection()))
+
+            user, pool_conn = run_coroutine(handler)
+            assert user == 'alice'
+            assert pool_conn is not conn
+            assert get_connection() is conn
+
+            # The connection of the pool thread is given back when it is done
+            assert pool_metrics()['default']['in_use'] == 1
+
+    def test_event_loops_closed(self):
+        """ Test that the event loops of the handlers are closed """
+        loops = []
+
+        async def handler():
+            loops.append(asyncio.get_running_loop())
+
+        run_coroutine(handler)
+        run_coroutine(handler)
+        assert loops[0] is not loops[1]
+        assert all(loop.is_closed() for loop in loops)
+
+    def test_concurrent_lists(self):
+        """ Test that the lists awaited at the same time by a handler do not
+        share the count mode or the order of their cursors
+        """
+        for i in range(1, 4):
+            Human.create(id=i, name=f'Human {i}')
+
+        class HumanListsResource(AsyncGenericAPIResource):
+            entity_cls = Human
+            serializer_cls = HumanSerializer
+
+        # Both use cases wait for each other, so that the payloads of both
+        #   are translated before the results of either are rendered
+        barrier = threading.Barrier(2)
+        perform = Tasklet.perform
+
+        def wait_perform(*args, **kwargs):
+            barrier.wait(timeout=5)
+            return perform(*args, **kwargs)
+
+        async def lists(view, *payloads):
+            with mock.patch.object(
+                    Tasklet, 'perform', side_effect=wait_perform):
+                return await asyncio.gather(*(
+                    view.process_request(
+                        ListUseCase, ListRequestObject, payload, many=True)
+                    for payload in payloads))
+
+        with app.test_request_context('/humans'):
+            view = HumanListsResource()
+            (first, _), (second, _) = run_coroutine(
+                lists, view, {'per_page': 2, 'count': 'none'}, {'per_page': 2})
+            assert 'total' not in first and first['has_more'] is True
+            assert second['total'] == 3
+
+            view.pagination = 'cursor'
+            (first, _), (second, _) = run_coroutine(
+                lists, view, {'per_page': 2, 'order_by': '-id'},
+                {'per_page': 2, 'order_by': 'id'})
+            assert [human['id'] for human in first['humans']] == [3, 2]
+            assert [human['id'] for human in second['humans']] == [1, 2]
+
+            (first, _), (second, _) = run_coroutine(
+                lists, view,
+                {'per_page': 2, 'order_by': '-id',
+                 'cursor': first['next_cursor']},
+                {'per_page': 2, 'order_by': 'id',
+                 'cursor': second['next_cursor']})
+            assert [human['id'] for human in first['humans']] == [1]
+            assert [human['id'] for human in second['humans']] == [3]
+
+    def test_asgi_adapter(self, client):
+        """ Test handling the request from a thread of an event loop, like
+        ASGI adapters do
+        """
+        Human.create(id=1, name='John')
+
+        async def serve():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, client.get, '/async/humans/1')
+
+        rv = asyncio.run(serve())
+        assert rv.status_code == 200
+        assert rv.json['human']['name'] == 'John'
+
+    def test_reload_config(self):
+        """ Test that the thread pool is created again from the config """
+        executor = get_executor()
+        api.reload_config()
+        assert get_executor() is not executor
@@ -0,0 +1,177 @@
+"""Module to test the response cache of the views"""
+import json
+
+import mock
+import pytest
+from protean.conf import active_config
+from protean.impl.cache.local_mem import LocalMemCache
+from tests.support.sample_app import api
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Human
+from tests.support.sample_app.views import HumanResourceSet
+
+from protean_flask.core.cache import LRUCache
+from protean_flask.core.cache import cache_stats
+from protean_flask.core.cache import get_response_cache
+from protean_flask.core.metrics import stage_metrics
+
+
+class TestLRUCache:
+    """Tests for the in-process LRU cache backend"""
+
+    def test_eviction(self):
+        """ Test that the least recently used entries are dropped """
+        cache = LRUCache({'MAX_ENTRIES': 2})
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+
+    def test_expiry(self):
+        """ Test that expired entries are not returned """
+        cache = LRUCache({'EXPIRY': 60})
+        cache.set('a', 1)
+        cache.set('b', 2, expiry=0)
+        assert cache.has_key('a')
+        assert cache.get('b') is None
+        assert not cache.add('a', 3)
+        assert cache.add('b', 3)
+        assert cache.get('b') == 3
+
+
+class TestResponseCache:
+    """Tests for caching the responses of a resource set"""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        """ Setup client for test cases """
+        yield app.test_client()
+
+    @pytest.fixture(autouse=True)
+    def response_cache(self):
+        """ Enable the response cache of the humans resource set """
+        with mock.patch.object(HumanResourceSet, 'cache_responses', True):
+            yield get_response_cache()
+
+        get_response_cache().clear()
+        cache_stats.clear()
+
+    def stats(self):
+        """ Return the counters of the humans resource set """
+        return cache_stats.snapshot()[
+            'tests.support.sample_app.views.HumanResourceSet']
+
+    def test_cached(self, client):
+        """ Test that responses are served from the cache """
+        Human.create(id=1, name='John')
+
+        with mock.patch.object(HumanResourceSet, '_process_request',
+                               autospec=True,
+                               side_effect=HumanResourceSet._process_request) \
+                as process_request:
+            first = client.get('/humans/1')
+            second = client.get('/humans/1')
+            assert process_request.call_count == 1
+
+        assert second.status_code == 200
+        assert second.data == first.data
+        assert second.mimetype == 'application/json'
+        assert self.stats() == {'hits': 1, 'misses': 1, 'invalidations': 0}
+
+    def test_keys(self, client):
+        """ Test that the identifier and query arguments are in the key """
+        Human.create(id=1, name='John')
+        Human.create(id=2, name='Jane')
+
+        assert client.get('/humans/1').json['human']['name'] == 'John'
+        assert client.get('/humans/2').json['human']['name'] == 'Jane'
+        client.get('/humans?order_by[]=id&name=John')
+        rv = client.get('/humans?name=John&order_by[]=id')
+        assert rv.json['total'] == 1
+        rv = client.get('/humans?name=Jane&order_by[]=id')
+        assert rv.json['humans'][0]['name'] == 'Jane'
+
+        assert self.stats() == {'hits': 1, 'misses': 4, 'invalidations': 0}
+
+    def test_head(self, client):
+        """ Test that HEAD requests are served from the cache and do not
+        invalidate it
+        """
+        Human.create(id=1, name='John')
+
+        rv = client.get('/humans/1')
+        assert rv.status_code == 200
+        rv = client.head('/humans/1')
+        assert rv.status_code == 200
+        assert rv.data == b''
+        assert client.get('/humans/1').json['human']['name'] == 'John'
+
+        assert self.stats() == {'hits': 2, 'misses': 1, 'invalidations': 0}
+
+    def test_tenant_keys(self, client):
+        """ Test that tenants do not share cached responses, even when the
+        tenant is not loaded into the context
+        """
+        Human.create(id=1, name='John')
+
+        with mock.patch.object(api, 'context_keys', frozenset()):
+            client.get('/humans/1', base_url='http://acme.domain.com')
+            client.get('/humans/1', base_url='http://acme.domain.com')
+            client.get('/humans/1', base_url='http://globex.domain.com')
+
+        assert self.stats() == {'hits': 1, 'misses': 2, 'invalidations': 0}
+
+    def test_invalidation(self, client):
+        """ Test that successful writes invalidate the cached responses """
+        Human.create(id=1, name='John')
+        assert client.get('/humans').json['total'] == 1
+
+        rv = client.post('/humans', data=json.dumps(dict(id=2, name='Jane')),
+                         content_type='application/json')
+        assert rv.status_code == 201
+        assert client.get('/humans').json['total'] == 2
+
+        # Failed writes keep the cached responses
+        rv = client.put('/humans/5', data=json.dumps(dict(name='Mary')),
+                        content_type='application/json')
+        assert rv.status_code == 404
+        assert client.get('/humans').json['total'] == 2
+
+        rv = client.delete('/humans/1')
+        assert rv.status_code == 204
+        assert client.get('/humans').json['total'] == 1
+
+        assert self.stats() == {'hits': 1, 'misses': 3, 'invalidations': 2}
+
+    def test_errors_not_cached(self, client):
+        """ Test that error responses are not cached """
+        assert client.get('/humans/1').status_code == 404
+        Human.create(id=1, name='John')
+        assert client.get('/humans/1').status_code == 200
+
+    def test_backend_config(self, client):
+        """ Test using another implementation of the cache interface """
+        with mock.patch.object(active_config, 'RESPONSE_CACHE', {
+                'PROVIDER': 'protean.impl.cache.local_mem.LocalMemCache',
+                'LOCATION': 'responses'}):
+            api.reload_config()
+            try:
+                assert isinstance(get_response_cache(), LocalMemCache)
+                Human.create(id=1, name='John')
+                client.get('/humans/1')
+                assert client.get('/humans/1').status_code == 200
+                assert self.stats()['hits'] == 1
+            finally:
+                get_response_cache().clear()
+                api.reload_config()
+
+    def test_metrics(self, client):
+        """ Test that the counters are reported with the metrics """
+        client.get('/humans')
+        lines = stage_metrics.render_prometheus().splitlines()
+        assert 'protean_flask_response_cache_total{namespace="tests.support.' \
+               'sample_app.views.HumanResourceSet",result="misses"} 1' in lines
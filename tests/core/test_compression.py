@@ -0,0 +1,194 @@
+"""Module to test the compression of the responses"""
+import gzip
+import json
+
+import mock
+import pytest
+from protean.conf import active_config
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Human
+from tests.support.sample_app.views import HumanResourceSet
+from werkzeug.datastructures import Accept
+
+from protean_flask.core import compression
+from protean_flask.core.compression import negotiate_encoding
+
+
+class TestCompression:
+    """Tests for compressing the responses of the views"""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        """ Setup client for test cases """
+        for i in range(1, 51):
+            Human.create(id=i, name=f'Human {i}', contact='9000900090')
+
+        with mock.patch.object(active_config, 'COMPRESSION_ENABLED', True):
+            yield app.test_client()
+
+    def test_disabled(self, client):
+        """ Test that the responses are not compressed by default """
+        with mock.patch.object(active_config, 'COMPRESSION_ENABLED', False):
+            rv = client.get('/humans?per_page=50',
+                            headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in rv.headers
+        assert 'Vary' not in rv.headers
+
+    def test_gzip(self, client):
+        """ Test compressing a response with gzip """
+        rv = client.get('/humans?per_page=50',
+                        headers={'Accept-Encoding': 'gzip, deflate'})
+        assert rv.status_code == 200
+        assert rv.headers['Content-Encoding'] == 'gzip'
+        assert rv.headers['Vary'] == 'Accept-Encoding'
+        assert int(rv.headers['Content-Length']) == len(rv.get_data())
+
+        body = json.loads(gzip.decompress(rv.get_data()))
+        assert body['total'] == 50
+        assert len(body['humans']) == 50
+
+    def test_not_compressed(self, client):
+        """ Test the responses that are not compressed """
+        # The client does not accept a compressed response
+        rv = client.get('/humans?per_page=50')
+        assert 'Content-Encoding' not in rv.headers
+        assert rv.headers['Vary'] == 'Accept-Encoding'
+        assert rv.json['total'] == 50
+
+        rv = client.get('/humans?per_page=50',
+                        headers={'Accept-Encoding': 'gzip;q=0'})
+        assert 'Content-Encoding' not in rv.headers
+
+        # The response is below the size threshold
+        rv = client.get('/humans/1', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in rv.headers
+        assert rv.json['human']['id'] == 1
+
+        # Error responses returned by the views are not compressed, like
+        #   those of the error handlers
+        response = compression.compress_response(
+            app.response_class(client.get('/humans?per_page=50').data,
+                               status=422,
+                               mimetype='application/json'),
+            Accept([('gzip', 1)]))
+        assert 'Content-Encoding' not in response.headers
+
+        # The type of the response is not compressible
+        with mock.patch.object(active_config, 'COMPRESSION_MIMETYPES', []):
+            rv = client.get('/humans?per_page=50',
+                            headers={'Accept-Encoding': 'gzip'})
+            assert 'Content-Encoding' not in rv.headers
+
+    def test_streamed(self, client):
+        """ Test compressing streamed responses one chunk at a time """
+        with mock.patch.multiple(HumanResourceSet, stream_list=True,
+                                 stream_chunk_size=10):
+            rv = client.get('/humans?per_page=50',
+                            headers={'Accept-Encoding': 'gzip'})
+        assert rv.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in rv.headers
+        body = json.loads(gzip.decompress(rv.get_data()))
+        assert len(body['humans']) == 50
+
+        rv = client.get('/humans/export', headers={'Accept-Encoding': 'gzip'})
+        lines = gzip.decompress(rv.get_data()).splitlines()
+        assert len(lines) == 50
+
+    def test_etag(self, client):
+        """ Test that compressed responses have the ETag of their encoding """
+        with mock.patch.object(HumanResourceSet, 'use_etags', True):
+            etag = client.get('/humans?per_page=50').headers['ETag']
+
+            rv = client.get('/humans?per_page=50',
+                            headers={'Accept-Encoding': 'gzip'})
+            gzip_etag = rv.headers['ETag']
+            assert gzip_etag == etag[:-1] + '-gzip"'
+
+            rv = client.get('/humans?per_page=50', headers={
+                'Accept-Encoding': 'gzip', 'If-None-Match': gzip_etag})
+            assert rv.status_code == 304
+            assert rv.headers['ETag'] == gzip_etag
+
+            rv = client.get('/humans?per_page=50', headers={
+                'If-None-Match': etag})
+            assert rv.status_code == 304
+
+    def test_etag_preconditions(self, client):
+        """ Test that the ETags of compressed responses can be sent back in
+        the `If-Match` header of updates
+        """
+        Human.get(1).update(name='John ' * 10, contact='9000900090' * 5)
+        with mock.patch.multiple(active_config, USE_ETAGS=True,
+                                 COMPRESSION_MIN_SIZE=0):
+            rv = client.get('/humans/1', headers={'Accept-Encoding': 'gzip'})
+            assert rv.headers['Content-Encoding'] == 'gzip'
+            etag = rv.headers['ETag']
+            assert etag.endswith('-gzip"')
+
+            rv = client.get('/humans/1', headers={
+                'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+            assert rv.status_code == 304
+
+            rv = client.put('/humans/1', data=json.dumps(dict(name='Jane')),
+                            content_type='application/json',
+                            headers={'If-Match': etag})
+            assert rv.status_code == 200
+
+            # The entity was modified since the ETag was fetched
+            rv = client.delete('/humans/1', headers={'If-Match': etag})
+            assert rv.status_code == 412
+
+            # Weak ETags never match `If-Match`
+            rv = client.get('/humans/1', headers={'Accept-Encoding': 'gzip'})
+            rv = client.delete('/humans/1', headers={
+                'If-Match': 'W/' + rv.headers['ETag']})
+            assert rv.status_code == 412
+
+    def test_cached(self, client):
+        """ Test that compressed responses are cached per encoding """
+        get_compressor = compression.get_compressor
+        with mock.patch.object(HumanResourceSet, 'cache_responses', True), \
+                mock.patch.object(compression, 'get_compressor',
+                                  side_effect=get_compressor) as mocked:
+            for _ in range(3):
+                rv = client.get('/humans?per_page=50',
+                                headers={'Accept-Encoding': 'gzip'})
+                assert rv.headers['Content-Encoding'] == 'gzip'
+                assert len(json.loads(
+                    gzip.decompress(rv.get_data()))['humans']) == 50
+            assert mocked.call_count == 1
+
+            rv = client.get('/humans?per_page=50')
+            assert 'Content-Encoding' not in rv.headers
+            assert rv.json['total'] == 50
+
+    def test_negotiate_encoding(self):
+        """ Test selecting the encoding from the accepted ones """
+        with mock.patch.dict(compression._installed, {'br': True}):
+            assert negotiate_encoding(Accept([('gzip', 1), ('br', 1)])) == 'br'
+            assert negotiate_encoding(Accept([('gzip', 1), ('br', 0.5)])) == 'gzip'
+            assert negotiate_encoding(Accept([('*', 1)])) == 'br'
+
+        with mock.patch.dict(compression._installed, {'br': False}):
+            assert negotiate_encoding(Accept([('br', 1)])) is None
+        assert negotiate_encoding(Accept([('identity', 1)])) is None
+
+    def test_partial_levels(self, client):
+        """ Test that the encodings missing from `COMPRESSION_LEVELS` are
+        compressed at their default level
+        """
+        with mock.patch.object(active_config, 'COMPRESSION_LEVELS',
+                               {'gzip': 9}), \
+                mock.patch.dict(compression._installed, clear=True):
+            rv = client.get('/humans?per_page=50',
+                            headers={'Accept-Encoding': 'br, zstd, gzip;q=0.5'})
+            assert rv.status_code == 200
+            assert rv.headers['Content-Encoding'] == 'gzip'
+            assert len(json.loads(
+                gzip.decompress(rv.get_data()))['humans']) == 50
+
+        with mock.patch.object(active_config, 'COMPRESSION_LEVELS', {}), \
+                mock.patch.object(compression.zlib, 'compressobj',
+                                  wraps=compression.zlib.compressobj) as mocked:
+            compression.get_compressor('gzip')
+            assert mocked.call_args[0][0] == 6
@@ -0,0 +1,137 @@
+"""Module to test the connections borrowed by requests"""
+import mock
+import pytest
+from protean.conf import active_config
+from protean.core.exceptions import UsecaseExecutionError
+from protean.core.provider import providers
+from tests.support.sample_app import api
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Human
+
+from protean_flask.core.connections import ConnectionPool
+from protean_flask.core.connections import close_pools
+from protean_flask.core.connections import get_connection
+from protean_flask.core.connections import get_pool
+from protean_flask.core.connections import pool_metrics
+from protean_flask.core.views import APIResource
+
+
+class ConnectionResource(APIResource):
+    """ View using the connection of the request """
+
+    def get(self):
+        """ Use the connection twice """
+        assert get_connection() is get_connection()
+        return {'in_use': get_pool().metrics()['in_use']}
+
+    def put(self):
+        """ Fail after borrowing the connection """
+        get_connection()
+        raise ValueError('Failed')
+
+
+app.add_url_rule('/connection',
+                 view_func=ConnectionResource.as_view('connection'),
+                 methods=['GET', 'PUT'])
+
+
+class TestConnectionPool:
+    """Tests for the bounded pool of connections"""
+
+    @pytest.fixture
+    def provider(self):
+        """ Provider returning a new connection object each time """
+        provider = mock.Mock()
+        provider.get_connection.side_effect = lambda: object()
+        return provider
+
+    def test_reuse(self, provider):
+        """ Test that connections given back are borrowed again """
+        pool = ConnectionPool(provider, size=2, timeout=1)
+        conn = pool.borrow()
+        pool.give_back(conn)
+        assert pool.borrow() is conn
+        assert provider.get_connection.call_count == 1
+
+    def test_timeout(self, provider):
+        """ Test that borrowing fails when all the connections are in use """
+        pool = ConnectionPool(provider, size=1, timeout=0.01)
+        pool.borrow()
+        with pytest.raises(UsecaseExecutionError):
+            pool.borrow()
+
+        assert pool.metrics() == {
+            'size': 1, 'open': 1, 'in_use': 1, 'idle': 0,
+            'borrowed': 1, 'returned': 0, 'waits': 1, 'timeouts': 1}
+
+    def test_close(self, provider):
+        """ Test that closing the pool closes its connections """
+        pool = ConnectionPool(provider, size=2, timeout=1)
+        idle, borrowed = pool.borrow(), pool.borrow()
+        pool.give_back(idle)
+
+        pool.close()
+        provider.close_connection.assert_called_once_with(idle)
+        pool.give_back(borrowed)
+        provider.close_connection.assert_called_with(borrowed)
+        assert pool.metrics()['open'] == 0
+
+
+class TestRequestConnections:
+    """Tests for the connections borrowed by requests"""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        """ Setup client for test cases """
+        yield app.test_client()
+
+    def test_released_after_request(self, client):
+        """ Test that the connection is given back after the request """
+        rv = client.get('/connection')
+        assert rv.status_code == 200
+        assert rv.json == {'in_use': 1}
+
+        metrics = pool_metrics()['default']
+        assert metrics['in_use'] == 0
+        assert metrics['borrowed'] == metrics['returned']
+
+    def test_released_on_error(self, client):
+        """ Test that the connection is given back when the request fails """
+        with pytest.raises(ValueError):
+            client.put('/connection')
+
+        assert pool_metrics()['default']['in_use'] == 0
+
+    def test_repository_connections(self, client):
+        """ Test that the repositories of the use cases share the connection
+        borrowed by the request, which is given back after the request
+        """
+        Human.create(id=1, name='John')
+        close_pools()
+        provider = providers.get_provider('default')
+
+        with mock.patch.object(provider.get_connection, '__wrapped__',
+                               wraps=provider.get_connection.__wrapped__) \
+                as open_conn:
+            rv = client.put('/humans/1', data='{"name": "Jane"}',
+                            content_type='application/json')
+            assert rv.status_code == 200
+
+        # A single connection was opened, by the pool, for all the queries
+        assert open_conn.call_count == 1
+        metrics = pool_metrics()['default']
+        assert metrics['borrowed'] == metrics['returned'] == 1
+        assert metrics['in_use'] == 0
+
+        # Outside of requests the connections are not pooled
+        Human.get(1)
+        assert pool_metrics()['default']['borrowed'] == 1
+
+    def test_pool_config(self, client):
+        """ Test that the pool is created with the configured size """
+        with mock.patch.object(active_config, 'CONNECTION_POOL_SIZE', 3):
+            api.reload_config()
+            client.get('/connection')
+            assert pool_metrics()['default']['size'] == 3
+
+        api.reload_config()
@@ -0,0 +1,116 @@
+"""Module to test ETags and conditional requests"""
+import json
+
+import mock
+import pytest
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Dog
+from tests.support.sample_app.entities import Human
+from tests.support.sample_app.serializers import DogSerializer
+from tests.support.sample_app.views import HumanResourceSet
+from tests.support.sample_app.views import ShowDogResource
+from tests.support.sample_app.views import UpdateDogResource
+
+
+class TestETags:
+    """Tests for the ETags of the responses"""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        """ Setup client for test cases """
+        yield app.test_client()
+
+    @pytest.fixture
+    def etags(self):
+        """ Enable the ETags on the views used by the tests """
+        with mock.patch.object(HumanResourceSet, 'use_etags', True), \
+                mock.patch.object(ShowDogResource, 'use_etags', True), \
+                mock.patch.object(UpdateDogResource, 'use_etags', True):
+            yield
+
+    def test_disabled(self, client):
+        """ Test that ETags are not added by default """
+        Human.create(id=1, name='John')
+        rv = client.get('/humans/1')
+        assert 'ETag' not in rv.headers
+
+    def test_if_none_match(self, client, etags):
+        """ Test that a 304 is returned when the client has the entity """
+        Dog.create(id=5, name='Johnny', owner='John')
+
+        rv = client.get('/dogs/5')
+        assert rv.status_code == 200
+        etag = rv.headers['ETag']
+        assert etag.startswith('"')
+
+        rv = client.get('/dogs/5', headers={'If-None-Match': etag})
+        assert rv.status_code == 304
+        assert rv.data == b''
+        assert rv.headers['ETag'] == etag
+
+        rv = client.get('/dogs/5', headers={'If-None-Match': '"other"'})
+        assert rv.status_code == 200
+        assert rv.json['dog']['name'] == 'Johnny'
+
+    def test_list(self, client, etags):
+        """ Test that the ETag of a list changes with its items """
+        Human.create(id=1, name='John')
+
+        etag = client.get('/humans').headers['ETag']
+        rv = client.get('/humans', headers={'If-None-Match': etag})
+        assert rv.status_code == 304
+
+        Human.create(id=2, name='Jane')
+        rv = client.get('/humans', headers={'If-None-Match': etag})
+        assert rv.status_code == 200
+        assert rv.json['total'] == 2
+
+    def test_if_match(self, client, etags):
+        """ Test that updates are only applied to the expected version """
+        Human.create(id=1, name='John')
+        etag = client.get('/humans/1').headers['ETag']
+
+        rv = client.put('/humans/1', data=json.dumps(dict(name='Jane')),
+                        content_type='application/json',
+                        headers={'If-Match': etag})
+        assert rv.status_code == 200
+
+        # The entity was modified since the ETag was fetched
+        rv = client.put('/humans/1', data=json.dumps(dict(name='Mary')),
+                        content_type='application/json',
+                        headers={'If-Match': etag})
+        assert rv.status_code == 412
+        assert rv.json == {'If-Match': 'does not match the current entity'}
+        assert Human.get(1).name == 'Jane'
+
+        rv = client.delete('/humans/1', headers={'If-Match': etag})
+        assert rv.status_code == 412
+        rv = client.delete('/humans/1', headers={'If-Match': '*'})
+        assert rv.status_code == 204
+
+    def test_etag_field(self, client, etags):
+        """ Test ETags derived from a field of the entity """
+        Dog.create(id=5, name='Johnny', owner='John')
+
+        with mock.patch.object(ShowDogResource, 'etag_field', 'name'), \
+                mock.patch.object(UpdateDogResource, 'etag_field', 'name'), \
+                mock.patch.object(DogSerializer, 'dump', autospec=True,
+                                  side_effect=DogSerializer.dump) as dump:
+            etag = client.get('/dogs/5').headers['ETag']
+            assert dump.call_count == 1
+
+            rv = client.get('/dogs/5', headers={'If-None-Match': etag})
+            assert rv.status_code == 304
+            # The entity was not serialized again
+            assert dump.call_count == 1
+
+            rv = client.put('/dogs/5', data=json.dumps(dict(age=3)),
+                            content_type='application/json',
+                            headers={'If-Match': etag})
+            assert rv.status_code == 200
+            assert rv.headers['ETag'] == etag
+
+            rv = client.put('/dogs/5', data=json.dumps(dict(name='Mary')),
+                            content_type='application/json',
+                            headers={'If-Match': '"outdated"'})
+            assert rv.status_code == 412
@@ -0,0 +1,129 @@
+"""Module to test the JSON backends"""
+import datetime
+import decimal
+import json
+import uuid
+
+import mock
+import pytest
+from protean.conf import active_config
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Dog
+
+from protean_flask.core import json_backends
+from protean_flask.core.json_backends import StdlibJSONBackend
+from protean_flask.core.json_backends import get_json_backend
+from protean_flask.core.json_backends import iter_json_array
+
+
+@pytest.fixture
+def json_backend():
+    """ Fixture to switch the JSON backend for a test """
+    original = active_config.JSON_BACKEND
+
+    def set_backend(name):
+        active_config.JSON_BACKEND = name
+        return get_json_backend()
+
+    yield set_backend
+    active_config.JSON_BACKEND = original
+
+
+class TestJSONBackends:
+    """Tests for selecting and using the JSON backends"""
+
+    data = {
+        'id': uuid.UUID('a3f0b2a6-7c4b-4c1e-9d2e-6c1f0c5d9e11'),
+        'created_at': datetime.datetime(2019, 3, 11, 10, 30, 15),
+        'date': datetime.date(2019, 3, 11),
+        'price': decimal.Decimal('10.50'),
+        'prices': [decimal.Decimal('1.0'), (decimal.Decimal('2.50'), 3)],
+        'count': 2 ** 70,
+        'name': 'Johnny',
+        'tags': ['a', 'b'],
+        'nested': {'z': 1, 'a': None, 'm': 1.5},
+    }
+
+    def test_default_backend(self):
+        """ Test that the stdlib backend is used by default """
+        assert isinstance(get_json_backend(), StdlibJSONBackend)
+
+    def test_fallback_to_stdlib(self, json_backend):
+        """ Test that a backend which is not installed falls back """
+        json_backend_cache = dict(json_backends._backends)
+        json_backends._backends.clear()
+        try:
+            with mock.patch.dict('sys.modules', {'ujson': None}):
+                assert isinstance(json_backend('ujson'), StdlibJSONBackend)
+        finally:
+            json_backends._backends.clear()
+            json_backends._backends.update(json_backend_cache)
+
+    def test_unknown_backend(self, json_backend):
+        """ Test that an unknown backend raises an error """
+        with pytest.raises(ValueError):
+            json_backend('unknown')
+
+    @pytest.mark.parametrize('name', ['orjson', 'ujson'])
+    def test_same_output_as_stdlib(self, json_backend, name):
+        """ Test that the fast backends encode the entity values the same way
+        as the stdlib backend
+        """
+        pytest.importorskip(name)
+        with app.app_context():
+            expected = json_backend('stdlib').dumps(self.data)
+            backend = json_backend(name)
+            assert backend.name == name
+
+            # Both backends produce compact, sorted output by default
+            assert backend.dumps(self.data) == expected
+            assert backend.loads(expected) == json.loads(expected)
+
+    @pytest.mark.parametrize('name', ['stdlib', 'orjson', 'ujson'])
+    def test_request_round_trip(self, json_backend, name):
+        """ Test that payloads are parsed and rendered with the backend """
+        if name != 'stdlib':
+            pytest.importorskip(name)
+        json_backend(name)
+
+        client = app.test_client()
+        rv = client.post('/dogs', data=json.dumps(dict(id=5, name='Johnny', owner='John')),
+                         content_type='application/json')
+        assert rv.status_code == 201
+        assert rv.data == b'{"dog":{"age":5,"id":5,"name":"Johnny","owner":"John"}}\n'
+        assert rv.mimetype == 'application/json'
+
+        Dog.get(5).delete()
+
+
+class TestIterJSONArray:
+    """Tests for decoding JSON arrays incrementally"""
+
+    document = json.dumps([
+        {'name': 'Johnny', 'tags': ['a', 'b']}, 12345, -1.5e3, 'caf\u00e9',
+        True, None, [], {}], ensure_ascii=False).encode('utf-8')
+
+    @pytest.mark.parametrize('size', [1, 2, 3, 7, 1000])
+    def test_items_split_across_chunks(self, size):
+        """ Test that the items are decoded whatever the chunk boundaries,
+        including inside numbers and multi-byte characters
+        """
+        chunks = [self.document[i:i + size]
+                  for i in range(0, len(self.document), size)]
+        assert list(iter_json_array(chunks)) == json.loads(self.document)
+
+    def test_items_yielded_before_the_end(self):
+        """ Test that the items are yielded as soon as they are complete """
+        items = iter_json_array(iter([b' [ {"a": 1}, ', b'{"b": 2}', b']']))
+        assert next(items) == {'a': 1}
+        assert list(items) == [{'b': 2}]
+
+    def test_empty_array(self):
+        assert list(iter_json_array([b' [ ', b' ] \n'])) == []
+
+    @pytest.mark.parametrize('document', [
+        b'', b'{"a": 1}', b'[1, 2', b'[1, 2,]', b'[1 2]', b'[1, }', b'[1] 2',
+    ])
+    def test_invalid_documents(self, document):
+        with pytest.raises(ValueError):
+            list(iter_json_array([document]))
@@ -0,0 +1,133 @@
+"""Module to test the timings recorded for the requests"""
+import mock
+import pytest
+from flask import Flask
+from protean.conf import active_config
+from tests.support.sample_app import api
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Dog
+from tests.support.sample_app.views import ShowDogResource
+
+from protean_flask import Protean
+from protean_flask.core.metrics import Histogram
+from protean_flask.core.metrics import StageMetrics
+from protean_flask.core.metrics import format_server_timing
+from protean_flask.core.metrics import stage_metrics
+
+
+@pytest.fixture
+def metrics_config():
+    """ Fixture to enable the recording of timings for a test """
+
+    def configure(**options):
+        patcher = mock.patch.multiple(active_config, **options)
+        patcher.start()
+        patchers.append(patcher)
+        api.reload_config()
+
+    patchers = []
+    yield configure
+
+    for patcher in patchers:
+        patcher.stop()
+    api.reload_config()
+    stage_metrics.clear()
+
+
+class TestMetrics:
+    """Tests for the timings of the stages of the requests"""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        """ Setup client for test cases """
+        yield app.test_client()
+
+    def test_histogram(self):
+        """ Test that the buckets count the values up to their bound """
+        histogram = Histogram((0.1, 1))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+
+        assert histogram.cumulative_counts() == [
+            (0.1, 2), (1, 3), ('+Inf', 4)]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(2.65)
+
+    def test_custom_stages(self):
+        """ Test that stages recorded by the views themselves come after
+        the known stages
+        """
+        timings = {'total': 0.003, 'cache': 0.001, 'usecase': 0.002}
+        assert format_server_timing(timings) == \
+            'usecase;dur=2.000, total;dur=3.000, cache;dur=1.000'
+
+        metrics = StageMetrics()
+        metrics.observe('show_dog', timings)
+        stages = [
+            line.split('stage="')[1].split('"')[0]
+            for line in metrics.render_prometheus().splitlines()
+            if line.startswith('protean_flask_stage_duration_seconds_count')]
+        assert stages == ['usecase', 'total', 'cache']
+
+    def test_disabled(self, client):
+        """ Test that nothing is recorded by default """
+        Dog.create(id=5, name='Johnny', owner='John')
+
+        rv = client.get('/dogs/5')
+        assert rv.status_code == 200
+        assert 'Server-Timing' not in rv.headers
+        assert stage_metrics.histograms == {}
+
+    def test_record_timings(self, client, metrics_config):
+        """ Test that the timing of each stage is recorded per endpoint """
+        metrics_config(METRICS_ENABLED=True)
+        Dog.create(id=5, name='Johnny', owner='John')
+
+        client.get('/dogs/5')
+        client.get('/dogs/5')
+        client.get('/humans')
+        client.get('/dogs/6')
+
+        assert stage_metrics.histograms['show_dog', 'total'].count == 3
+        assert stage_metrics.histograms['show_dog', 'parse'].count == 3
+        assert stage_metrics.histograms['show_dog', 'usecase'].count == 3
+        # The failed request was not serialized nor rendered by the view
+        assert stage_metrics.histograms['show_dog', 'serialize'].count == 2
+        assert stage_metrics.histograms['show_dog', 'render'].count == 2
+        assert stage_metrics.histograms['list_humans', 'serialize'].count == 1
+
+    def test_server_timing(self, client, metrics_config):
+        """ Test the `Server-Timing` header of the responses """
+        metrics_config(SERVER_TIMING_HEADERS=True)
+        Dog.create(id=5, name='Johnny', owner='John')
+
+        rv = client.get('/dogs/5')
+        stages = [
+            metric.split(';')[0]
+            for metric in rv.headers['Server-Timing'].split(', ')]
+        assert stages == ['parse', 'usecase', 'serialize', 'render', 'total']
+        assert stage_metrics.histograms == {}
+
+    def test_metrics_route(self, metrics_config):
+        """ Test exposing the timings in the Prometheus format """
+        metrics_config(METRICS_ENABLED=True, METRICS_ROUTE='/_metrics')
+        metrics_app = Flask(__name__)
+        Protean(metrics_app)
+        metrics_app.add_url_rule(
+            '/dogs/<int:identifier>', methods=['GET'],
+            view_func=ShowDogResource.as_view('show_dog'))
+
+        Dog.create(id=5, name='Johnny', owner='John')
+        client = metrics_app.test_client()
+        client.get('/dogs/5')
+
+        rv = client.get('/_metrics')
+        assert rv.status_code == 200
+        assert rv.mimetype == 'text/plain'
+
+        lines = rv.data.decode().splitlines()
+        assert '# TYPE protean_flask_stage_duration_seconds histogram' in lines
+        assert 'protean_flask_stage_duration_seconds_bucket{endpoint="show_dog",' \
+               'stage="total",le="+Inf"} 1' in lines
+        assert 'protean_flask_stage_duration_seconds_count{endpoint="show_dog",' \
+               'stage="usecase"} 1' in lines
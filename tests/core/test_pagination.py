@@ -0,0 +1,205 @@
+"""Module to test the pagination of list responses"""
+import base64
+import datetime
+
+import mock
+import pytest
+from protean.core import field
+from protean.core.entity import Entity
+from protean.core.exceptions import UsecaseExecutionError
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Dog
+from tests.support.sample_app.entities import Human
+from tests.support.sample_app.views import HumanResourceSet
+from tests.support.sample_app.views import ListDogResource
+
+from protean_flask.core.serializers import EntitySerializer
+from protean_flask.core.views import ListAPIResource
+
+
+class Visit(Entity):
+    """ Entity listed by the date of the visits """
+    id = field.Integer(identifier=True)
+    visited_at = field.DateTime(required=True)
+
+
+class VisitSerializer(EntitySerializer):
+    """ Serializer for the Visit entity """
+
+    class Meta:
+        entity = Visit
+
+
+class ListVisitResource(ListAPIResource):
+    """ View listing the visits with a date cursor """
+    entity_cls = Visit
+    serializer_cls = VisitSerializer
+    pagination = 'cursor'
+    cursor_field = 'visited_at'
+
+
+class TestCursorPagination:
+    """Tests for paginating lists with cursors"""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        """ Setup client for test cases """
+        with mock.patch.object(ListDogResource, 'pagination', 'cursor'), \
+                mock.patch.object(HumanResourceSet, 'pagination', 'cursor'):
+            yield app.test_client()
+
+    def fetch_all(self, client, url):
+        """ Follow the cursors and return the ids of each page """
+        pages = []
+        cursor = None
+        while True:
+            rv = client.get(f'{url}&cursor={cursor}' if cursor else url)
+            assert rv.status_code == 200
+            pages.append([item['id'] for item in rv.json['dogs']])
+            cursor = rv.json['next_cursor']
+            if cursor is None:
+                return pages
+
+    def test_pages(self, client):
+        """ Test following the cursors through all the pages """
+        for i in range(1, 8):
+            Dog.create(id=i, name=f'Dog {i}', owner='John')
+
+        rv = client.get('/dogs?per_page=3')
+        assert set(rv.json.keys()) == {'dogs', 'next_cursor'}
+
+        assert self.fetch_all(client, '/dogs?per_page=3') == [
+            [1, 2, 3], [4, 5, 6], [7]]
+        assert self.fetch_all(client, '/dogs?per_page=3&order_by[]=-id') == [
+            [7, 6, 5], [4, 3, 2], [1]]
+
+    def test_filters(self, client):
+        """ Test that the filters apply to each page """
+        for i in range(1, 8):
+            Dog.create(id=i, name=f'Dog {i}', owner='John' if i % 2 else 'Jane')
+
+        assert self.fetch_all(client, '/dogs?per_page=2&owner=John') == [
+            [1, 3], [5, 7]]
+
+    def test_insert_between_pages(self, client):
+        """ Test that new items do not shift the following pages """
+        for i in range(2, 6, 2):
+            Dog.create(id=i, name=f'Dog {i}', owner='John')
+
+        rv = client.get('/dogs?per_page=1')
+        Dog.create(id=1, name='Dog 1', owner='John')
+        rv = client.get('/dogs', query_string={
+            'per_page': 1, 'cursor': rv.json['next_cursor']})
+        assert rv.json['dogs'][0]['id'] == 4
+
+    def test_invalid(self, client):
+        """ Test the errors for invalid cursors and sort orders """
+        Dog.create(id=1, name='Dog 1', owner='John')
+        Dog.create(id=2, name='Dog 2', owner='John')
+
+        rv = client.get('/dogs?cursor=invalid')
+        assert rv.status_code == 422
+        assert rv.json == {'cursor': 'is invalid'}
+
+        rv = client.get('/dogs?order_by[]=name')
+        assert rv.status_code == 422
+
+        # A cursor is only valid for the sort order it was created with
+        cursor = client.get('/dogs?per_page=1').json['next_cursor']
+        rv = client.get('/dogs', query_string={
+            'cursor': cursor, 'order_by[]': '-id'})
+        assert rv.status_code == 422
+
+    def test_viewset(self, client):
+        """ Test cursor pagination of a resource set """
+        for i in range(1, 4):
+            Human.create(id=i, name=f'Human {i}')
+
+        rv = client.get('/humans?per_page=2')
+        assert [human['id'] for human in rv.json['humans']] == [1, 2]
+        rv = client.get('/humans', query_string={
+            'per_page': 2, 'cursor': rv.json['next_cursor']})
+        assert rv.json == {
+            'humans': [{'id': 3, 'name': 'Human 3', 'contact': None}],
+            'next_cursor': None}
+
+    def test_date_cursor(self):
+        """ Test the cursors of a field whose values are not JSON types """
+        visited_at = datetime.datetime(2019, 3, 11, 10, 30, 15, 123456)
+        results = mock.Mock(has_next=True, items=[
+            Visit(id=1, visited_at=visited_at)])
+
+        with app.test_request_context('/visits'):
+            view = ListVisitResource()
+            payload = view.apply_cursor({'order_by': '-visited_at'})
+            cursor = view.encode_cursor(results, descending=True)
+
+            payload = view.apply_cursor({
+                'order_by': '-visited_at', 'cursor': cursor})
+            assert payload['visited_at__lt'] == visited_at
+
+            # The value must be valid for the field
+            with pytest.raises(UsecaseExecutionError):
+                view.apply_cursor({
+                    'order_by': '-visited_at',
+                    'cursor': base64.urlsafe_b64encode(
+                        b'[true, "not a date"]').decode()})
+
+
+class TestCountModes:
+    """Tests for the total of the list responses"""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        """ Setup client for test cases """
+        for i in range(1, 6):
+            Dog.create(id=i, name=f'Dog {i}', owner='John')
+        yield app.test_client()
+
+    def test_exact(self, client):
+        """ Test that lists report the exact total by default """
+        rv = client.get('/dogs?per_page=2')
+        assert rv.status_code == 200
+        assert rv.json['total'] == 5
+        assert rv.json['page'] == 1
+        assert 'has_more' not in rv.json
+
+    def test_none(self, client):
+        """ Test leaving the total out of the response """
+        rv = client.get('/dogs?per_page=2&page=2&count=false')
+        assert rv.status_code == 200
+        assert [dog['id'] for dog in rv.json['dogs']] == [3, 4]
+        assert set(rv.json.keys()) == {'dogs', 'page', 'has_more'}
+        assert rv.json['page'] == 2
+        assert rv.json['has_more'] is True
+
+        rv = client.get('/dogs?per_page=2&page=3&count=false')
+        assert rv.json['has_more'] is False
+
+    def test_estimate(self, client):
+        """ Test estimating the total of the response """
+        rv = client.get('/dogs?per_page=2&count=estimate')
+        assert rv.json['total'] == 5
+        assert rv.json['total_estimated'] is True
+        assert rv.json['has_more'] is True
+
+        with mock.patch.object(ListDogResource, 'estimate_total',
+                               return_value=100):
+            rv = client.get('/dogs?count=estimate')
+            assert rv.json['total'] == 100
+
+    def test_count_mode(self, client):
+        """ Test the count mode of the view and its override """
+        with mock.patch.object(ListDogResource, 'count_mode', 'none'):
+            rv = client.get('/dogs')
+            assert 'total' not in rv.json
+            assert rv.json['has_more'] is False
+
+            rv = client.get('/dogs?count=true')
+            assert rv.json['total'] == 5
+
+    def test_invalid(self, client):
+        """ Test the error for an invalid count mode """
+        rv = client.get('/dogs?count=maybe')
+        assert rv.status_code == 422
+        assert rv.json == {'count': 'is invalid'}
@@ -2,11 +2,16 @@
 import json
 from io import BytesIO
 
+import mock
+import pytest
 from flask import jsonify
 from flask import request
+from protean.conf import active_config
 from tests.support.sample_app import app
+from tests.support.sample_app.entities import Human
 from werkzeug.datastructures import FileStorage
 
+from protean_flask.core import views
 from protean_flask.core.views import APIResource
 
 
@@ -86,3 +91,167 @@ class TestRequestParsing:
         payload = {'name': 'Harry', 'tags': ['1', '2'],
                    'file': 'test file.txt'}
         assert rv.json == payload
+
+
+class TestRequestBodyLimits:
+    """Tests for the size limits and decoding errors of the request bodies"""
+
+    @pytest.fixture
+    def client(self):
+        yield app.test_client()
+
+    def test_invalid_json(self, client):
+        """ Test that a body which is not valid JSON is rejected """
+        rv = client.post('/dummy', data='{"name": "Harry"',
+                         content_type='application/json')
+        assert rv.status_code == 400
+        assert rv.json == {'payload': 'is not valid JSON'}
+
+    def test_empty_json_body(self, client):
+        rv = client.post('/dummy', data='', content_type='application/json')
+        assert rv.status_code == 200
+        assert rv.json == {}
+
+    def test_body_too_large(self, client):
+        """ Test that bodies larger than the max size are rejected from their
+        `Content-Length`, before they are read
+        """
+        data = json.dumps({'name': 'Harry' * 10})
+        with mock.patch.object(DummyView, 'max_body_size', 20), \
+                mock.patch.object(DummyView, '_load_json') as load_json:
+            rv = client.post('/dummy', data=data,
+                             content_type='application/json')
+        assert rv.status_code == 413
+        assert rv.json == {'payload': 'must not be larger than 20 bytes'}
+        assert not load_json.called
+
+        with mock.patch.object(active_config, 'MAX_BODY_SIZE', 20):
+            rv = client.post('/dummy', data={'name': 'Harry' * 10})
+        assert rv.status_code == 413
+
+        with mock.patch.object(active_config, 'MAX_BODY_SIZE', None):
+            rv = client.post('/dummy', data=data,
+                             content_type='application/json')
+        assert rv.status_code == 200
+
+    def test_body_of_unknown_size_too_large(self, client):
+        """ Test that bodies without a `Content-Length` are rejected as soon
+        as they are larger than the max size
+        """
+        data = json.dumps([{'name': 'Harry'}] * 100).encode('utf-8')
+        with mock.patch.object(DummyView, 'max_body_size', 100), \
+                mock.patch.object(views, 'READ_CHUNK_SIZE', 64):
+            rv = client.put(
+                '/dummy', input_stream=BytesIO(data),
+                content_type='application/json',
+                environ_overrides={'wsgi.input_terminated': True,
+                                   'CONTENT_LENGTH': ''})
+        assert rv.status_code == 413
+
+        rv = client.put(
+            '/dummy', input_stream=BytesIO(data),
+            content_type='application/json',
+            environ_overrides={'wsgi.input_terminated': True,
+                               'CONTENT_LENGTH': ''})
+        assert rv.status_code == 200
+        assert rv.json == [{'name': 'Harry'}] * 100
+
+    @pytest.mark.parametrize('data', [
+        [{'name': 'Harry', 'tags': [1, 2]}, {'name': 'Ron'}], [],
+        {'name': 'Harry'}, 'Harry',
+    ])
+    def test_streamed_json(self, client, data):
+        """ Test that large bodies are read in chunks with the same result """
+        with mock.patch.object(active_config, 'JSON_STREAM_MIN_SIZE', 0), \
+                mock.patch.object(views, 'READ_CHUNK_SIZE', 4):
+            rv = client.put('/dummy', data=json.dumps(data),
+                            content_type='application/json')
+        assert rv.status_code == 200
+        assert rv.json == data
+
+    @pytest.mark.parametrize('data', ['[{"name": "Harry"}, ', '{"name": '])
+    def test_streamed_invalid_json(self, client, data):
+        with mock.patch.object(active_config, 'JSON_STREAM_MIN_SIZE', 0), \
+                mock.patch.object(views, 'READ_CHUNK_SIZE', 4):
+            rv = client.put('/dummy', data=data,
+                            content_type='application/json')
+        assert rv.status_code == 400
+        assert rv.json == {'payload': 'is not valid JSON'}
+
+    def test_streamed_bulk_items_limit(self, client):
+        """ Test that bulk requests are rejected as soon as they have too many
+        items, without reading the rest of the body
+        """
+        data = '[{"id": 1}, {"id": 2}, {"id": 3}, this is not read'
+        with mock.patch.multiple(active_config, JSON_STREAM_MIN_SIZE=0,
+                                 BULK_MAX_ITEMS=2), \
+                mock.patch.object(views, 'READ_CHUNK_SIZE', 8):
+            rv = client.post('/humans/bulk', data=data,
+                             content_type='application/json')
+        assert rv.status_code == 422
+        assert rv.json == {'payload': 'must not have more than 2 items'}
+
+
+class TestLazyPayload:
+    """Tests for loading the payload on first access"""
+
+    @pytest.fixture
+    def client(self):
+        yield app.test_client()
+
+    def test_not_loaded_when_unused(self, client):
+        """ Test that the payload is not loaded by handlers that ignore it """
+        Human.create(id=1, name='John')
+
+        load_payload = APIResource.load_payload
+        with mock.patch.object(APIResource, 'load_payload', autospec=True,
+                               side_effect=load_payload) as mocked:
+            rv = client.get('/humans/1?extra=1')
+            assert rv.status_code == 200
+            assert not mocked.called
+
+            rv = client.delete('/humans/1', data='not json',
+                               content_type='application/json')
+            assert rv.status_code == 204
+            assert not mocked.called
+
+            rv = client.get('/humans?per_page=5')
+            assert rv.status_code == 200
+            assert mocked.call_count == 1
+
+    def test_loaded_once(self, client):
+        """ Test that the payload is loaded on first access only """
+        def put(self):
+            request.payload['name'] = 'Ron'
+            return jsonify(request.payload)
+
+        load_payload = APIResource.load_payload
+        with mock.patch.object(DummyView, 'put', put), \
+                mock.patch.object(APIResource, 'load_payload', autospec=True,
+                                  side_effect=load_payload) as mocked:
+            rv = client.put('/dummy', data=json.dumps({'name': 'Harry'}),
+                            content_type='application/json')
+        assert rv.status_code == 200
+        assert rv.json == {'name': 'Ron'}
+        assert mocked.call_count == 1
+
+    def test_loaded_before_custom_parser(self, client):
+        """ Test that views with a custom parser load the payload at once """
+        def parser():
+            request.payload['parsed'] = True
+
+        with mock.patch.object(DummyView, '_parser_func',
+                               staticmethod(parser)):
+            rv = client.put('/dummy', data=json.dumps({'name': 'Harry'}),
+                            content_type='application/json')
+        assert rv.status_code == 200
+        assert rv.json == {'name': 'Harry', 'parsed': True}
+
+    def test_invalid_json_on_access(self, client):
+        """ Test that a body which is not valid JSON is rejected when the
+        payload is accessed
+        """
+        rv = client.post('/humans', data='{"name": ',
+                         content_type='application/json')
+        assert rv.status_code == 400
+        assert rv.json == {'payload': 'is not valid JSON'}
@@ -1,16 +1,24 @@
 """Module to test Serializer functionality"""
 
 import marshmallow as ma
+import mock
 import pytest
+from protean.conf import active_config
+from protean.core import field
+from protean.core.entity import Entity
 from protean.core.exceptions import ConfigurationError
+from protean.impl.repository.dict_repo import DictRepository
 
 from protean_flask.core.serializers import EntitySerializer
+from protean_flask.core.serializers import prefetch_associations
 
+from ..support.sample_app import app
 from ..support.sample_app.entities import Dog
 from ..support.sample_app.entities import Human
 from ..support.sample_app.entities import RelatedDog
 from ..support.sample_app.serializers import HumanDetailSerializer
 from ..support.sample_app.serializers import RelatedDogSerializer
+from ..support.sample_app.views import HumanResourceSet
 
 
 class DogSerializer(EntitySerializer):
@@ -103,6 +111,70 @@ class TestEntitySerializer:
         }
         assert s_result.data == expected_data
 
+    def test_compiled_fields_cache(self):
+        """ Test that the entity fields are compiled once per class"""
+        EntitySerializer._compiled_fields.clear()
+
+        s1 = DogSerializer()
+        s2 = DogSerializer()
+        assert len(EntitySerializer._compiled_fields) == 1
+
+        # Each instance gets its own copy of the fields
+        assert s1.fields['name'] is not s2.fields['name']
+        assert s1.fields['name'].parent is s1
+        assert s2.fields['name'].parent is s2
+
+        # Check that the entity gets serialized the same way
+        dog = Dog(id=1, name='Johnny', owner='John')
+        assert s1.dump(dog).data == s2.dump(dog).data
+
+        # Construction options get their own compiled fields
+        s3 = DogSerializer(only=('id', 'name'))
+        assert len(EntitySerializer._compiled_fields) == 2
+        assert s3.dump(dog).data == {'id': 1, 'name': 'Johnny'}
+
+    def test_compiled_caches_bounded(self):
+        """ Test that the caches only keep the latest compiled field sets, as
+        clients select the fields of the responses
+        """
+        EntitySerializer._compiled_fields.clear()
+        EntitySerializer._compiled_dumps.clear()
+
+        fields = ['id', 'name', 'owner', 'age']
+        with mock.patch.object(active_config, 'SERIALIZER_CACHE_SIZE', 3):
+            for size in range(1, len(fields) + 1):
+                for index in range(len(fields) - size + 1):
+                    serializer = DogSerializer(
+                        only=fields[index:index + size])
+                    serializer.get_compiled_dump()
+            assert len(EntitySerializer._compiled_fields) == 3
+            assert len(EntitySerializer._compiled_dumps) == 3
+
+            # The latest entries are still used
+            serializer = DogSerializer(only=fields)
+            assert len(EntitySerializer._compiled_fields) == 3
+            assert serializer.dump(Dog(
+                id=1, name='Johnny', owner='John')).data == {
+                    'id': 1, 'name': 'Johnny', 'owner': 'John', 'age': 5}
+
+    def test_compiled_fields_invalidation(self):
+        """ Test that the cache is invalidated when entity fields change"""
+
+        class Cat(Entity):
+            """ Dummy Cat entity for this test"""
+            id = field.Integer(identifier=True)
+            name = field.String(max_length=50)
+
+        class CatSerializer(EntitySerializer):
+            """ Serializer for the Cat Entity """
+            class Meta:
+                entity = Cat
+
+        assert set(CatSerializer().fields) == {'id', 'name'}
+
+        Cat.meta_.declared_fields['age'] = field.Integer()
+        assert set(CatSerializer().fields) == {'id', 'name', 'age'}
+
 
 class TestEntitySerializer2:
     """Tests for EntitySerializer class with related fields """
@@ -141,3 +213,188 @@ class TestEntitySerializer2:
             'contact': None
         }
         assert s_result.data == expected_data
+
+
+class TestPrefetch:
+    """Tests for loading the associations of the serialized entities"""
+
+    @pytest.fixture
+    def humans(self):
+        """ Create humans with two dogs each """
+        humans = [Human.create(id=i, name=f'Human {i}') for i in range(1, 6)]
+        for human in humans:
+            for j in range(2):
+                RelatedDog.create(id=human.id * 10 + j, name=f'Dog {j}',
+                                  owner=human)
+        return humans
+
+    @staticmethod
+    def count_queries():
+        """ Count the queries to the repositories """
+        return mock.patch.object(
+            DictRepository, 'filter', autospec=True,
+            side_effect=DictRepository.filter)
+
+    def test_has_many(self, humans):
+        """ Test loading a has many association with one query """
+        expected = HumanDetailSerializer(many=True).dump(
+            Human.query.all().items).data
+
+        entities = Human.query.all().items
+        with self.count_queries() as queries:
+            result = HumanDetailSerializer(
+                many=True, prefetch=['dogs']).dump(entities)
+            assert queries.call_count == 1
+
+        assert result.data == expected
+        assert [dog['id'] for dog in result.data[0]['dogs']] == [10, 11]
+
+    def test_has_many_first_page(self, humans):
+        """ Test that prefetching loads the same first page of a has many
+        association as the lazy lookup
+        """
+        for i in range(15):
+            RelatedDog.create(id=100 + i, name=f'Dog {i}', owner=humans[0])
+
+        expected = HumanDetailSerializer(many=True).dump(
+            Human.query.all().items).data
+        assert len(expected[0]['dogs']) == 10
+
+        entities = Human.query.all().items
+        result = HumanDetailSerializer(
+            many=True, prefetch=['dogs']).dump(entities)
+        assert result.data == expected
+
+        lazy = Human.get(1).dogs
+        assert type(entities[0].dogs) is type(lazy)
+        assert entities[0].dogs.total == lazy.total == 17
+
+    def test_reference(self, humans):
+        """ Test loading a reference with one query """
+        expected = RelatedDogSerializer(many=True).dump(
+            RelatedDog.query.limit(20).all().items).data
+
+        class PrefetchedDogSerializer(RelatedDogSerializer):
+            """ Serializer prefetching the owner of the dogs """
+            class Meta:
+                entity = RelatedDog
+                prefetch = ['owner']
+
+        entities = RelatedDog.query.limit(20).all().items
+        with self.count_queries() as queries:
+            result = PrefetchedDogSerializer(many=True).dump(entities)
+            assert queries.call_count == 1
+
+        assert result.data == expected
+
+    def test_nested(self, humans):
+        """ Test loading the associations of the associated entities """
+        entities = Human.query.all().items
+        with self.count_queries() as queries:
+            prefetch_associations(entities, ['dogs.owner'])
+            assert queries.call_count == 2
+
+            assert entities[0].dogs[0].owner.name == 'Human 1'
+            assert queries.call_count == 2
+
+        with pytest.raises(ConfigurationError):
+            prefetch_associations(entities, ['name'])
+
+    def test_view(self, humans):
+        """ Test prefetching the associations of a list view """
+        with mock.patch.multiple(HumanResourceSet,
+                                 serializer_cls=HumanDetailSerializer,
+                                 prefetch=['dogs']), \
+                self.count_queries() as queries:
+            rv = app.test_client().get('/humans')
+            assert rv.status_code == 200
+            assert queries.call_count == 2
+
+            # Associations that are not serialized are not loaded
+            queries.reset_mock()
+            rv = app.test_client().get('/humans?fields=id,name')
+            assert queries.call_count == 1
+
+
+class Pet(Entity):
+    """ Entity with fields of all the simple types """
+    id = field.Integer(identifier=True)
+    name = field.String(max_length=50)
+    weight = field.Float()
+    vaccinated = field.Boolean()
+    tags = field.List()
+    details = field.Dict()
+
+
+class PetSerializer(EntitySerializer):
+    """ Serializer for the Pet entity """
+    class Meta:
+        entity = Pet
+
+
+class CompiledPetSerializer(EntitySerializer):
+    """ Serializer for the Pet entity with a compiled dump function """
+    class Meta:
+        entity = Pet
+        compiled_dump = True
+
+
+class TestCompiledDump:
+    """Tests for the compiled dump functions of EntitySerializer"""
+
+    @pytest.fixture
+    def pets(self):
+        """ Pets with all kinds of values """
+        return [
+            Pet(id=1, name='Johnny', weight=12.5, vaccinated=True,
+                tags=['small', 'brown'], details={'breed': 'beagle'}),
+            Pet(id=2, name='Mary', weight=3, vaccinated=False, tags=[],
+                details={}),
+            Pet(id=3),
+        ]
+
+    def test_same_output(self, pets):
+        """ Test that the output is the same as marshmallow's """
+        serializer = CompiledPetSerializer()
+        assert serializer.get_compiled_dump() is not None
+
+        assert CompiledPetSerializer(many=True).dump(pets) == \
+            PetSerializer(many=True).dump(pets)
+        for pet in pets:
+            assert serializer.dump(pet) == PetSerializer().dump(pet)
+
+        assert CompiledPetSerializer(only=('id', 'tags')).dump(pets[0]) == \
+            PetSerializer(only=('id', 'tags')).dump(pets[0])
+
+    def test_compiled_once(self, pets):
+        """ Test that the dump function is compiled once per fields """
+        dump_entity = CompiledPetSerializer().get_compiled_dump()
+        assert CompiledPetSerializer().get_compiled_dump() is dump_entity
+        assert CompiledPetSerializer(
+            only=('id', )).get_compiled_dump() is not dump_entity
+
+    def test_fallback(self, pets):
+        """ Test that marshmallow dumps what the compiled functions cannot """
+
+        class DetailSerializer(CompiledPetSerializer):
+            """ Serializer with a method field """
+            label = ma.fields.Method('get_label')
+
+            def get_label(self, obj):
+                """ Return the label of the pet """
+                return f'{obj.id}: {obj.name}'
+
+        serializer = DetailSerializer()
+        assert serializer.get_compiled_dump() is None
+        assert serializer.dump(pets[0]).data['label'] == '1: Johnny'
+
+        # Objects that are not entities are dumped by marshmallow
+        data = {'id': 4, 'name': 'Rex'}
+        assert CompiledPetSerializer().dump(data).data == {
+            'id': 4, 'name': 'Rex'}
+
+        # Values that cannot be converted are reported by marshmallow
+        pet = Pet(id=5, name='Rex')
+        pet.__dict__['weight'] = 'heavy'
+        result = CompiledPetSerializer().dump(pet)
+        assert result.errors == {'weight': ['Not a valid number.']}
@@ -0,0 +1,106 @@
+"""Module to test selecting the fields of the responses"""
+import json
+
+import mock
+import pytest
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Dog
+from tests.support.sample_app.entities import Human
+from tests.support.sample_app.serializers import DogSerializer
+from tests.support.sample_app.views import HumanResourceSet
+from tests.support.sample_app.views import ListDogResource
+from tests.support.sample_app.views import ShowDogResource
+
+
+class TestSparseFields:
+    """Tests for the `fields` query argument"""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        """ Setup client for test cases """
+        yield app.test_client()
+
+    def test_show(self, client):
+        """ Test selecting the fields of an entity """
+        Dog.create(id=5, name='Johnny', owner='John')
+
+        rv = client.get('/dogs/5?fields=id,name')
+        assert rv.status_code == 200
+        assert rv.json == {'dog': {'id': 5, 'name': 'Johnny'}}
+
+        rv = client.get('/dogs/5')
+        assert rv.json == {
+            'dog': {'id': 5, 'name': 'Johnny', 'owner': 'John', 'age': 5}}
+
+    def test_list(self, client):
+        """ Test selecting the fields of the listed entities """
+        Dog.create(id=1, name='Johnny', owner='John')
+        Dog.create(id=2, name='Mary', owner='Jane')
+
+        rv = client.get('/dogs?fields=name&fields=owner&owner=John')
+        assert rv.status_code == 200
+        assert rv.json['total'] == 1
+        assert rv.json['dogs'] == [{'name': 'Johnny', 'owner': 'John'}]
+
+    def test_streamed(self, client):
+        """ Test selecting the fields of streamed and exported lists """
+        Human.create(id=1, name='John', contact='9000900090')
+
+        with mock.patch.object(ListDogResource, 'stream_list', True):
+            Dog.create(id=1, name='Johnny', owner='John')
+            rv = client.get('/dogs?fields=id')
+            assert json.loads(rv.get_data())['dogs'] == [{'id': 1}]
+
+        rv = client.get('/humans/export?fields=name')
+        assert [json.loads(line) for line in rv.get_data().splitlines()] == [
+            {'name': 'John'}]
+
+    def test_invalid(self, client):
+        """ Test the errors for unknown and empty field selections """
+        Dog.create(id=5, name='Johnny', owner='John')
+
+        rv = client.get('/dogs/5?fields=name,unknown')
+        assert rv.status_code == 422
+        assert rv.json == {'fields': 'cannot include unknown'}
+
+        rv = client.get('/dogs?fields=,')
+        assert rv.status_code == 422
+        assert rv.json == {'fields': 'is invalid'}
+
+    def test_allowed_fields(self, client):
+        """ Test that only the allowed fields can be selected """
+        Human.create(id=1, name='John', contact='9000900090')
+
+        with mock.patch.object(HumanResourceSet, 'allowed_fields',
+                               ('id', 'name')):
+            rv = client.get('/humans/1?fields=name')
+            assert rv.json == {'human': {'name': 'John'}}
+
+            rv = client.get('/humans/1?fields=contact')
+            assert rv.status_code == 422
+
+            # All the fields are still returned without a selection
+            rv = client.get('/humans/1')
+            assert rv.json['human']['contact'] == '9000900090'
+
+    def test_compiled_fields(self, client):
+        """ Test that the fields of each selection are compiled once """
+        Dog.create(id=5, name='Johnny', owner='John')
+        client.get('/dogs/5?fields=name,id')
+
+        with mock.patch.object(DogSerializer, 'build_field') as build_field:
+            client.get('/dogs/5?fields=id,name')
+            client.get('/dogs?fields=id,name')
+            assert not build_field.called
+
+    def test_etag(self, client):
+        """ Test that the ETag of an entity depends on the selected fields """
+        Dog.create(id=5, name='Johnny', owner='John')
+
+        with mock.patch.multiple(ShowDogResource, use_etags=True,
+                                 etag_field='name'):
+            etag = client.get('/dogs/5').headers['ETag']
+            rv = client.get('/dogs/5?fields=id',
+                            headers={'If-None-Match': etag})
+            assert rv.status_code == 200
+            assert rv.headers['ETag'] != etag
@@ -0,0 +1,90 @@
+"""Module to test streaming of list responses"""
+import mock
+import pytest
+from protean.conf import active_config
+from tests.support.sample_app import app
+from tests.support.sample_app.entities import Dog
+from tests.support.sample_app.entities import Human
+from tests.support.sample_app.views import HumanResourceSet
+from tests.support.sample_app.views import ListDogResource
+
+
+class TestStreamedList:
+    """Tests for the streamed list responses"""
+
+    @pytest.fixture(scope="function")
+    def client(self):
+        """ Setup client for test cases """
+        yield app.test_client()
+
+    @pytest.fixture(params=['stdlib', 'orjson'])
+    def json_backend(self, request):
+        """ Run the test with each of the JSON backends """
+        if request.param != 'stdlib':
+            pytest.importorskip(request.param)
+
+        original = active_config.JSON_BACKEND
+        active_config.JSON_BACKEND = request.param
+        yield request.param
+        active_config.JSON_BACKEND = original
+
+    def fetch(self, client, view_cls, url, **options):
+        """ Return the buffered and the streamed responses for the url """
+        buffered = client.get(url)
+        with mock.patch.multiple(view_cls, stream_list=True, **options):
+            streamed = client.get(url)
+        return buffered, streamed
+
+    def test_same_output(self, client, json_backend):
+        """ Test that the streamed output is the same as the buffered one """
+        for i in range(1, 6):
+            Dog.create(id=i, name=f'Dog {i}', owner='John', age=i)
+
+        buffered, streamed = self.fetch(
+            client, ListDogResource, '/dogs?order_by[]=age',
+            stream_chunk_size=2)
+        # Streamed responses are sent without a content length
+        assert 'Content-Length' in buffered.headers
+        assert 'Content-Length' not in streamed.headers
+        assert streamed.status_code == 200
+        assert streamed.mimetype == 'application/json'
+        assert streamed.data == buffered.data
+        assert streamed.json['total'] == 5
+
+    def test_viewset(self, client):
+        """ Test streaming the list of a resource set """
+        Human.create(id=1, name='John')
+        Human.create(id=2, name='Jane')
+
+        buffered, streamed = self.fetch(
+            client, HumanResourceSet, '/humans?order_by[]=id',
+            stream_chunk_size=1)
+        assert streamed.data == buffered.data
+        assert streamed.json['humans'][1]['name'] == 'Jane'
+
+    def test_empty_list(self, client):
+        """ Test streaming a list with no items """
+        buffered, streamed = self.fetch(client, ListDogResource, '/dogs')
+        assert streamed.data == buffered.data
+        assert streamed.json == {'dogs': [], 'total': 0, 'page': 1}
+
+    def test_pretty_print(self, client):
+        """ Test that pretty printed responses are still identical """
+        Dog.create(id=1, name='Johnny', owner='John')
+        Dog.create(id=2, name='Mary', owner='John')
+
+        with mock.patch.dict(app.config, JSONIFY_PRETTYPRINT_REGULAR=True):
+            buffered, streamed = self.fetch(
+                client, ListDogResource, '/dogs', stream_chunk_size=1)
+        assert b'\n  ' in buffered.data
+        assert streamed.data == buffered.data
+
+    def test_config_default(self, client):
+        """ Test that streaming can be enabled for all the views """
+        Dog.create(id=1, name='Johnny', owner='John')
+
+        with mock.patch.object(active_config, 'STREAM_LIST_RESPONSES', True,
+                               create=True):
+            rv = client.get('/dogs')
+        assert 'Content-Length' not in rv.headers
+        assert rv.json['total'] == 1
@@ -2,10 +2,44 @@
 
 import json
 
+import mock
 import pytest
+from flask import Response
+from protean.conf import active_config
 from protean.core.exceptions import ObjectNotFoundError
+from protean.core.exceptions import UsecaseExecutionError
+from protean.core.transport import Status
+from tests.support.sample_app import api
 from tests.support.sample_app import app
 from tests.support.sample_app.entities import Dog
+from tests.support.sample_app.views import ListDogResource
+from tests.support.sample_app.views import ShowDogResource
+
+from protean_flask.core.renderers import render_json
+from protean_flask.core.views import APIResource
+
+
+def render_text(data, code, headers):
+    """ Render the response as plain text """
+    return Response(str(data), code, headers, mimetype='text/plain')
+
+
+class TextResource(APIResource):
+    """ View with a renderer defined as an import string """
+    renderer = 'tests.core.test_view.render_text'
+
+    def get(self):
+        """ Return a simple response """
+        return 'pong'
+
+    def put(self):
+        """ Fail with a use case error """
+        raise UsecaseExecutionError(
+            (Status.UNPROCESSABLE_ENTITY, {'name': 'is invalid'}))
+
+
+app.add_url_rule('/text', view_func=TextResource.as_view('text'),
+                 methods=['GET', 'PUT'])
 
 
 class TestGenericAPIResource:
@@ -58,6 +92,19 @@ class TestGenericAPIResource:
         assert rv.status_code == 200
         assert rv.json['total'] == 1
 
+    def test_resource_names(self, client):
+        """ Test overriding the keys of the entities in the responses """
+        Dog.create(id=1, name='Johnny', owner='John')
+
+        with mock.patch.object(ListDogResource, 'resource_name', 'puppy'):
+            rv = client.get('/dogs')
+        assert rv.json['puppies'][0]['name'] == 'Johnny'
+
+        with mock.patch.multiple(ShowDogResource, resource_name='puppy',
+                                 resource_name_plural='litter'):
+            rv = client.get('/dogs/1')
+        assert rv.json['puppy']['name'] == 'Johnny'
+
     def test_create(self, client):
         """ Test creating an entity using CreateAPIResource """
 
@@ -136,3 +183,41 @@ def test_flask_view():
 
 def test_exception():
     """ Test handling of exceptions by the app """
+
+
+class TestRendererResolution:
+    """Class to test resolution of renderers when the view is registered"""
+
+    def test_resolved_on_registration(self):
+        """ Test that the renderers are resolved by `as_view` """
+        assert TextResource._renderer_func is render_text
+        assert ShowDogResource._renderer_func is render_json
+        assert TextResource._parser_func is None
+
+    def test_custom_renderer(self):
+        """ Test that the resolved renderer is used for responses """
+        client = app.test_client()
+
+        rv = client.get('/text')
+        assert rv.status_code == 200
+        assert rv.data == b'pong'
+
+        # Errors are also rendered with the renderer of the view
+        rv = client.put('/text')
+        assert rv.status_code == 422
+        assert rv.data == b"{'name': 'is invalid'}"
+
+    def test_reload_config(self):
+        """ Test that reloading the config resolves the renderers again """
+        default_renderer = active_config.DEFAULT_RENDERER
+        active_config.DEFAULT_RENDERER = 'tests.core.test_view.render_text'
+        try:
+            api.reload_config()
+            assert ShowDogResource._renderer_func is render_text
+            assert TextResource._renderer_func is render_text
+            assert api.default_renderer is render_text
+        finally:
+            active_config.DEFAULT_RENDERER = default_renderer
+            api.reload_config()
+
+        assert ShowDogResource._renderer_func is render_json
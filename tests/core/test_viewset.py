@@ -1,10 +1,14 @@
 """Module to test Viewset functionality and features"""
 import json
 
+import mock
 import pytest
+from protean.conf import active_config
+from protean.core.tasklet import Tasklet
 from tests.support.sample_app import app
 from tests.support.sample_app.entities import Dog
 from tests.support.sample_app.entities import Human
+from tests.support.sample_app.views import HumanResourceSet
 
 
 class TestGenericAPIResourceSet:
@@ -107,3 +111,220 @@ class TestGenericAPIResourceSet:
         assert rv.json['total'] == 2
         assert rv.json['dogs'][0] == {'age': 3, 'id': 2, 'name': 'Mary',
                                       'owner': 'John'}
+
+    def test_export(self, client):
+        """ Test exporting all the entities as newline delimited JSON """
+        for i in range(1, 6):
+            Human.create(id=i, name='John' if i % 2 else 'Jane')
+
+        # Export in batches smaller than the number of entities
+        with mock.patch.object(HumanResourceSet, 'export_batch_size', 2):
+            rv = client.get('/humans/export')
+        assert rv.status_code == 200
+        assert rv.mimetype == 'application/x-ndjson'
+
+        lines = rv.data.decode().splitlines()
+        assert [json.loads(line)['id'] for line in lines] == [1, 2, 3, 4, 5]
+        assert json.loads(lines[1]) == {'id': 2, 'name': 'Jane', 'contact': None}
+
+        # Filters are applied to the export
+        rv = client.get('/humans/export?name=Jane&order_by[]=-id')
+        lines = rv.data.decode().splitlines()
+        assert [json.loads(line)['id'] for line in lines] == [4, 2]
+
+    def test_export_keyset(self, client):
+        """ Test that the batches of an export are fetched after the last
+        identifier of the previous batch, so that no entity is skipped when
+        one is deleted during the export
+        """
+        for i in range(1, 6):
+            Human.create(id=i, name=f'Human {i}')
+
+        payloads = []
+        perform = Tasklet.perform
+
+        def record_perform(entity_cls, usecase_cls, request_object_cls,
+                           payload, **kwargs):
+            payloads.append(payload)
+            if len(payloads) == 2:
+                Human.get(1).delete()
+            return perform(entity_cls, usecase_cls, request_object_cls,
+                           payload, **kwargs)
+
+        with mock.patch.object(HumanResourceSet, 'export_batch_size', 2), \
+                mock.patch.object(Tasklet, 'perform',
+                                  side_effect=record_perform):
+            rv = client.get('/humans/export')
+            lines = rv.data.decode().splitlines()
+
+        assert [json.loads(line)['id'] for line in lines] == [1, 2, 3, 4, 5]
+        assert [payload.get('id__gt') for payload in payloads] == [None, 2, 4]
+        assert all('page' not in payload for payload in payloads)
+
+        # Other orders than the identifier cannot be paginated on
+        rv = client.get('/humans/export?order_by=name')
+        assert rv.status_code == 422
+
+    def test_export_empty(self, client):
+        """ Test exporting when there are no entities """
+        rv = client.get('/humans/export')
+        assert rv.status_code == 200
+        assert rv.data == b''
+
+    def test_bulk_create(self, client):
+        """ Test creating many entities in one request """
+        rv = client.post('/humans/bulk', data=json.dumps([
+            dict(id=1, name='John'), dict(id=2), dict(id=3, name='Jane')]),
+            content_type='application/json')
+        assert rv.status_code == 200
+
+        results = rv.json['results']
+        assert results[0] == {
+            'code': 201, 'human': {'contact': None, 'id': 1, 'name': 'John'}}
+        assert results[1] == {
+            'code': 422, 'message': {'name': ['This field is required.']}}
+        assert results[2]['code'] == 201
+        assert Human.query.total == 2
+
+    def test_bulk_update(self, client):
+        """ Test updating many entities in one request """
+        Human.create(id=1, name='John')
+        Human.create(id=2, name='Jane')
+
+        rv = client.put('/humans/bulk', data=json.dumps([
+            dict(identifier=1, data=dict(contact='9000900090')),
+            dict(identifier=2, data=dict(name='Mary')),
+            dict(identifier=5, data=dict(name='Mary'))]),
+            content_type='application/json')
+        assert rv.status_code == 200
+
+        results = rv.json['results']
+        assert results[0]['human']['contact'] == '9000900090'
+        assert results[1]['human']['name'] == 'Mary'
+        assert results[2]['code'] == 404
+        assert Human.get(2).name == 'Mary'
+
+    def test_bulk_delete(self, client):
+        """ Test deleting many entities in one request """
+        Human.create(id=1, name='John')
+        Human.create(id=2, name='Jane')
+
+        rv = client.delete('/humans/bulk', data=json.dumps([1, 2, 3]),
+                           content_type='application/json')
+        assert rv.status_code == 200
+        assert rv.json['results'] == [
+            {'code': 204}, {'code': 204},
+            {'code': 404, 'message': {'identifier': 'Object with this ID does not exist.'}}]
+        assert Human.query.total == 0
+
+    def test_bulk_atomic(self, client):
+        """ Test that atomic bulk requests fail at the first error """
+        unit_of_work = mock.MagicMock()
+        with mock.patch.object(HumanResourceSet, 'unit_of_work',
+                               return_value=unit_of_work):
+            rv = client.post('/humans/bulk?atomic=true', data=json.dumps([
+                dict(id=1, name='John'), dict(id=2), dict(id=3, name='Jane')]),
+                content_type='application/json')
+        assert rv.status_code == 422
+        assert rv.json == {
+            'code': 422, 'message': {'name': ['This field is required.']}, 'index': 1}
+        assert unit_of_work.__enter__.called
+        assert unit_of_work.__exit__.called
+
+        # The third item was never processed
+        assert Human.query.total == 1
+
+    def test_bulk_atomic_without_unit_of_work(self, client):
+        """ Test that atomic bulk requests are rejected when the use cases
+        cannot be run in a unit of work
+        """
+        rv = client.post('/humans/bulk?atomic=true', data=json.dumps([
+            dict(id=1, name='John'), dict(id=2)]),
+            content_type='application/json')
+        assert rv.status_code == 422
+        assert rv.json == {'atomic': 'is not supported by this resource'}
+        assert Human.query.total == 0
+
+    def test_bulk_invalid_items(self, client):
+        """ Test that bulk items of the wrong type fail with a 422 result """
+        Human.create(id=1, name='John')
+        invalid_object = {
+            'code': 422, 'message': {'payload': 'must be an object'}}
+
+        rv = client.put('/humans/bulk', data=json.dumps([1, 2]),
+                        content_type='application/json')
+        assert rv.status_code == 200
+        assert rv.json['results'] == [invalid_object, invalid_object]
+
+        rv = client.post('/humans/bulk', data=json.dumps(
+            ['John', dict(id=2, name='Jane')]),
+            content_type='application/json')
+        assert rv.status_code == 200
+        assert rv.json['results'][0] == invalid_object
+        assert rv.json['results'][1]['code'] == 201
+
+        rv = client.delete('/humans/bulk', data=json.dumps(
+            [{'identifier': 1}, None, True, 2]),
+            content_type='application/json')
+        assert rv.status_code == 200
+        invalid_identifier = {
+            'code': 422, 'message': {'identifier': 'is invalid'}}
+        assert rv.json['results'] == [
+            invalid_identifier, invalid_identifier, invalid_identifier,
+            {'code': 204}]
+
+        unit_of_work = mock.MagicMock()
+        with mock.patch.object(HumanResourceSet, 'unit_of_work',
+                               return_value=unit_of_work):
+            rv = client.put('/humans/bulk?atomic=true', data=json.dumps(
+                [dict(identifier=1, data=dict(name='Jane')), 2]),
+                content_type='application/json')
+        assert rv.status_code == 422
+        assert rv.json == dict(invalid_object, index=1)
+
+    def test_bulk_invalid_payload(self, client):
+        """ Test that bulk requests only accept a list of bounded size """
+        rv = client.post('/humans/bulk', data=json.dumps(dict(id=1, name='John')),
+                         content_type='application/json')
+        assert rv.status_code == 422
+        assert rv.json == {'payload': 'must be a list'}
+
+        with mock.patch.object(active_config, 'BULK_MAX_ITEMS', 1):
+            rv = client.post('/humans/bulk', data=json.dumps([{}, {}]),
+                             content_type='application/json')
+        assert rv.status_code == 422
+        assert rv.json == {'payload': 'must not have more than 1 items'}
+
+    def test_batch(self, client):
+        """ Test getting many entities by their identifiers """
+        for i in range(1, 4):
+            Human.create(id=i, name=f'Human {i}')
+
+        perform = Tasklet.perform
+        with mock.patch.object(Tasklet, 'perform',
+                               side_effect=perform) as mocked:
+            rv = client.get('/humans/batch?ids=3,1,99,abc,1')
+            assert mocked.call_count == 1
+
+        assert rv.status_code == 200
+        assert rv.json == {'humans': {
+            '3': {'id': 3, 'name': 'Human 3', 'contact': None},
+            '1': {'id': 1, 'name': 'Human 1', 'contact': None},
+            '99': None,
+            'abc': None,
+        }}
+
+        # The fields of the entities can be selected
+        rv = client.get('/humans/batch?ids=2&fields=name')
+        assert rv.json == {'humans': {'2': {'name': 'Human 2'}}}
+
+    def test_batch_invalid(self, client):
+        """ Test that batch requests need a bounded number of identifiers """
+        rv = client.get('/humans/batch')
+        assert rv.status_code == 422
+        assert rv.json == {'ids': 'is required'}
+
+        with mock.patch.object(active_config, 'BATCH_MAX_ITEMS', 2):
+            rv = client.get('/humans/batch?ids=1,2,3')
+        assert rv.status_code == 422
+        assert rv.json == {'ids': 'must not have more than 2 items'}
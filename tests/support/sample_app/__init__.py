@@ -4,6 +4,7 @@ from flask import Flask
 from protean_flask import Protean
 
 from .blueprint import blueprint
+from .views import AsyncHumanResource
 from .views import CreateDogResource
 from .views import CurrentContextResource
 from .views import DeleteDogResource
@@ -34,9 +35,12 @@ app.add_url_rule('/dogs/<int:identifier>',
 app.add_url_rule('/flask-view', view_func=flask_view,
                  methods=['GET'])
 app.add_url_rule('/current-context', methods=['GET'],
-                 view_func=CurrentContextResource.as_view('current_context'))\
+                 view_func=CurrentContextResource.as_view('current_context'))
+app.add_url_rule('/async/humans/<int:identifier>', methods=['GET'],
+                 view_func=AsyncHumanResource.as_view('async_human'))
 
 api.register_viewset(HumanResourceSet, 'humans', '/humans', pk_type='int',
-                     additional_routes=['/<int:identifier>/my_dogs'])
+                     additional_routes=['/<int:identifier>/my_dogs'],
+                     export=True, bulk=True, batch=True)
 
 app.register_blueprint(blueprint, url_prefix='/blueprint')
@@ -1,6 +1,11 @@
 """ Views of the sample app"""
+import asyncio
+
 from protean.context import context
+from protean.core.usecase import ShowRequestObject
+from protean.core.usecase import ShowUseCase
 
+from protean_flask.core.async_views import AsyncGenericAPIResource
 from protean_flask.core.views import APIResource
 from protean_flask.core.views import CreateAPIResource
 from protean_flask.core.views import DeleteAPIResource
@@ -91,3 +96,22 @@ class CurrentContextResource(APIResource):
             'remote_addr': context.remote_addr
         }
         return context_data
+
+
+class AsyncHumanResource(AsyncGenericAPIResource):
+    """ Async view for retrieving a Human with their dogs """
+    entity_cls = Human
+    serializer_cls = HumanSerializer
+
+    async def get(self, identifier):
+        """ Fetch the Human and their dogs at the same time """
+        payload = {'identifier': identifier}
+        (result, _, _), dogs_list = await asyncio.gather(
+            self.process_request(ShowUseCase, ShowRequestObject, payload),
+            self.process_request(
+                ListMyDogsUsecase, ListMyDogsRequestObject, payload,
+                no_serialization=True))
+
+        result['human']['dogs'] = DogSerializer(many=True).dump(
+            dogs_list.items).data
+        return result, 200
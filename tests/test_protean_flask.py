@@ -1,9 +1,16 @@
 """Tests for Protean Flask's main method"""
 
+import mock
+import pytest
 from click.testing import CliRunner
+from protean.conf import active_config
+from protean.context import context
+from protean.core.exceptions import ConfigurationError
 
 from protean_flask.cli import main
+from protean_flask.core import context as request_context
 
+from .support.sample_app import api
 from .support.sample_app import app
 
 
@@ -29,3 +36,44 @@ def test_protean_context():
         'user_agent': 'werkzeug/0.15.5',
         'user_agent_hash': '4065e0471cee81c2f0845a4e59c834bae3351b96c84ddf6b1f8d6f803ec1dba4'
     }
+
+
+def test_protean_context_lazy():
+    """ Test that the context values are computed only when read """
+    loaders = dict(request_context.CONTEXT_LOADERS)
+    loaders['url'] = mock.Mock(return_value='http://localhost/lazy')
+
+    with mock.patch.dict(request_context.CONTEXT_LOADERS, loaders), \
+            app.test_request_context('/lazy'):
+        api._load_protean()
+        assert not loaders['url'].called
+
+        assert context.url == 'http://localhost/lazy'
+        assert context.url == 'http://localhost/lazy'
+        assert loaders['url'].call_count == 1
+        context.cleanup()
+
+
+def test_protean_context_keys():
+    """ Test that only the configured context keys are available """
+    with mock.patch.object(active_config, 'CONTEXT_KEYS', ['tenant_id']):
+        api.reload_config()
+        try:
+            with app.test_request_context('/'):
+                context.set_context({'custom': 'value'})
+                api._load_protean()
+                assert context.tenant_id == 'localhost'
+                assert context.custom == 'value'
+                with pytest.raises(AttributeError):
+                    context.user_agent
+                context.cleanup()
+        finally:
+            api.reload_config()
+
+
+def test_protean_context_unknown_keys():
+    """ Test that unknown context keys are not accepted """
+    with mock.patch.object(active_config, 'CONTEXT_KEYS', ['unknown']):
+        with pytest.raises(ConfigurationError):
+            api.reload_config()
+    api.reload_config()
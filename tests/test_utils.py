@@ -0,0 +1,113 @@
+"""Tests for the utility functions of Protean Flask"""
+import mock
+import pytest
+from protean.conf import active_config
+from werkzeug.datastructures import CombinedMultiDict
+from werkzeug.datastructures import ImmutableMultiDict
+
+from protean_flask.utils import TenantResolver
+from protean_flask.utils import derive_tenant
+from protean_flask.utils import immutable_dict_2_dict
+from protean_flask.utils import normalize_key
+
+from .support.sample_app import api
+from .support.sample_app import app
+
+
+@pytest.mark.parametrize('items, expected', [
+    ([('name', 'Harry')], {'name': 'Harry'}),
+    ([('tags', '1'), ('tags', '2')], {'tags': ['1', '2']}),
+    ([('tags[]', '1')], {'tags': ['1']}),
+    ([('filter[name]', 'x'), ('filter[age]', '3')],
+     {'filter': {'name': 'x', 'age': '3'}}),
+    ([('a[0][b]', 'y'), ('a[0][c]', 'z'), ('a[1][b]', 'w')],
+     {'a': {'0': {'b': 'y', 'c': 'z'}, '1': {'b': 'w'}}}),
+    ([('a[b][]', '1'), ('a[c]', '1'), ('a[c]', '2')],
+     {'a': {'b': ['1'], 'c': ['1', '2']}}),
+    ([('a', '1'), ('a[b]', '2')], {'a': {'b': '2'}}),
+    ([('[]', '1'), ('a[', '2'), ('a[][b]', '3')],
+     {'': ['1'], 'a[': '2', 'a[][b]': '3'}),
+])
+def test_immutable_dict_2_dict(items, expected):
+    """ Test converting multi dicts, with the bracket syntax for lists and
+    nested dicts
+    """
+    assert immutable_dict_2_dict(ImmutableMultiDict(items)) == expected
+
+
+def test_immutable_dict_2_dict_merge():
+    """ Test converting combined multi dicts, and adding to a dict """
+    form = ImmutableMultiDict([('a[b]', '1'), ('c', '2')])
+    files = ImmutableMultiDict([('a[d]', '3')])
+    assert immutable_dict_2_dict(CombinedMultiDict([form, files])) == \
+        {'a': {'b': '1', 'd': '3'}, 'c': '2'}
+
+    payload = immutable_dict_2_dict(form)
+    assert immutable_dict_2_dict(files, into=payload) is payload
+    assert payload == {'a': {'b': '1', 'd': '3'}, 'c': '2'}
+
+    # The lists of values of the multi dict are not shared
+    imm_dict = ImmutableMultiDict([('tags', '1'), ('tags', '2')])
+    immutable_dict_2_dict(imm_dict)['tags'].append('3')
+    assert imm_dict.getlist('tags') == ['1', '2']
+
+
+def test_normalize_key_cache():
+    """ Test that the normalization of the keys is memoized """
+    normalize_key.cache_clear()
+    for key in ['filter[name]', 'tags[]', 'filter[name]']:
+        normalize_key(key)
+
+    info = normalize_key.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+    assert normalize_key('filter[name]') == \
+        (('filter', 'name'), ('filter', 'name'), False)
+
+
+@pytest.mark.parametrize('url, tenant', [
+    ('http://localhost/dogs', 'localhost'),
+    ('http://domain.com', 'domain.com'),
+    ('https://acme.domain.com/humans/1', 'acme.domain.com'),
+    ('https://customers.acme.domain.com:8000/', 'acme.domain.com'),
+    ('http://backoffice.eu.acme.domain.com/', 'acme.domain.com'),
+    ('http://127.0.0.1:5000/', '127.0.0.1'),
+    ('/dogs', None),
+])
+def test_derive_tenant(url, tenant):
+    """ Test that tenants follow the `subdomain.domain.com` rule """
+    assert derive_tenant(url) == tenant
+
+
+def test_tenant_resolver():
+    """ Test resolving the tenant of hosts with a mapping """
+    resolver = TenantResolver([
+        ('api.example.com', 'example'),
+        (r'(\w+)\.shop\.io', r'shop-\1'),
+    ])
+    assert resolver.resolve('API.example.com:443') == 'example'
+    assert resolver.resolve('acme.shop.io') == 'shop-acme'
+    assert resolver.resolve('a.acme.shop.io') == 'acme.shop.io'
+    assert resolver.resolve('customers.acme.domain.com') == 'acme.domain.com'
+    assert resolver.resolve('[::1]:5000') == '[::1]'
+
+
+def test_tenant_resolver_cache():
+    """ Test that the tenants of the latest hosts are memoized """
+    resolver = TenantResolver(cache_size=2)
+    for host in ['a.domain.com', 'b.domain.com', 'a.domain.com']:
+        resolver.resolve(host)
+
+    info = resolver.resolve.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+
+
+def test_tenant_from_config():
+    """ Test that the context tenant uses the configured mapping """
+    with mock.patch.object(active_config, 'TENANT_MAPPING',
+                           {'localhost': 'local'}):
+        api.reload_config()
+        try:
+            rv = app.test_client().get('/current-context')
+            assert rv.json['tenant_id'] == 'local'
+        finally:
+            api.reload_config()